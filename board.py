@@ -1,80 +1,132 @@
 from __future__ import annotations
 
 from logging import getLogger
-from random import shuffle
-from typing import TYPE_CHECKING, Dict, List, Optional, Tuple
+from typing import TYPE_CHECKING, Dict, List, Optional, Set, Tuple
 
-from card import PURPLE, YELLOW
+from log import game_event
 
 if TYPE_CHECKING:
-    from telegram import User
-
     from card import Card
     from game import Game
     from player import Player
 
+logger = getLogger(__name__)
+
 
 class Board:
-    purple: Optional[Card] = None
-    yellow: Dict[Player, List[Card]] = {}
-    loser: Optional[User] = None
+    """
+    The cards played in a turn.
+
+    Who still owes cards, how many cards are still expected and the shuffled
+    reveal order are kept up to date as cards are played and players join or
+    leave, so reading them is O(1).
+    """
+
+    __slots__ = ("game", "purple", "yellow", "loser", "reveal", "pending", "missing")
 
     def __init__(self, game):
         self.game: Game = game
         self.init()
 
-        self.logger = getLogger(__name__)
-
     def init(self):
-        self.loser = None
-        self.purple = None
-        self.yellow = {}
+        self.loser: Optional[Player] = None
+        self.purple: Optional[Card] = None
+        self.yellow: Dict[Player, List[Card]] = {}
         for player in self.game.players:
             if player != self.game.current_player:
                 self.yellow[player] = []
-        order = list(range(1, len(self.yellow.keys()) + 1))
-        shuffle(order)
-        self.order = order
+        # the players by group number in the reveal, group n is reveal[n - 1];
+        # None for a player who left after the reveal and was not restored
+        self.reveal: List[Optional[Player]] = list(self.yellow)
+        self.game.random.shuffle(self.reveal)
+        # the players who did not play all their yellow cards yet
+        self.pending: Set[Player] = set(self.yellow)
+        # the yellow cards still expected, once the purple card is played
+        self.missing = 0
+
+    def recount(self):
+        """Rebuild the bookkeeping from the played cards"""
+        if self.purple is None:
+            self.pending = set(self.yellow)
+            self.missing = 0
+            return
+        space = self.purple.space
+        self.pending = {p for p, cards in self.yellow.items() if len(cards) < space}
+        self.missing = sum(space - len(self.yellow[p]) for p in self.pending)
+
+    def join(self, player: Player):
+        """A player joining before the purple card is played plays this turn"""
+        if self.purple is not None or player in self.yellow:
+            return
+        if player is self.game.current_player:
+            return
+        self.yellow[player] = []
+        self.reveal.insert(self.game.random.randint(0, len(self.reveal)), player)
+        self.pending.add(player)
+
+    def leave(self, player: Player):
+        """
+        Drop the cards of a player leaving before the reveal, the reveal
+        follows when every remaining player has played.
+        """
+        if player not in self.yellow or self.is_revealed:
+            return
+        cards = self.yellow.pop(player)
+        self.reveal.remove(player)
+        if player in self.pending:
+            self.pending.discard(player)
+            if self.purple is not None:
+                self.missing -= self.purple.space - len(cards)
+                if not self.pending:
+                    self.game.state += 1
 
     def play_card_by(self, player: Player, card: Card):
         """Called from Player.play"""
         if player == self.game.current_player:
-            self.logger.info(f"{card.color} == {PURPLE}")
-            self.logger.info(f"{self.purple} is None")
             self.purple = card
-            [self.game.purple_deck.draw() for _ in range(2)]
-
-            self.game.logger.info(f"{self.purple} {self.purple.space}")
+            self.game.purple_deck.draw_many(2)
 
+            self.missing = self.purple.space * len(self.pending)
             self.game.state += 1
-
-            self.logger.info(f"{self.game.state} == {self.game.State.YELLOW}")
+            logger.debug("Purple card played", extra=game_event(self.game, player, card))
         else:
-            self.logger.info(f"{card.color} == {YELLOW}")
+            logger.debug("Yellow card played", extra=game_event(self.game, player, card))
+
+            cards = self.yellow[player]
+            cards.append(card)
+            self.missing -= 1
+            if len(cards) == self.purple.space:
+                self.pending.discard(player)
+                if not self.pending:
+                    self.game.state += 1
 
-            self.yellow[player].append(card)
-            if self.is_others_played:
-                self.game.state += 1
+    def owes(self, player: Player) -> bool:
+        """The player has yellow cards to play in this turn"""
+        return self.purple is not None and player in self.pending
 
     @property
     def is_others_played(self) -> bool:
-        for cards in self.yellow.values():
-            if len(cards) != self.purple.space:
-                return False
-        return True
+        return not self.pending
+
+    @property
+    def is_revealed(self) -> bool:
+        return self.purple is not None and not self.pending
 
     def get_cards(self) -> List[Tuple[str, List[Card]]]:
         return [
-            (str(i + 1), x)
-            for i, (_, x) in enumerate(sorted(zip(self.order, self.yellow.values())))
+            (str(i + 1), self.yellow[p])
+            for i, p in enumerate(self.reveal)
+            if p is not None
         ]
 
     def get_players(self) -> List[Tuple[str, Player]]:
-        return [
-            (str(i + 1), x)
-            for i, (_, x) in enumerate(sorted(zip(self.order, self.yellow.keys())))
-        ]
+        return [(str(i + 1), p) for i, p in enumerate(self.reveal) if p is not None]
 
     def get_loser(self, selected: int) -> Player:
-        index = self.order.index(selected)
-        return list(self.yellow.keys())[index]
+        """
+        Raises:
+            IndexError: There is no such group
+        """
+        if not 1 <= selected <= len(self.reveal) or self.reveal[selected - 1] is None:
+            raise IndexError(selected)
+        return self.reveal[selected - 1]
@@ -1,6 +1,9 @@
 import logging
+import time
+from threading import local
+from typing import Optional
 
-from telegram import InlineKeyboardButton, InlineKeyboardMarkup
+from telegram import Bot, InlineKeyboardButton, InlineKeyboardMarkup, Message, User
 from telegram.ext import (
     CallbackQueryHandler,
     ChosenInlineResultHandler,
@@ -8,22 +11,55 @@ from telegram.ext import (
     Filters,
     InlineQueryHandler,
     MessageHandler,
+    TypeHandler,
     Updater,
 )
 from telegram.ext.callbackcontext import CallbackContext
 from telegram.update import Update
-
-from card import PURPLE, PURPLE_CARD, YELLOW, YELLOW_CARD, Card
-from config import MIN_PLAYERS, TOKEN, WORKERS
+from telegram.utils.request import Request
+
+from card import PURPLE, PURPLE_CARD, REGISTRY, YELLOW, YELLOW_CARD
+from config import (
+    ADMIN_LIST,
+    DEBUG,
+    INLINE,
+    JOURNAL,
+    LOGGING,
+    METRICS,
+    MIN_PLAYERS,
+    MODE,
+    OUTBOX,
+    REAPER,
+    SHARDS,
+    SNAPSHOT,
+    STATS,
+    STATUS,
+    TOKEN,
+    WEBHOOK,
+    WORKERS,
+)
 from errors import (
     AlreadyJoinedError,
+    CardNotFoundError,
+    CardNotInHandError,
     DeckEmptyError,
     LobbyClosedError,
     NoGameInChatError,
     NotEnoughPlayersError,
     TooManyCardsError,
 )
+from executor import SerialExecutor
+from game import Game
 from game_manager import GameManager
+from ingress import IngressFilter
+from inline import InlineStage
+from journal import JournalWriter
+from log import describe, set_level, set_sampling, setup
+from metrics import Metrics, MetricsServer, TimedRequest
+from outbox import Outbox, Priority
+from persistence import Snapshotter
+from player import UserRecord
+from reaper import EVICTED, LOBBY, Reaper
 from results import (
     add_cards,
     add_gameinfo,
@@ -31,79 +67,285 @@ from results import (
     add_not_started,
     add_purple_cards,
 )
+from shard import ShardRouter
+from stats_store import StatsStore
+from status import StatusBoard
 from utils import (
+    HEADER,
     display_name,
     make_card_players,
-    make_current_settlement,
-    make_game_start,
-    make_loser_discard,
-    make_other_players_notif,
+    make_player_stats,
     make_room_info,
     make_settlement,
+    make_status,
+    make_top,
 )
+from webhook import WebhookServer
 
-logging.basicConfig(
-    format="%(asctime)s - %(filename)s:%(lineno)d - %(levelname)s - %(message)s",
-    level=logging.INFO,
-)
-logger = logging.getLogger(__name__)
+logger = logging.getLogger("bot")
 
 
 class Room:
-    def __init__(self, updater: Updater):
+    def __init__(
+        self,
+        updater: Updater,
+        gm: GameManager,
+        snapshot_path: Optional[str] = SNAPSHOT.get("path"),
+        outbox: dict = OUTBOX,
+        metrics: Optional[Metrics] = None,
+        reaper: dict = REAPER,
+        inline: dict = INLINE,
+        journal_path: Optional[str] = None,
+        status: dict = STATUS,
+        stats: dict = STATS,
+    ):
         self.updater = updater
+        self.gm = gm
+        gm.on_end = self.game_ended
+        self.metrics = metrics or Metrics()
+        self.metrics_server: Optional[MetricsServer] = None
+        self.outbox = Outbox(updater.bot, metrics=self.metrics, **outbox)
+        self.status = StatusBoard(self.outbox, self.render_status, **status)
+        # NOTE: keep the journal of every finished game for replay.py
+        self.journal = JournalWriter(journal_path) if journal_path else None
+        self.store = None
+        if stats.get("path"):
+            self.store = StatsStore(**stats)
+        self.executor = SerialExecutor(WORKERS)
+        # the key of the mailbox running on this thread, see serial
+        self.mailbox = local()
+        self.snapshots = None
+        if snapshot_path:
+            self.snapshots = Snapshotter(
+                gm,
+                snapshot_path,
+                self.executor,
+                interval=SNAPSHOT.get("interval", 60),
+            )
+        self.reaper = None
+        if reaper.get("enabled", True):
+            options = {key: value for key, value in reaper.items() if key != "enabled"}
+            self.reaper = Reaper(gm, self.executor, self.notify_reaped, **options)
+        serial, timed = self.serial, self.metrics.timed
+        dispatcher = updater.dispatcher
+        # NOTE: inline queries only read the published snapshots, the newest
+        # query of each user is answered on the worker threads
+        self.inline = InlineStage(
+            timed(self.reply_query), dispatcher.run_async, dispatcher.dispatch_error, **inline
+        )
+        self.ingress = IngressFilter(gm)
         self.handlers = [
-            InlineQueryHandler(self.reply_query, run_async=True),
-            ChosenInlineResultHandler(self.process_result, run_async=True),
-            CallbackQueryHandler(self.reply_callback, run_async=True),
-            CommandHandler("new", self.new, run_async=True),
-            CommandHandler("kill", self.kill, run_async=True),
-            CommandHandler("join", self.join, run_async=True),
-            CommandHandler("leave", self.leave, run_async=True),
-            CommandHandler("start", self.start, run_async=True),
-            CommandHandler("info", self.info, run_async=True),
-            MessageHandler(Filters.status_update, self.leave_group, run_async=True),
+            InlineQueryHandler(self.inline),
+            ChosenInlineResultHandler(serial(timed(self.process_result))),
+            CallbackQueryHandler(serial(timed(self.reply_callback))),
+            CommandHandler("new", serial(timed(self.new))),
+            CommandHandler("kill", serial(timed(self.kill))),
+            CommandHandler("join", serial(timed(self.join))),
+            CommandHandler("leave", serial(timed(self.leave))),
+            CommandHandler("start", serial(timed(self.start))),
+            CommandHandler("info", serial(timed(self.info))),
+            CommandHandler("stats", serial(timed(self.stats))),
+            CommandHandler("top", serial(timed(self.top))),
+            CommandHandler("metrics", serial(timed(self.show_metrics))),
+            CommandHandler("log", serial(timed(self.log))),
+            MessageHandler(Filters.status_update, serial(timed(self.leave_group))),
         ]
         self.register()
+        self.register_metrics()
 
     def register(self):
+        # NOTE: the updates no handler acts on stop here, on the dispatcher thread
+        self.updater.dispatcher.add_handler(TypeHandler(Update, self.ingress), group=-1)
         for handler in self.handlers:
             self.updater.dispatcher.add_handler(handler)
         self.updater.dispatcher.add_error_handler(self.error)
 
+    def register_metrics(self):
+        gm, executor, outbox = self.gm, self.executor, self.outbox
+        inline, ingress = self.inline, self.ingress
+        gauge = self.metrics.gauge
+        gauge(
+            "games",
+            "Running games",
+            lambda: sum(len(games) for games in list(gm.chatid_games.values())),
+        )
+        gauge("players", "Players in running games", lambda: len(gm.user_chat_players))
+        gauge(
+            "update_queue",
+            "Updates waiting for the dispatcher",
+            self.updater.dispatcher.update_queue.qsize,
+        )
+        gauge("executor_workers", "Threads handling updates", lambda: executor.workers)
+        gauge("executor_busy", "Threads handling updates now", lambda: executor.busy)
+        gauge("executor_pending", "Updates in the mailboxes", lambda: executor.pending)
+        gauge("outbox_queued", "Messages waiting in the outbox", lambda: outbox.queued)
+        self.metrics.counter(
+            "outbox_messages_total",
+            "Outgoing messages by result",
+            "result",
+            lambda: dict(outbox.stats),
+        )
+        self.metrics.counter(
+            "updates_filtered_total",
+            "Updates dropped before dispatch by kind",
+            "kind",
+            lambda: dict(ingress.stats),
+        )
+        self.metrics.counter(
+            "inline_queries_total",
+            "Inline queries by result",
+            "result",
+            lambda: dict(inline.stats),
+        )
+        if self.reaper:
+            reaper = self.reaper
+            self.metrics.counter(
+                "games_reaped_total",
+                "Idle games ended by the reaper",
+                "reason",
+                lambda: dict(reaper.stats),
+            )
+
+    def serial(self, callback):
+        """
+        Wrap a handler so that it runs in the mailbox of the game it touches:
+        updates of one game are processed in order, different games in parallel
+        """
+
+        def handler(update: Update, context: CallbackContext):
+            key = self.game_key(update)
+            self.executor.submit(key, self.run, key, callback, update, context)
+
+        return handler
+
+    def run(self, key: int, callback, update: Update, context: CallbackContext):
+        # NOTE: handlers act on the game of this key only, other games run
+        # in their own mailboxes meanwhile
+        before = self.transition(key)
+        self.mailbox.key = key
+        try:
+            callback(update, context)
+        except Exception as e:
+            self.updater.dispatcher.dispatch_error(update, e)
+        finally:
+            self.mailbox.key = None
+        game = self.gm.active_game(key)
+        if game is not None:
+            game.last_activity = time.monotonic()
+        # other updates are saved by the periodic snapshot
+        if self.snapshots and self.transition(key) != before:
+            self.snapshots.request()
+
+    def transition(self, key: int):
+        """The game of a chat, its state and its players, to notice changes"""
+        game = self.gm.active_game(key)
+        if game is None:
+            return None
+        return game, game.state, len(game.players)
+
+    def game_key(self, update: Update) -> int:
+        """The chat of the game an update belongs to"""
+        if update.effective_chat:
+            return update.effective_chat.id
+        # chosen inline results carry no chat, use the user's current game
+        user = update.effective_user
+        player = self.gm.userid_current.get(user.id)
+        if player is not None:
+            return player.game.chat.id
+        # the user's private chat, which is never a game
+        return user.id
+
+    def game_ended(self, game: Game):
+        if self.snapshots:
+            self.snapshots.request()
+        self.status.end(game)
+        if self.store:
+            self.store.record_game(game)
+        if self.journal:
+            self.journal.write(game)
+
+    @staticmethod
+    def render_status(game: Game):
+        """The status message of a game, with the discard buttons when due"""
+        if game.state == game.State.DISCARD and game.board.loser.discard_amount == 0:
+            return make_status(game), discard_choice
+        return make_status(game), choice
+
+    def reply(self, message: Message, text: str, **kwargs):
+        """Queue a reply to the message"""
+        self.outbox.send_message(
+            message.chat_id, text, reply_to_message_id=message.message_id, **kwargs
+        )
+
+    @staticmethod
+    def is_admin(user: User) -> bool:
+        """Admins are listed by user id or username in the config"""
+        return bool(ADMIN_LIST) and (user.id in ADMIN_LIST or user.username in ADMIN_LIST)
+
+    def stats(self, update: Update, context: CallbackContext):
+        """/stats shows the games of the user across all chats"""
+        if not self.store:
+            return
+        user = update.message.from_user
+        self.reply(update.message, make_player_stats(user, self.store.player(user.id)))
+
+    def top(self, update: Update, context: CallbackContext):
+        if not self.store:
+            return
+        self.reply(update.message, make_top(self.store.top))
+
+    def show_metrics(self, update: Update, context: CallbackContext):
+        if not self.is_admin(update.message.from_user):
+            return
+        self.reply(update.message, HEADER.format(text="統計") + self.metrics.summary())
+
+    def log(self, update: Update, context: CallbackContext):
+        """/log [module] [level or sampling rate] changes the logging of this process"""
+        if not self.is_admin(update.message.from_user):
+            return
+        text = HEADER.format(text="紀錄")
+        if len(context.args) == 2:
+            name, value = context.args
+            try:
+                set_sampling(name, float(value))
+            except ValueError:
+                try:
+                    set_level(name, value)
+                except ValueError:
+                    text += "用法：/log 模組 等級或取樣率\n"
+        self.reply(update.message, text + describe())
+
     def info(self, update: Update, context: CallbackContext):
         chat = update.message.chat
         if chat.type == "private":
             return
 
-        games = gm.chatid_games.get(chat.id)
-        if games:
-            game = games[-1]
+        game = self.gm.active_game(chat.id)
+        if game:
             if game.ended:
-                update.message.reply_text("遊戲已結束！")
+                self.reply(update.message, "遊戲已結束！")
             else:
-                update.message.reply_text(make_room_info(game))
+                self.reply(update.message, make_room_info(game))
         else:
-            update.message.reply_text("目前沒有房間！請用 /new 開房！")
+            self.reply(update.message, "目前沒有房間！請用 /new 開房！")
 
     def new(self, update: Update, context: CallbackContext):
         chat = update.message.chat
         if chat.type == "private":
             return
 
-        games = gm.chatid_games.get(chat.id)
-        if games:
-            game = games[-1]
+        game = self.gm.active_game(chat.id)
+        if game:
             if game.started and len(game.players) >= MIN_PLAYERS:
                 text = "已經開始ㄌ用 /join 中途插入ㄅ"
             else:
                 text = "房間早就開ㄌ，用 /info 查看資訊，用 /join 加入"
-            update.message.reply_text(text)
+            self.reply(update.message, text)
             return
 
-        game = gm.new_game(update.message.chat)
-        game.starter = update.message.from_user
-        update.message.reply_text("幫你開ㄌ，其他人可以用 /join 加入")
+        game = self.gm.new_game(update.message.chat)
+        game.starter = UserRecord.of(update.message.from_user)
+        self.reply(update.message, "幫你開ㄌ，其他人可以用 /join 加入")
         # NOTE: auto join
         self.join(update, context)
 
@@ -112,20 +354,19 @@ class Room:
         if chat.type == "private":
             return
 
-        games = gm.chatid_games.get(chat.id)
-        if not games:
+        if not self.gm.active_game(chat.id):
             return
 
         user = update.message.from_user
         if user.username == "sheiun":
             try:
-                gm.end_game(chat, user)
+                self.gm.end_game(chat, user)
                 text = "遊戲終了！"
             except NoGameInChatError:
                 return
         else:
             text = "你沒有權限"
-        update.message.reply_text(text)
+        self.reply(update.message, text)
 
     def join(self, update: Update, context: CallbackContext):
         chat = update.message.chat
@@ -133,7 +374,7 @@ class Room:
             return
 
         try:
-            gm.join_game(update.message.from_user, chat)
+            self.gm.join_game(update.message.from_user, chat)
         except LobbyClosedError:
             text = "關房了"
         except NoGameInChatError:
@@ -144,19 +385,23 @@ class Room:
             text = "牌不夠ㄌ"
         else:
             text = "加入成功ㄌ"
-        update.message.reply_text(text)
+            game = self.gm.active_game(chat.id)
+            if game.started:
+                self.status.update(game)
+        self.reply(update.message, text)
 
     def leave(self, update: Update, context: CallbackContext):
         chat = update.message.chat
         user = update.message.from_user
 
-        player = gm.player_for_user_in_chat(user, chat)
+        player = self.gm.player_for_user_in_chat(user, chat)
         if player is None:
             text = "你不在遊戲內ㄡ"
         else:
             game = player.game
+            collecting = game.state == game.State.YELLOW
             try:
-                gm.leave_game(user, chat)
+                self.gm.leave_game(user, chat)
             except NoGameInChatError:
                 text = "你不在遊戲內ㄡ"
             except NotEnoughPlayersError:
@@ -164,64 +409,73 @@ class Room:
             else:
                 if game.started:
                     text = f"好ㄉ。下位玩家 {display_name(game.current_player.user)}"
+                    self.status.update(game)
                 else:
                     text = f"{display_name(user)} 離開ㄌ"
-        update.message.reply_text(text)
+        self.reply(update.message, text)
+        if player is not None and collecting and game.state == game.State.LOSE:
+            # NOTE: the others were only waiting for the player who left
+            self.reveal(game)
 
     def start(self, update: Update, context: CallbackContext):
         chat = update.message.chat
         if chat.type == "private":
             return
-        text = ""
-        markup = None
-        try:
-            game = gm.chatid_games[chat.id][-1]
-        except (KeyError, IndexError):
+        game = self.gm.active_game(chat.id)
+        if game is None:
             text = "還沒開房ㄡ"
+        elif game.started:
+            text = "已經開始ㄌㄡ"
+        elif len(game.players) < MIN_PLAYERS:
+            text = f"至少要 {MIN_PLAYERS} 人才能開ㄡ"
         else:
-            if game.started:
-                text = "已經開始ㄌㄡ"
-            elif len(game.players) < MIN_PLAYERS:
-                text = f"至少要 {MIN_PLAYERS} 人才能開ㄡ"
-            else:
-                game.start()
-                text = make_game_start(game)
-                markup = choice
-                context.bot.send_message(chat.id, text=make_room_info(game))
-        update.message.reply_text(text, reply_markup=markup)
+            game.start()
+            self.outbox.send_message(chat.id, text=make_room_info(game))
+            # NOTE: the status message is edited as the game goes on
+            self.status.update(game)
+            return
+        self.reply(update.message, text)
 
     def leave_group(self, update: Update, context: CallbackContext):
         chat = update.message.chat
 
         if update.message.left_chat_member:
             user = update.message.left_chat_member
+            game = self.gm.active_game(chat.id)
+            collecting = game is not None and game.state == game.State.YELLOW
 
             try:
-                gm.leave_game(user, chat)
+                self.gm.leave_game(user, chat)
             except NoGameInChatError:
                 return
             except NotEnoughPlayersError:
-                gm.end_game(chat, user)
+                self.gm.end_game(chat, user)
                 text = "遊戲終了！"
             else:
                 text = display_name(user) + " 被踢出遊戲ㄌ"
-            context.bot.send_message(chat.id, text=text)
+                if game.started:
+                    self.status.update(game)
+            self.outbox.send_message(chat.id, text=text)
+            if collecting and game.state == game.State.LOSE:
+                self.reveal(game)
 
     def reply_query(self, update: Update, context: CallbackContext):
         results = []
 
         user = update.inline_query.from_user
         try:
-            player = gm.userid_current[user.id]
+            player = self.gm.userid_current[user.id]
         except KeyError:
             add_no_game(results)
         else:
             game = player.game
-            if not game.started:
+            # NOTE: a consistent snapshot, the game may be changing meanwhile
+            view = game.view
+            if view.state == game.State.START:
                 add_not_started(results)
 
-            elif user.id == game.current_player.user.id:
-                if game.board.purple is not None:
+            elif player is view.current_player:
+                if view.purple is not None:
                     add_cards(results, player)
                 else:
                     add_purple_cards(results, game)
@@ -232,20 +486,25 @@ class Room:
     def process_result(self, update: Update, context: CallbackContext):
         user = update.chosen_inline_result.from_user
         result_id = update.chosen_inline_result.result_id
-        try:
-            player = gm.userid_current[user.id]
-            game = player.game
-            chat = game.chat
-        except (KeyError, AttributeError):
+        # the game the update was routed to, the user's current game may
+        # have changed since
+        player = self.gm.user_chat_players.get((user.id, self.mailbox.key))
+        if player is None:
             return
+        game = player.game
+        chat = game.chat
         if result_id in ("hand", "gameinfo", "nogame"):
             return
         if result_id.isdigit() and len(result_id) == 19:
             # NOTE: play a yellow card
-            card = Card.from_id(result_id)
+            try:
+                card = REGISTRY.get(result_id)
+            except CardNotFoundError:
+                logger.info("Result: %s is not a known card", result_id)
+                return
             if game.state == game.State.PURPLE:
                 if player != game.current_player:
-                    context.bot.send_message(
+                    self.outbox.send_message(
                         chat.id,
                         text=display_name(user) + "你現在不能出黃牌",
                         reply_to_message_id=update.chosen_inline_result.inline_message_id,
@@ -255,46 +514,23 @@ class Room:
                     try:
                         player.play(card)
                     except TooManyCardsError:
-                        context.bot.send_message(
+                        self.outbox.send_message(
                             chat.id,
                             text=display_name(user) + "你出太多張了！",
                             reply_to_message_id=update.chosen_inline_result.inline_message_id,
                         )
                         return
-                    # TODO: 需要提醒打牌成功？
-                    # TODO: 如果 game.state 沒跳 show 打牌進度?
+                    except CardNotInHandError:
+                        logger.info("Result: %s is not in the hand of %s", result_id, user.id)
+                        return
 
                     if game.state == game.State.LOSE:
-                        context.bot.send_message(
-                            chat.id, text=f"這張 {PURPLE_CARD} 是剛剛的題目"
-                        )
-                        context.bot.send_sticker(
-                            chat.id, sticker=game.board.purple.sticker["file_id"]
-                        )
-
-                        for idx, cards in game.board.get_cards():
-                            button = InlineKeyboardButton(
-                                text=f"🔼 第 {idx} 組 🔼", callback_data=str(idx)
-                            )
-                            last_card = cards.pop()
-                            for card in cards:
-                                context.bot.send_sticker(
-                                    chat.id, sticker=card.sticker["file_id"]
-                                )
-                            context.bot.send_sticker(
-                                chat.id,
-                                sticker=last_card.sticker["file_id"],
-                                reply_markup=InlineKeyboardMarkup([[button]]),
-                            )
-                        context.bot.send_message(
-                            chat.id,
-                            text=display_name(game.current_player.user)
-                            + "\n"
-                            + "請挑最爛ㄉ",
-                        )
+                        self.reveal(game)
+                    # NOTE: a burst of plays becomes one edit
+                    self.status.update(game)
 
                 else:
-                    context.bot.send_message(
+                    self.outbox.send_message(
                         chat.id,
                         text=display_name(user) + "你現在不能出黃牌",
                         reply_to_message_id=update.chosen_inline_result.inline_message_id,
@@ -302,40 +538,80 @@ class Room:
 
             elif game.state == game.State.DISCARD:
                 if player == game.board.loser:
-                    player.discard(card)
+                    try:
+                        player.discard(card)
+                    except CardNotInHandError:
+                        logger.info("Result: %s is not in the hand of %s", result_id, user.id)
+                        return
                     if player.discarded:
                         game.turn()
-                        context.bot.send_message(
-                            chat.id,
-                            text="換下一位玩家 " + display_name(game.current_player.user),
-                            reply_markup=choice,
-                        )
+                        self.status.update(game)
                 else:
-                    context.bot.send_message(
+                    self.outbox.send_message(
                         chat.id,
                         text=display_name(user) + "你現在不能出黃牌",
                         reply_to_message_id=update.chosen_inline_result.inline_message_id,
                     )
 
         elif result_id.startswith(PURPLE):
-            card = Card.from_id(result_id.replace(PURPLE, ""))
+            try:
+                card = REGISTRY.get(result_id[len(PURPLE) :])
+            except CardNotFoundError:
+                logger.info("Result: %s is not a known card", result_id)
+                return
             player.play(card)
-            # NOTE: notify other players to play yellow cards
-            context.bot.send_message(
-                chat.id, text=make_other_players_notif(game), reply_markup=choice
-            )
+            # NOTE: the status tells the other players to play yellow cards
+            self.status.update(game)
         else:
-            logger.info(f"Result: {result_id} is run into else clause!")
+            logger.info("Result: %s is run into else clause!", result_id)
             # The card cannot be played
 
+    def reveal(self, game: Game):
+        """Show the purple card and the yellow cards of every group"""
+        chat = game.chat
+        # NOTE: the reveal is queued as a whole at low priority
+        self.outbox.send_message(
+            chat.id,
+            text=f"這張 {PURPLE_CARD} 是剛剛的題目",
+            priority=Priority.LOW,
+        )
+        self.outbox.send_sticker(
+            chat.id,
+            sticker=game.board.purple.sticker["file_id"],
+            priority=Priority.LOW,
+        )
+
+        for idx, cards in game.board.get_cards():
+            button = InlineKeyboardButton(
+                text=f"🔼 第 {idx} 組 🔼", callback_data=str(idx)
+            )
+            *cards, last_card = cards
+            for card in cards:
+                self.outbox.send_sticker(
+                    chat.id,
+                    sticker=card.sticker["file_id"],
+                    priority=Priority.LOW,
+                )
+            self.outbox.send_sticker(
+                chat.id,
+                sticker=last_card.sticker["file_id"],
+                reply_markup=InlineKeyboardMarkup([[button]]),
+                priority=Priority.LOW,
+            )
+        self.outbox.send_message(
+            chat.id,
+            text=display_name(game.current_player.user) + "\n" + "請挑最爛ㄉ",
+            priority=Priority.LOW,
+        )
+
     def reply_callback(self, update: Update, context: CallbackContext):
         chat = update.callback_query.message.chat
         user = update.callback_query.from_user
-        try:
-            player = gm.userid_current[user.id]
-            game = player.game
-        except (KeyError, AttributeError):
+        # the buttons belong to the game of this chat
+        player = self.gm.player_for_user_in_chat(user, chat)
+        if player is None:
             return
+        game = player.game
 
         data = update.callback_query.data
 
@@ -345,43 +621,26 @@ class Room:
                 return
             num = int(data)
 
-            # NOTE: resolve join midway problem
-            try:
-                loser = game.board.get_loser(num)
-            except IndexError:
-                return
-
             if game.board.loser:
                 update.callback_query.answer("你已經選過了！")
                 return
 
-            loser.score -= game.board.purple.space
-            game.board.loser = loser
-            context.bot.send_message(chat.id, text=make_card_players(game, num))
+            # NOTE: resolve join midway problem
+            try:
+                loser = game.choose_loser(num)
+            except IndexError:
+                return
+            if self.store:
+                self.store.record_picked(game.board.yellow[loser])
+            self.outbox.send_message(chat.id, text=make_card_players(game, num))
 
             # NOTE: Game end check
             if game.get_loser():
-                gm.end_game(chat, user)
-                context.bot.send_message(chat.id, text=make_settlement(game))
+                self.gm.end_game(chat, user)
+                self.outbox.send_message(chat.id, text=make_settlement(game))
                 return
-            context.bot.send_message(chat.id, text=make_current_settlement(game))
-            # NOTE: let loser to discard cards
-            game.state += 1
-            logger.info(f"{game.state} == {game.State.DISCARD}")
-
-            actions = [1, 2, "不換"]
-            buttons = []
-            for act in actions:
-                if isinstance(act, int):
-                    data = f"discard{act}"
-                else:
-                    data = "skip_discard"
-                buttons.append(InlineKeyboardButton(str(act), callback_data=data))
-            context.bot.send_message(
-                chat.id,
-                text=make_loser_discard(game),
-                reply_markup=InlineKeyboardMarkup([buttons]),
-            )
+            # NOTE: the status shows the scores and lets the loser discard cards
+            self.status.update(game)
 
         elif data.startswith("discard"):
             if player != game.board.loser:
@@ -392,41 +651,149 @@ class Room:
             if player.discard_amount > 0:
                 update.callback_query.answer(f"你已經選擇棄掉 {amount} 張 {YELLOW_CARD} 無法反悔")
                 return
-            player.discard_amount = amount
-            context.bot.send_message(
-                chat.id,
-                text=display_name(user) + f"選擇了棄掉 {amount} 張牌",
-                reply_markup=choice,
-            )
+            player.choose_discards(amount)
+            self.status.update(game)
             update.callback_query.answer(f"接下來請你選擇 {amount} 張 {YELLOW_CARD} 棄牌")
         elif data == "skip_discard":
             if player == game.board.loser and player.discard_amount == 0:
-                game.turn()
-                context.bot.send_message(
-                    chat.id,
-                    text="換下一位玩家 " + display_name(game.current_player.user),
-                    reply_markup=choice,
-                )
+                player.skip_discard()
+                self.status.update(game)
                 text = "你選擇了不換牌！"
             else:
                 text = "不要亂按啦！"
             update.callback_query.answer(text)
         else:
-            logger.info(f"{data} run into else clause")
+            logger.info("%s run into else clause", data)
+
+    def notify_reaped(self, game: Game, reason: str):
+        if reason == LOBBY:
+            text = "太久沒有開始，房間關掉ㄌ，用 /new 重開"
+        elif reason == EVICTED:
+            text = "伺服器滿ㄌ，這場最久沒動靜，先結束ㄌ"
+        else:
+            text = "太久沒有動靜，遊戲結束ㄌ"
+        self.outbox.send_message(game.chat.id, text=text)
 
     def error(self, update: Update, context: CallbackContext):
         """Simple error handler"""
         logger.exception(context.error)
 
+    def open(self):
+        """Restore the games and start the background services"""
+        # NOTE: bring back the games of the last run before taking updates
+        if self.snapshots:
+            self.snapshots.restore()
+            self.snapshots.start()
+        self.outbox.start()
+        if self.store:
+            self.store.start()
+        if self.reaper:
+            self.reaper.start()
+        if self.metrics_server:
+            self.metrics_server.start()
+
+    def close(self):
+        """Finish the queued updates, then save the games and flush the outbox"""
+        if self.reaper:
+            self.reaper.stop()
+        self.executor.shutdown()
+        # NOTE: the final snapshot includes every update that was received
+        if self.snapshots:
+            self.snapshots.stop()
+        if self.store:
+            self.store.stop()
+        self.outbox.stop()
+        if self.metrics_server:
+            self.metrics_server.stop()
+
     def launch(self):
-        self.updater.start_polling()
-        self.updater.idle()
+        self.open()
+        receive_updates(self.updater)
+        self.close()
+
+
+def receive_updates(updater: Updater):
+    """Feed updates to the dispatcher until the bot is stopped"""
+    if MODE != "webhook":
+        updater.start_polling()
+        updater.idle()
+        return
+
+    secret_token = WEBHOOK.get("secret_token")
+    server = WebhookServer(
+        updater.dispatcher,
+        listen=WEBHOOK.get("listen", "127.0.0.1"),
+        port=WEBHOOK.get("port", 8443),
+        path=WEBHOOK.get("path", "/"),
+        secret_token=secret_token,
+    )
+    if WEBHOOK.get("url"):
+        updater.bot.set_webhook(
+            WEBHOOK["url"],
+            api_kwargs={"secret_token": secret_token} if secret_token else None,
+        )
+    server.start()
+    server.idle()
+
+
+def make_room(index: int = 0, shards: int = 1) -> Room:
+    """
+    The room of a shard. Each shard keeps its own snapshot and journals,
+    gets its part of the bot's global flood limit and serves its metrics on
+    its own port. The statistics of all shards go to one database.
+    """
+    setup(LOGGING)
+    snapshot_path = SNAPSHOT.get("path")
+    journal_path = JOURNAL.get("path")
+    outbox = dict(OUTBOX)
+    if shards > 1:
+        if snapshot_path:
+            snapshot_path += f".{index}-{shards}"
+        if journal_path:
+            journal_path += f".{index}-{shards}"
+        outbox["global_rate"] = outbox.get("global_rate", 30) / shards
+
+    metrics = Metrics(METRICS.get("enabled", True))
+    request = Request(con_pool_size=WORKERS + 4)
+    if metrics.enabled:
+        request = TimedRequest(request, metrics)
+    updater = Updater(bot=Bot(TOKEN, request=request), workers=WORKERS)
+    gm = GameManager(debug=DEBUG)
+    room = Room(updater, gm, snapshot_path, outbox, metrics, journal_path=journal_path)
+
+    if METRICS.get("port"):
+        listen = METRICS.get("listen", "127.0.0.1")
+        room.metrics_server = MetricsServer(metrics, listen, METRICS["port"] + index)
+    return room
+
+
+def launch_sharded(shards: int):
+    """Receive the updates here and play the games in `shards` processes"""
+    setup(LOGGING)
+    router = ShardRouter(shards, make_room)
+    router.start()
+    updater = Updater(token=TOKEN, workers=1)
+    updater.dispatcher.add_handler(TypeHandler(Update, router.handle))
+    receive_updates(updater)
+    router.stop()
 
 
 choice = InlineKeyboardMarkup(
     [[InlineKeyboardButton("選牌！", switch_inline_query_current_chat="")]]
 )
+discard_choice = InlineKeyboardMarkup(
+    [
+        [
+            InlineKeyboardButton("1", callback_data="discard1"),
+            InlineKeyboardButton("2", callback_data="discard2"),
+            InlineKeyboardButton("不換", callback_data="skip_discard"),
+        ],
+        [InlineKeyboardButton("選牌！", switch_inline_query_current_chat="")],
+    ]
+)
 
-gm = GameManager()
-
-Room(Updater(token=TOKEN, workers=WORKERS)).launch()
+if __name__ == "__main__":
+    if SHARDS > 1:
+        launch_sharded(SHARDS)
+    else:
+        make_room().launch()
@@ -1,8 +1,10 @@
-from json import load
-from typing import Any, Dict
+from logging import getLogger
+from typing import Any, Dict, Union
 
-STICKERS_DICT = load(open("stickers.json"))
-PURPLE_SPACE_LIST = load(open("purple_space.json"))
+from catalog import load_stickers
+from registry import CardRegistry
+
+STICKERS_DICT, PURPLE_SPACE_LIST = load_stickers()
 
 PURPLE = "purple"
 YELLOW = "yellow"
@@ -14,37 +16,46 @@ COLOR_ICONS = {PURPLE: "🟪", YELLOW: "🟨"}
 
 
 class Card:
+    __slots__ = ("color", "sticker", "id", "index", "space")
+
     def __init__(self, color: str, sticker: Dict[str, Any], *args, **kwargs):
         self.color = color
         self.sticker = sticker
+        self.id: int = sticker["id"]
+        # position in YELLOW_CARDS or PURPLE_CARDS
+        self.index: int = kwargs.pop("index", 0)
         if color == PURPLE:
             self.space:int = kwargs.pop("space", 1)
 
     def __eq__(self, obj):
-        return isinstance(obj, Card) and self.sticker["id"] == obj.sticker["id"]
+        return isinstance(obj, Card) and self.id == obj.id
+
+    def __hash__(self):
+        return hash(self.id)
 
     @staticmethod
-    def from_id(id: str):
-        # TODO: refactor it to resolve time complexity
-        for card in YELLOW_CARDS + PURPLE_CARDS:
-            if str(card.sticker["id"]) == id:
-                return card
-        # TODO: create a error class
-        raise Exception("Card not found!")
+    def from_id(id: Union[int, str]) -> "Card":
+        return REGISTRY.get(id)
 
     def __repr__(self):
         return f"{COLOR_ICONS[self.color]} ({str(self)})"
 
     def __str__(self):
-        return str(self.sticker["id"])
+        return str(self.id)
 
 
 PURPLE_CARDS = [
-    Card(PURPLE, sticker, space=space)
-    for sticker, space in zip(STICKERS_DICT[PURPLE], PURPLE_SPACE_LIST)
+    Card(PURPLE, sticker, space=space, index=index)
+    for index, (sticker, space) in enumerate(
+        zip(STICKERS_DICT[PURPLE], PURPLE_SPACE_LIST)
+    )
+]
+YELLOW_CARDS = [
+    Card(YELLOW, sticker, index=index)
+    for index, sticker in enumerate(STICKERS_DICT[YELLOW])
 ]
-YELLOW_CARDS = [Card(YELLOW, sticker) for sticker in STICKERS_DICT[YELLOW]]
+REGISTRY = CardRegistry(YELLOW_CARDS, PURPLE_CARDS)
 
 
-print("[INFO] Cards loaded")
+getLogger(__name__).debug("Cards loaded")
 del STICKERS_DICT, PURPLE_SPACE_LIST
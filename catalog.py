@@ -0,0 +1,190 @@
+"""
+Precompiled card catalog.
+
+stickers.json and purple_space.json are compiled into a small binary file
+(``cards.bin``) that is much cheaper to load than parsing the JSON sources.
+The file stores the size and mtime of both sources, so a stale catalog is
+detected and the JSON is used (and the catalog rebuilt) only when needed.
+
+Run ``python catalog.py`` to build the catalog explicitly.
+"""
+from logging import getLogger
+from os import path, replace, stat
+from struct import Struct
+from typing import Any, Dict, List, Optional, Tuple
+from zlib import crc32
+
+BASE_DIR = path.dirname(path.abspath(__file__))
+
+STICKERS_PATH = path.join(BASE_DIR, "stickers.json")
+PURPLE_SPACE_PATH = path.join(BASE_DIR, "purple_space.json")
+CATALOG_PATH = path.join(BASE_DIR, "cards.bin")
+
+MAGIC = b"YCCB"
+VERSION = 1
+
+# magic, version, (size, mtime_ns) of both sources, crc32 of the payload
+HEADER = Struct("<4sHQQQQI")
+# number of records in each section
+COUNTS = Struct("<IIII")
+# sticker id, access hash, purple space (0 for the other sections)
+RECORD = Struct("<qqB")
+
+# Order of the sections inside the payload.
+SECTIONS = ("yellow", "purple", "yellow_back", "purple_back")
+SINGLE_SECTIONS = ("yellow_back", "purple_back")
+
+Stickers = Dict[str, Any]
+
+logger = getLogger(__name__)
+
+
+class CatalogError(Exception):
+    pass
+
+
+def source_stamp() -> Tuple[int, int, int, int]:
+    """Size and mtime of the JSON sources, used to detect a stale catalog"""
+    stickers = stat(STICKERS_PATH)
+    spaces = stat(PURPLE_SPACE_PATH)
+    return (stickers.st_size, stickers.st_mtime_ns, spaces.st_size, spaces.st_mtime_ns)
+
+
+def load_json() -> Tuple[Stickers, List[int]]:
+    # imported lazily, the json module is not needed when the catalog is fresh
+    from json import load
+
+    with open(STICKERS_PATH) as f:
+        stickers = load(f)
+    with open(PURPLE_SPACE_PATH) as f:
+        spaces = load(f)
+    return stickers, spaces
+
+
+def encode(stickers: Stickers, spaces: List[int]) -> bytes:
+    """Encode the catalog payload (without header)"""
+    sections = []
+    for name in SECTIONS:
+        section = stickers.get(name, [])
+        if name in SINGLE_SECTIONS:
+            section = [section] if section else []
+        sections.append(section)
+
+    records = []
+    file_ids = []
+    for name, section in zip(SECTIONS, sections):
+        for i, sticker in enumerate(section):
+            space = spaces[i] if name == "purple" else 0
+            records.append(RECORD.pack(sticker["id"], sticker["access_hash"], space))
+            file_ids.append(sticker["file_id"])
+
+    return (
+        COUNTS.pack(*(len(section) for section in sections))
+        + b"".join(records)
+        + "\n".join(file_ids).encode()
+    )
+
+
+def decode(payload: bytes) -> Tuple[Stickers, List[int]]:
+    """Decode a catalog payload into the same shape as the JSON sources"""
+    counts = COUNTS.unpack_from(payload)
+    total = sum(counts)
+    records_end = COUNTS.size + RECORD.size * total
+
+    records = list(RECORD.iter_unpack(payload[COUNTS.size : records_end]))
+    file_ids = payload[records_end:].decode().split("\n") if total else []
+    if len(file_ids) != total:
+        raise CatalogError("Corrupted catalog")
+
+    stickers: Stickers = {}
+    spaces: List[int] = []
+    offset = 0
+    for name, count in zip(SECTIONS, counts):
+        end = offset + count
+        section = [
+            {"id": id, "access_hash": access_hash, "file_id": file_id}
+            for (id, access_hash, _), file_id in zip(
+                records[offset:end], file_ids[offset:end]
+            )
+        ]
+        if name == "purple":
+            spaces = [space for _, _, space in records[offset:end]]
+        offset = end
+
+        if name in SINGLE_SECTIONS:
+            if section:
+                stickers[name] = section[0]
+        else:
+            stickers[name] = section
+    return stickers, spaces
+
+
+def write(
+    stickers: Stickers,
+    spaces: List[int],
+    stamp: Tuple[int, int, int, int],
+    catalog_path: str = CATALOG_PATH,
+) -> None:
+    """Write already loaded card data as the binary catalog"""
+    payload = encode(stickers, spaces)
+    header = HEADER.pack(MAGIC, VERSION, *stamp, crc32(payload))
+
+    # write to a temporary file first so readers never see a partial catalog
+    tmp_path = catalog_path + ".tmp"
+    with open(tmp_path, "wb") as f:
+        f.write(header + payload)
+    replace(tmp_path, catalog_path)
+    logger.debug("Card catalog written to %s", catalog_path)
+
+
+def build(catalog_path: str = CATALOG_PATH) -> None:
+    """Compile the JSON sources into the binary catalog"""
+    stamp = source_stamp()
+    stickers, spaces = load_json()
+    write(stickers, spaces, stamp, catalog_path)
+
+
+def read(catalog_path: str = CATALOG_PATH) -> Optional[Tuple[Stickers, List[int]]]:
+    """Read the binary catalog, returns None if it is missing or outdated"""
+    try:
+        with open(catalog_path, "rb") as f:
+            data = f.read()
+    except OSError:
+        return None
+
+    if len(data) < HEADER.size:
+        return None
+    magic, version, *stamp, digest = HEADER.unpack_from(data)
+    if magic != MAGIC or version != VERSION or tuple(stamp) != source_stamp():
+        return None
+
+    payload = data[HEADER.size :]
+    if crc32(payload) != digest:
+        logger.warning("Card catalog checksum mismatch, ignoring %s", catalog_path)
+        return None
+    try:
+        return decode(payload)
+    except Exception:
+        logger.warning("Card catalog is corrupted, ignoring %s", catalog_path)
+        return None
+
+
+def load_stickers() -> Tuple[Stickers, List[int]]:
+    """Load the card data from the catalog, falling back to the JSON sources"""
+    catalog = read()
+    if catalog is not None:
+        return catalog
+
+    logger.info("Card catalog is missing or outdated, loading JSON sources")
+    stamp = source_stamp()
+    stickers, spaces = load_json()
+    try:
+        write(stickers, spaces, stamp)
+    except OSError:
+        logger.warning("Could not write card catalog to %s", CATALOG_PATH)
+    return stickers, spaces
+
+
+if __name__ == "__main__":
+    build()
+    print("[INFO] Card catalog built: " + CATALOG_PATH)
@@ -8,3 +8,16 @@ WORKERS = config.get("workers", 32)
 ADMIN_LIST = config.get("admin_list", None)
 OPEN_LOBBY = config.get("open_lobby", True)
 MIN_PLAYERS = config.get("min_players", 3)  # TODO: set to 3
+DEBUG = config.get("debug", False)
+MODE = config.get("mode", "polling")  # "polling" or "webhook"
+WEBHOOK = config.get("webhook", {})
+OUTBOX = config.get("outbox", {})  # see Outbox for the available options
+SNAPSHOT = config.get("snapshot", {"path": "games.snapshot", "interval": 60})
+SHARDS = config.get("shards", 1)  # worker processes playing the games
+LOGGING = config.get("logging", {})  # "level", "levels", "sampling", "format"
+METRICS = config.get("metrics", {})  # e.g. {"listen": "127.0.0.1", "port": 9100}
+JOURNAL = config.get("journal", {})  # e.g. {"path": "games.journal"}
+REAPER = config.get("reaper", {})  # see Reaper for the available options
+INLINE = config.get("inline", {})  # e.g. {"max_age": 5}, see InlineStage
+STATUS = config.get("status", {})  # e.g. {"delay": 1}, see StatusBoard
+STATS = config.get("stats", {})  # e.g. {"path": "stats.db"}, see StatsStore
@@ -1,29 +1,91 @@
 from __future__ import annotations
 
-from logging import getLogger
-from random import shuffle
-from typing import TYPE_CHECKING, List
+from array import array
+from functools import lru_cache
+from logging import DEBUG, getLogger
+from random import Random
+from typing import TYPE_CHECKING, List, Optional, Sequence
 
 from errors import DeckEmptyError
 
 if TYPE_CHECKING:
     from card import Card
 
+logger = getLogger(__name__)
+
+
+@lru_cache(maxsize=None)
+def unshuffled(size: int) -> array:
+    return array("H", range(size))
+
 
 class Deck:
-    def __init__(self):
-        self.cards = []
+    """
+    The cards left to draw, stored as indexes into a catalog of cards shared
+    by every game. The top of the deck is the end of the array.
+
+    The deck is shuffled lazily, one card at a time from the top (Fisher-Yates),
+    when cards are drawn or looked at: a game only pays for the cards it uses.
+    """
+
+    __slots__ = ("catalog", "random", "indexes", "shuffled")
+
+    def __init__(self, catalog: Sequence[Card] = (), rng: Optional[Random] = None):
+        self.catalog = catalog
+        # the generator of the game, which owns the order of every shuffle
+        self.random = rng or Random()
+        self.indexes = array("H")
+        # number of cards at the top already in their shuffled order
+        self.shuffled = 0
+
+    def init(self):
+        self.indexes = unshuffled(len(self.catalog))[:]
+        self.shuffled = 0
+
+    def __len__(self) -> int:
+        return len(self.indexes)
+
+    @property
+    def cards(self) -> List[Card]:
+        """The cards left, the top one last"""
+        return [self.catalog[index] for index in self.indexes]
+
+    def _shuffle(self, n: int):
+        """Put the top n cards in their shuffled order"""
+        indexes = self.indexes
+        size = len(indexes)
+        stop = size - n
+        if size - self.shuffled <= stop:
+            return
+        rand = self.random.random
+        for i in range(size - self.shuffled - 1, stop - 1, -1):
+            j = int(rand() * (i + 1))
+            indexes[i], indexes[j] = indexes[j], indexes[i]
+        self.shuffled = n
 
-        self.logger = getLogger(__name__)
-        self.logger.debug(self.cards)
+    def peek(self, n: int) -> List[Card]:
+        """The top n cards without drawing them, the top one last"""
+        n = min(n, len(self.indexes))
+        if n <= 0:
+            return []
+        self._shuffle(n)
+        return [self.catalog[index] for index in self.indexes[-n:]]
 
-    def init(self, cards: List[Card]):
-        self.cards = cards
-        shuffle(self.cards)
+    def draw_many(self, n: int) -> List[Card]:
+        """Draw n cards at once, in the order they would be drawn one by one"""
+        if n > len(self.indexes):
+            raise DeckEmptyError()
+        if n <= 0:
+            return []
+        self._shuffle(n)
+        drawn = self.indexes[-n:]
+        del self.indexes[-n:]
+        self.shuffled -= n
+        drawn.reverse()
+        cards = [self.catalog[index] for index in drawn]
+        if logger.isEnabledFor(DEBUG):
+            logger.debug("Drawing cards %s", cards)
+        return cards
 
     def draw(self) -> Card:
-        if len(self.cards) > 0:
-            card = self.cards.pop()
-            self.logger.debug("Drawing card " + str(card))
-            return card
-        raise DeckEmptyError()
+        return self.draw_many(1)[0]
@@ -23,3 +23,11 @@ class TooManyCardsError(Exception):
 
 class CanNotDiscardError(Exception):
     pass
+
+
+class CardNotFoundError(Exception):
+    pass
+
+
+class CardNotInHandError(Exception):
+    pass
@@ -0,0 +1,71 @@
+from collections import deque
+from concurrent.futures import Future, ThreadPoolExecutor
+from threading import Lock
+from typing import Callable, Deque, Dict, Hashable, Tuple
+
+Task = Tuple[Future, Callable, tuple, dict]
+
+
+class SerialExecutor:
+    """
+    Runs tasks on a thread pool with one mailbox per key.
+    Tasks with the same key (e.g. a chat id) run one after another in
+    submission order, tasks with different keys run in parallel.
+    """
+
+    def __init__(self, workers: int = 32):
+        self.pool = ThreadPoolExecutor(workers, thread_name_prefix="mailbox")
+        self.workers = workers
+        self.lock = Lock()
+        self.mailboxes: Dict[Hashable, Deque[Task]] = {}
+        # workers draining a mailbox right now
+        self.busy = 0
+        self.closed = False
+
+    def submit(self, key: Hashable, fn: Callable, *args, **kwargs) -> Future:
+        """Queue fn(*args, **kwargs) in the mailbox of the key"""
+        future = Future()
+        with self.lock:
+            if self.closed:
+                raise RuntimeError("cannot submit to a mailbox after shutdown")
+            mailbox = self.mailboxes.get(key)
+            # An existing mailbox is already being drained by a worker
+            idle = mailbox is None
+            if idle:
+                mailbox = self.mailboxes[key] = deque()
+            mailbox.append((future, fn, args, kwargs))
+            if idle:
+                # under the lock, so shutdown cannot close the pool in between
+                self.pool.submit(self._drain, key, mailbox)
+        return future
+
+    def _drain(self, key: Hashable, mailbox: Deque[Task]):
+        with self.lock:
+            self.busy += 1
+        while True:
+            with self.lock:
+                if not mailbox:
+                    del self.mailboxes[key]
+                    self.busy -= 1
+                    return
+                future, fn, args, kwargs = mailbox.popleft()
+
+            if not future.set_running_or_notify_cancel():
+                continue
+            try:
+                result = fn(*args, **kwargs)
+            except BaseException as e:
+                future.set_exception(e)
+            else:
+                future.set_result(result)
+
+    @property
+    def pending(self) -> int:
+        with self.lock:
+            return sum(len(mailbox) for mailbox in self.mailboxes.values())
+
+    def shutdown(self, wait: bool = True):
+        """Stop accepting work, optionally waiting for the mailboxes to drain"""
+        with self.lock:
+            self.closed = True
+        self.pool.shutdown(wait)
@@ -1,18 +1,40 @@
 from __future__ import annotations
 
+import os
+import time
 from enum import IntEnum
 from logging import getLogger
-from typing import TYPE_CHECKING, List, Optional
+from random import Random
+from typing import TYPE_CHECKING, List, NamedTuple, Optional, Tuple
 
 from board import Board
 from card import PURPLE_CARDS, YELLOW_CARDS
 from config import OPEN_LOBBY
 from deck import Deck
+from errors import DeckEmptyError
+from journal import Action, Journal
+from log import game_event
+from player import Player
+from scoreboard import Scoreboard
+from seating import Seating
 
 if TYPE_CHECKING:
-    from telegram import User
+    from card import Card
+    from player import UserRecord
 
-    from player import Player
+logger = getLogger(__name__)
+
+
+class GameView(NamedTuple):
+    """
+    An immutable snapshot of the game for readers on other threads,
+    such as inline queries, republished on every state change
+    """
+
+    state: int
+    current_player: Optional[Player]
+    purple: Optional[Card]
+    purple_choices: Tuple[Card, ...]
 
 
 class Game:
@@ -26,19 +48,71 @@ class Game:
         DISCARD = 4
         END = 5
 
-    current_player: Optional[User] = None
-    starter: Optional[User] = None
-    state: Game.State = State.START
-    open = OPEN_LOBBY
-
-    def __init__(self, chat):
+    __slots__ = (
+        "chat",
+        "starter",
+        "open",
+        "last_activity",
+        "seed",
+        "random",
+        "journal",
+        "seating",
+        "scoreboard",
+        "yellow_deck",
+        "purple_deck",
+        "board",
+        "_state",
+        "view",
+    )
+
+    def __init__(self, chat, seed: Optional[int] = None):
         self.chat = chat
-
-        self.yellow_deck = Deck()
-        self.purple_deck = Deck()
+        self.starter: Optional[UserRecord] = None
+        self.open = OPEN_LOBBY
+        # time.monotonic() of the last update of the game, see Reaper
+        self.last_activity = time.monotonic()
+
+        # every shuffle of the game draws from its own generator, so the game
+        # can be replayed from the seed and the journal of its actions
+        if seed is None:
+            seed = int.from_bytes(os.urandom(8), "big") >> 1
+        self.seed = seed
+        self.random = Random(seed)
+        self.journal = Journal()
+
+        self.seating = Seating()
+        self.scoreboard = Scoreboard()
+        self.yellow_deck = Deck(YELLOW_CARDS, self.random)
+        self.purple_deck = Deck(PURPLE_CARDS, self.random)
         self.board = Board(self)
 
-        self.logger = getLogger(__name__)
+        self.state = Game.State.START
+
+    @property
+    def state(self) -> Game.State:
+        return self._state
+
+    @state.setter
+    def state(self, state: int):
+        self._state = Game.State(state)
+        self.publish()
+
+    def publish(self):
+        """Replace the published view of the game"""
+        self.view = GameView(
+            self._state,
+            self.current_player,
+            self.board.purple,
+            tuple(self.purple_deck.peek(2)),
+        )
+
+    @property
+    def current_player(self) -> Optional[Player]:
+        return self.seating.current_player
+
+    @current_player.setter
+    def current_player(self, player: Player):
+        self.seating.current_player = player
 
     @property
     def started(self) -> bool:
@@ -49,18 +123,58 @@ class Game:
         return self.state == Game.State.END
 
     def start(self):
-        self.yellow_deck.init(YELLOW_CARDS.copy())
-        self.purple_deck.init(PURPLE_CARDS.copy())
+        self.yellow_deck.init()
+        self.purple_deck.init()
         self.board.init()
 
         self.state += 1
-        self.logger.info(f"{self.state} == {self.State.PURPLE}")
+        self.journal.record(Action.START, -1)
+        logger.debug("Game started", extra=game_event(self))
 
         for player in self.players:
             player.draw_first_hand()
 
+    def join(self, user) -> Player:
+        """A player joining a started game draws a hand at once
+
+        Raises:
+            DeckEmptyError: Not enough cards left for a hand
+        """
+        if self.started and len(self.yellow_deck) < 13:
+            raise DeckEmptyError()
+        player = Player(self, user)
+        if self.started:
+            player.draw_first_hand()
+        return player
+
+    def leave(self, player: Player):
+        """The turn passes on first when the current player leaves"""
+        if player is self.current_player:
+            if self.started:
+                self.turn()
+            else:
+                # nobody holds cards in the lobby, only the seat moves on
+                self.seating.turn()
+        player.leave()
+
+    def choose_loser(self, group: int) -> Player:
+        """The current player chose the worst group of the turn
+
+        Raises:
+            IndexError: There is no such group
+        """
+        loser = self.board.get_loser(group)
+        loser.score -= self.board.purple.space
+        self.board.loser = loser
+        self.journal.record(Action.LOSER, self.current_player.number, group)
+        logger.debug("Loser chosen", extra=game_event(self, loser))
+        # the game is over once a player lost too many times
+        if self.get_loser() is None:
+            self.state = Game.State.DISCARD
+        return loser
+
     def turn(self):
-        self.current_player = self.current_player.next
+        self.seating.turn()
         for player in self.players:
             player.draw()
         if self.board.loser:
@@ -69,21 +183,12 @@ class Game:
         self.state = self.State.PURPLE
 
     @property
-    def players(self):
-        if not self.current_player:
-            return []
-
-        players = []
-        current_player = self.current_player
-        itplayer = current_player.next
-        players.append(current_player)
-        while itplayer and itplayer is not current_player:
-            players.append(itplayer)
-            itplayer = itplayer.next
-        return players
+    def players(self) -> Tuple[Player, ...]:
+        """All players in turn order, starting from the current player"""
+        return self.seating.roster
 
     def get_end_count(self) -> int:
-        players_count = len(self.players)
+        players_count = len(self.seating)
         if players_count <= 5:
             return 6
         if players_count <= 7:
@@ -92,6 +197,9 @@ class Game:
 
     def get_loser(self) -> Optional[Player]:
         count = self.get_end_count()
+        if not self.scoreboard.reached(count):
+            return None
+        # the game is over, the first one in turn order who lost too much
         for player in self.players:
             if -player.score >= count:
                 return player
@@ -103,14 +211,8 @@ class Game:
             # TODO: 建一個 winners haven't appeared error
             raise Exception("Game is not ended")
 
-        highest_score = float("-inf")
-        for player in self.players:
-            if player.score > highest_score:
-                highest_score = player.score
-
-        winners = []
-        for player in self.players:
-            if player.score == highest_score:
-                winners.append(player)
-
-        return winners
+        # in turn order, starting from the current player
+        seats, current = len(self.seating), self.seating.current
+        return sorted(
+            self.scoreboard.leaders(), key=lambda player: (player.seat - current) % seats
+        )
@@ -1,4 +1,7 @@
+from functools import wraps
 from logging import getLogger
+from threading import RLock
+from typing import Callable, Dict, List, Optional, Set, Tuple
 
 from errors import (
     AlreadyJoinedError,
@@ -7,26 +10,76 @@ from errors import (
     NotEnoughPlayersError,
 )
 from game import Game
+from log import game_event
 from player import Player
 
 
+def locked(method):
+    """
+    Run the method while holding the manager's lock, and report the games it
+    ended to on_end once the outermost locked method released the lock
+    """
+
+    @wraps(method)
+    def wrapper(self, *args, **kwargs):
+        ended = []
+        try:
+            with self.lock:
+                self.depth += 1
+                try:
+                    return method(self, *args, **kwargs)
+                finally:
+                    self.depth -= 1
+                    if not self.depth:
+                        ended, self.ended = self.ended, []
+        finally:
+            # on_end writes to disk, the other chats do not wait for it
+            for game in ended:
+                self.on_end(game)
+
+    return wrapper
+
+
 class GameManager:
     """Manage all running games."""
 
-    def __init__(self):
-        self.chatid_games = {}
-        self.userid_players = {}
-        self.userid_current = {}
+    def __init__(self, debug: bool = False):
+        self.chatid_games: Dict[int, List[Game]] = {}
+        self.userid_players: Dict[int, List[Player]] = {}
+        self.userid_current: Dict[int, Player] = {}
+
+        # Secondary indexes, kept in sync with the dicts above
+        self.user_chat_players: Dict[Tuple[int, int], Player] = {}
+        self.chatid_active: Dict[int, Game] = {}
+        self.userid_chats: Dict[int, Set[int]] = {}
+
+        # Verify the indexes after every mutation
+        self.debug = debug
+
+        # Called with (user_id, chat_id, joined) whenever the current game of
+        # a user changes, chat_id is None once the user is in no game at all
+        self.on_current: Optional[Callable[[int, Optional[int], bool], None]] = None
+        # Called with every game that ends, e.g. to keep its journal
+        self.on_end: Optional[Callable[[Game], None]] = None
+
+        # Games run in their own mailbox, but a user can play in several
+        # chats, so the bookkeeping shared between chats is guarded here
+        self.lock = RLock()
+        # nesting of the locked methods on the thread holding the lock, and
+        # the games they ended, reported when the outermost one returns
+        self.depth = 0
+        self.ended: List[Game] = []
 
         self.logger = getLogger(__name__)
 
+    @locked
     def new_game(self, chat):
         """
         Create a new game in this chat
         """
         chat_id = chat.id
 
-        self.logger.debug("Creating new game in chat " + str(chat_id))
+        self.logger.debug("Creating new game in chat %s", chat_id)
         game = Game(chat)
 
         if chat_id not in self.chatid_games:
@@ -38,30 +91,26 @@ class GameManager:
                 self.chatid_games[chat_id].remove(g)
 
         self.chatid_games[chat_id].append(game)
+        self.chatid_active[chat_id] = game
+
+        self.check_invariants()
         return game
 
+    @locked
     def join_game(self, user, chat):
         """ Create a player from the Telegram user and add it to the game """
-        self.logger.info("Joining game with id " + str(chat.id))
-
-        try:
-            game = self.chatid_games[chat.id][-1]
-        except (KeyError, IndexError):
+        game = self.active_game(chat.id)
+        if game is None:
             raise NoGameInChatError()
 
         if not game.open:
             raise LobbyClosedError()
 
-        if user.id not in self.userid_players:
-            self.userid_players[user.id] = list()
-
-        players = self.userid_players[user.id]
-
         # Don not re-add a player and remove the player from previous games in
         # this chat, if he is in one of them
-        for player in players:
-            if player in game.players:
-                raise AlreadyJoinedError()
+        player = self.user_chat_players.get((user.id, chat.id))
+        if player is not None and player.game is game:
+            raise AlreadyJoinedError()
 
         try:
             self.leave_game(user, chat)
@@ -70,35 +119,21 @@ class GameManager:
         except NotEnoughPlayersError:
             self.end_game(chat, user)
 
-            if user.id not in self.userid_players:
-                self.userid_players[user.id] = list()
-
-            players = self.userid_players[user.id]
+        player = game.join(user)
+        self.logger.info("Player joined", extra=game_event(game, player))
 
-        player = Player(game, user)
-        if game.started:
-            player.draw_first_hand()
+        self.userid_players.setdefault(user.id, list()).append(player)
+        self._index_player(player)
+        self._set_current(user.id, player, joined=True)
 
-        players.append(player)
-        self.userid_current[user.id] = player
+        self.check_invariants()
 
+    @locked
     def leave_game(self, user, chat):
         """ Remove a player from its current game """
 
         player = self.player_for_user_in_chat(user, chat)
-        players = self.userid_players.get(user.id, list())
-
         if not player:
-            games = self.chatid_games[chat.id]
-            for g in games:
-                for p in g.players:
-                    if p.user.id == user.id:
-                        if p is g.current_player:
-                            g.turn()
-
-                        p.leave()
-                        return
-
             raise NoGameInChatError
 
         game = player.game
@@ -106,23 +141,15 @@ class GameManager:
         if len(game.players) < 3:
             raise NotEnoughPlayersError()
 
-        if player is game.current_player:
-            game.turn()
-
-        player.leave()
-        players.remove(player)
+        game.leave(player)
+        self._remove_player(player)
 
-        # If this is the selected game, switch to another
-        if self.userid_current.get(user.id, None) is player:
-            if players:
-                self.userid_current[user.id] = players[0]
-            else:
-                del self.userid_current[user.id]
-                del self.userid_players[user.id]
+        self.check_invariants()
 
+    @locked
     def end_game(self, chat, user):
         """ End a game  """
-        self.logger.info("Game in chat " + str(chat.id) + " ended")
+        self.logger.info("Game in chat %s ended", chat.id)
 
         # Find the correct game instance to end
         player = self.player_for_user_in_chat(user, chat)
@@ -130,41 +157,130 @@ class GameManager:
         if not player:
             raise NoGameInChatError
 
-        game = player.game
+        self.remove_game(player.game)
+
+    @locked
+    def remove_game(self, game: Game):
+        """End the game and drop it and its players from every index"""
+        chat_id = game.chat.id
+        games = self.chatid_games.get(chat_id, [])
+        if game not in games:
+            return
         game.state = game.State.END
 
         # Clear game
         for player_in_game in game.players:
-            this_users_players = self.userid_players.get(player_in_game.user.id, list())
+            self._remove_player(player_in_game)
 
-            try:
-                this_users_players.remove(player_in_game)
-            except ValueError:
-                pass
+        if self.on_end:
+            self.ended.append(game)
 
-            if this_users_players:
-                try:
-                    self.userid_current[player_in_game.user.id] = this_users_players[0]
-                except KeyError:
-                    pass
-            else:
-                try:
-                    del self.userid_players[player_in_game.user.id]
-                except KeyError:
-                    pass
+        games.remove(game)
+        if games:
+            self.chatid_active[chat_id] = games[-1]
+        else:
+            del self.chatid_games[chat_id]
+            del self.chatid_active[chat_id]
 
-                try:
-                    del self.userid_current[player_in_game.user.id]
-                except KeyError:
-                    pass
-
-        self.chatid_games[chat.id].remove(game)
-        if not self.chatid_games[chat.id]:
-            del self.chatid_games[chat.id]
-
-    def player_for_user_in_chat(self, user, chat):
-        players = self.userid_players.get(user.id, list())
-        for player in players:
-            if player.game.chat.id == chat.id:
-                return player
-        return None
+        self.check_invariants()
+
+    def games(self) -> List[Game]:
+        """Every managed game"""
+        with self.lock:
+            return [game for games in self.chatid_games.values() for game in games]
+
+    def active_game(self, chat_id: int) -> Optional[Game]:
+        """The latest game in this chat"""
+        return self.chatid_active.get(chat_id)
+
+    def player_for_user_in_chat(self, user, chat) -> Optional[Player]:
+        return self.user_chat_players.get((user.id, chat.id))
+
+    def _index_player(self, player: Player):
+        user_id, chat_id = player.user.id, player.game.chat.id
+        self.user_chat_players[(user_id, chat_id)] = player
+        self.userid_chats.setdefault(user_id, set()).add(chat_id)
+
+    def _remove_player(self, player: Player):
+        """Drop the player from every index and switch the user's current game"""
+        user_id, chat_id = player.user.id, player.game.chat.id
+
+        if self.user_chat_players.get((user_id, chat_id)) is player:
+            del self.user_chat_players[(user_id, chat_id)]
+            chats = self.userid_chats[user_id]
+            chats.discard(chat_id)
+            if not chats:
+                del self.userid_chats[user_id]
+
+        players = self.userid_players.get(user_id, list())
+        try:
+            players.remove(player)
+        except ValueError:
+            pass
+
+        if players:
+            # If this is the selected game, switch to another
+            if self.userid_current.get(user_id) is player:
+                self._set_current(user_id, players[0])
+        else:
+            self.userid_players.pop(user_id, None)
+            self._set_current(user_id, None)
+
+    def _set_current(self, user_id: int, player: Optional[Player], joined=False):
+        if player is None:
+            if self.userid_current.pop(user_id, None) is None:
+                return
+        else:
+            self.userid_current[user_id] = player
+        if self.on_current:
+            chat_id = player.game.chat.id if player else None
+            self.on_current(user_id, chat_id, joined)
+
+    def check_invariants(self):
+        """Verify the secondary indexes against the primary data in debug mode"""
+        if not self.debug:
+            return
+
+        def check(condition: bool, message: str):
+            if not condition:
+                raise AssertionError("GameManager index out of sync: " + message)
+
+        for chat_id, games in self.chatid_games.items():
+            check(bool(games), f"empty game list of chat {chat_id}")
+
+        user_chat_players = {}
+        userid_chats = {}
+        for user_id, players in self.userid_players.items():
+            check(bool(players), f"empty player list of user {user_id}")
+            check(
+                self.userid_current.get(user_id) in players,
+                f"current player of user {user_id} is not one of its players",
+            )
+            for player in players:
+                key = (user_id, player.game.chat.id)
+                check(key not in user_chat_players, f"user {key} has two players")
+                check(
+                    player.game in self.chatid_games.get(key[1], ()),
+                    f"game of player {key} is not managed",
+                )
+                check(player in player.game.players, f"player {key} is not seated")
+                user_chat_players[key] = player
+                userid_chats.setdefault(user_id, set()).add(key[1])
+
+        check(
+            self.userid_current.keys() == self.userid_players.keys(),
+            "userid_current and userid_players have different users",
+        )
+        check(
+            user_chat_players == self.user_chat_players,
+            "user_chat_players does not match userid_players",
+        )
+        check(
+            userid_chats == self.userid_chats,
+            "userid_chats does not match userid_players",
+        )
+        check(
+            {chat_id: games[-1] for chat_id, games in self.chatid_games.items()}
+            == self.chatid_active,
+            "chatid_active does not match chatid_games",
+        )
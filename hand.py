@@ -0,0 +1,69 @@
+from __future__ import annotations
+
+from typing import TYPE_CHECKING, Dict, Iterable, Iterator, Tuple, Union
+
+from errors import CardNotInHandError
+
+if TYPE_CHECKING:
+    from card import Card
+
+
+class Hand:
+    """
+    The yellow cards of a player, in the order they were drawn.
+
+    Cards are keyed by id, so membership and removal take constant time.
+    Every change bumps the version. `view` is an immutable (version, cards)
+    snapshot for readers on other threads and for caches, built on the first
+    read after a change.
+    """
+
+    __slots__ = ("_cards", "version", "_view")
+
+    def __init__(self, cards: Iterable[Card] = ()):
+        self._cards: Dict[int, Card] = {card.id: card for card in cards}
+        self.version = 1
+        self._view: Tuple[int, Tuple[Card, ...]] = (0, ())
+
+    @property
+    def view(self) -> Tuple[int, Tuple[Card, ...]]:
+        view = self._view
+        if view[0] != self.version:
+            # NOTE: the version is read first, a change meanwhile only makes
+            # the snapshot newer than its version; the tuple is built without
+            # releasing the GIL
+            version = self.version
+            view = self._view = (version, tuple(self._cards.values()))
+        return view
+
+    @property
+    def cards(self) -> Tuple[Card, ...]:
+        return self.view[1]
+
+    def __len__(self) -> int:
+        return len(self._cards)
+
+    def __iter__(self) -> Iterator[Card]:
+        return iter(self.view[1])
+
+    def __contains__(self, card: Union[Card, int]) -> bool:
+        return getattr(card, "id", card) in self._cards
+
+    def add(self, cards: Iterable[Card]):
+        for card in cards:
+            self._cards[card.id] = card
+        self.version += 1
+
+    def remove(self, card: Card):
+        """
+        Raises:
+            CardNotInHandError: The player does not hold the card, for example
+                when a stale inline result is chosen
+        """
+        if self._cards.pop(card.id, None) is None:
+            raise CardNotInHandError()
+        self.version += 1
+
+    def clear(self):
+        self._cards.clear()
+        self.version += 1
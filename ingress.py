@@ -0,0 +1,61 @@
+"""
+Drops the updates no handler acts on before they are dispatched.
+
+In large groups most updates come from users who are not playing: members
+joining, pinned messages, plain chat, buttons pressed by onlookers. The
+filter runs first on the dispatcher thread, reads the indexes the
+GameManager keeps anyway (users in a game, players by chat) and stops the
+irrelevant updates before any handler or worker thread sees them.
+"""
+from __future__ import annotations
+
+from collections import Counter
+from typing import TYPE_CHECKING, Optional
+
+from telegram.ext import DispatcherHandlerStop, Filters
+
+if TYPE_CHECKING:
+    from telegram.ext.callbackcontext import CallbackContext
+    from telegram.update import Update
+
+    from game_manager import GameManager
+
+
+class IngressFilter:
+    """The callback of a TypeHandler(Update) in a group before the handlers"""
+
+    def __init__(self, gm: GameManager):
+        self.gm = gm
+        # dropped updates by kind, only written by the dispatcher thread
+        self.stats: Counter = Counter()
+
+    def __call__(self, update: Update, context: CallbackContext):
+        kind = self.irrelevant(update)
+        if kind is not None:
+            self.stats[kind] += 1
+            raise DispatcherHandlerStop()
+
+    def irrelevant(self, update: Update) -> Optional[str]:
+        """The kind of an update no handler acts on, None for the others"""
+        if update.message:
+            return self.irrelevant_message(update)
+        if update.inline_query:
+            # NOTE: users without a game are told so
+            return None
+        if update.chosen_inline_result:
+            user = update.chosen_inline_result.from_user
+            return None if user.id in self.gm.userid_current else "chosen_inline_result"
+        if update.callback_query:
+            user = update.callback_query.from_user
+            return None if user.id in self.gm.userid_current else "callback_query"
+        return "other"
+
+    def irrelevant_message(self, update: Update) -> Optional[str]:
+        """Commands, and players leaving the group of their game, are relevant"""
+        message = update.message
+        if message.text is not None:
+            return None if message.text.startswith("/") else "message"
+        left = message.left_chat_member
+        if left is not None and (left.id, message.chat_id) in self.gm.user_chat_players:
+            return None
+        return "status_update" if Filters.status_update(update) else "message"
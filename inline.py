@@ -0,0 +1,84 @@
+"""
+Front stage of the inline queries.
+
+Telegram sends a new inline query on almost every keystroke after "選牌！".
+Per user, at most one query is answered at a time and at most one waits:
+- a newer query replaces the waiting one (coalesced), only the latest
+  results matter to the client,
+- a query that waited longer than max_age is not answered (stale), the
+  client has moved on already.
+Queries are taken on the dispatcher thread, which only records them, so
+the worker threads stay free for the updates that advance the games.
+"""
+from __future__ import annotations
+
+import time
+from collections import Counter
+from threading import Lock
+from typing import Callable, Dict, Optional, Tuple
+
+from telegram.ext.callbackcontext import CallbackContext
+from telegram.update import Update
+
+Query = Tuple[Update, CallbackContext, float]
+
+
+class InlineStage:
+    def __init__(
+        self,
+        answer: Callable[[Update, CallbackContext], object],
+        run_async: Callable,
+        error: Optional[Callable[[Update, Exception], object]] = None,
+        max_age: float = 5,
+    ):
+        """
+        Args:
+            answer: The handler computing and answering a query
+            run_async: Runs a function on the worker threads, e.g.
+                Dispatcher.run_async
+            error: Called with the update and the exception raised by answer
+            max_age (float): Seconds a query may wait before it is dropped
+        """
+        self.answer = answer
+        self.run_async = run_async
+        self.error = error
+        self.max_age = max_age
+
+        self.lock = Lock()
+        # users with a query being answered, to the newest query waiting
+        self.waiting: Dict[int, Optional[Query]] = {}
+        # queries by result: answered, coalesced or stale
+        self.stats: Counter = Counter()
+
+    def __call__(self, update: Update, context: CallbackContext):
+        """The handler of the inline queries, takes the query of the user"""
+        user_id = update.inline_query.from_user.id
+        query = (update, context, time.monotonic())
+        with self.lock:
+            busy = user_id in self.waiting
+            if busy and self.waiting[user_id] is not None:
+                self.stats["coalesced"] += 1
+            self.waiting[user_id] = query
+        if not busy:
+            self.run_async(self._drain, user_id)
+
+    def _drain(self, user_id: int):
+        """Answer the newest query of the user until none is waiting"""
+        while True:
+            with self.lock:
+                query = self.waiting[user_id]
+                if query is None:
+                    del self.waiting[user_id]
+                    return
+                self.waiting[user_id] = None
+                stale = time.monotonic() - query[2] > self.max_age
+                self.stats["stale" if stale else "answered"] += 1
+            if stale:
+                continue
+
+            update, context, _ = query
+            try:
+                self.answer(update, context)
+            except Exception as e:
+                if self.error:
+                    self.error(update, e)
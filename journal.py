@@ -0,0 +1,92 @@
+"""
+Per-game action journal.
+
+Every game owns a random.Random seeded when the game is created, so a game
+is fully determined by its seed and the actions of its players. The journal
+records those actions in a compact append-only array of (action, player,
+argument) triples, where the player is numbered in order of joining and -1
+stands for the game itself. replay.py rebuilds a game from its seed and
+journal.
+"""
+from __future__ import annotations
+
+import base64
+import json
+from array import array
+from enum import IntEnum
+from logging import getLogger
+from typing import Iterator, Tuple
+
+logger = getLogger(__name__)
+
+
+class Action(IntEnum):
+    # argument: the user id
+    JOIN = 1
+    LEAVE = 2
+    START = 3
+    # argument: the index of the card in PURPLE_CARDS or YELLOW_CARDS
+    PURPLE = 4
+    YELLOW = 5
+    # argument: the group chosen as the worst
+    LOSER = 6
+    # argument: the number of cards the loser will discard
+    DISCARDS = 7
+    # argument: the index of the discarded card in YELLOW_CARDS
+    DISCARD = 8
+    SKIP = 9
+
+
+Entry = Tuple[Action, int, int]
+
+
+class Journal:
+    __slots__ = ("entries", "joins")
+
+    def __init__(self, data: bytes = b""):
+        self.entries = array("q")
+        self.entries.frombytes(data)
+        # the number of players who joined, the number of the next one
+        self.joins = self.entries[::3].count(Action.JOIN)
+
+    def record(self, action: Action, player: int, argument: int = 0):
+        self.entries.extend((action, player, argument))
+        if action == Action.JOIN:
+            self.joins += 1
+
+    def __len__(self) -> int:
+        return len(self.entries) // 3
+
+    def __iter__(self) -> Iterator[Entry]:
+        entries = self.entries
+        for i in range(0, len(entries), 3):
+            yield Action(entries[i]), entries[i + 1], entries[i + 2]
+
+    def tobytes(self) -> bytes:
+        return self.entries.tobytes()
+
+
+def encode_journal(chat_id: int, seed: int, journal: Journal) -> str:
+    """A line of a journal file"""
+    data = base64.b64encode(journal.tobytes()).decode()
+    return json.dumps({"chat_id": chat_id, "seed": seed, "journal": data})
+
+
+def decode_journal(line: str) -> Tuple[int, int, Journal]:
+    data = json.loads(line)
+    return data["chat_id"], data["seed"], Journal(base64.b64decode(data["journal"]))
+
+
+class JournalWriter:
+    """Appends the journals of finished games to a file, one game per line"""
+
+    def __init__(self, path: str):
+        self.path = path
+
+    def write(self, game):
+        line = encode_journal(game.chat.id, game.seed, game.journal)
+        try:
+            with open(self.path, "a") as f:
+                f.write(line + "\n")
+        except OSError:
+            logger.exception("Could not write the journal to %s", self.path)
@@ -0,0 +1,199 @@
+"""
+Non-blocking, structured logging.
+
+Handler threads only put records on a queue, a QueueListener thread formats
+and writes them. Events of a game carry structured fields (chat_id, state,
+player, card) given with `extra=game_event(...)`, read as the record is
+queued and written as key=value pairs or as JSON lines.
+
+Levels and sampling rates can be changed per module at runtime, e.g. keep
+1% of the debug events of the board with set_sampling("board", 0.01).
+"""
+from __future__ import annotations
+
+import atexit
+import json
+import logging
+from logging.handlers import QueueHandler, QueueListener
+from queue import SimpleQueue
+from random import Random
+from typing import Dict, List, Optional, TextIO, Union
+
+FORMAT = "%(asctime)s - %(name)s - %(levelname)s - %(message)s"
+
+
+def game_event(game=None, player=None, card=None) -> dict:
+    """The structured fields of an event of a game, for `extra`"""
+    return {"game": game, "player": player, "card": card}
+
+
+def event_fields(record: logging.LogRecord) -> Dict[str, object]:
+    """Read the fields of the objects passed with game_event"""
+    fields = {}
+    game = getattr(record, "game", None)
+    if game is not None:
+        if game.chat is not None:
+            fields["chat_id"] = game.chat.id
+        fields["state"] = game.state.name
+    player = getattr(record, "player", None)
+    if player is not None:
+        fields["player"] = getattr(player.user, "id", player.user)
+    card = getattr(record, "card", None)
+    if card is not None:
+        fields["card"] = card.id
+    return fields
+
+
+class EventQueueHandler(QueueHandler):
+    """
+    Reads the fields of the event in the calling thread, while the game
+    cannot change, and drops the references to the game objects. The record
+    is formatted and written by the listener.
+    """
+
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        record.fields = event_fields(record)
+        record.game = record.player = record.card = None
+        # the arguments may change once the call returns
+        record.msg = record.getMessage()
+        record.args = None
+        if record.exc_info:
+            record.exc_text = logging.Formatter().formatException(record.exc_info)
+            record.exc_info = None
+        return record
+
+
+class TextFormatter(logging.Formatter):
+    def format(self, record: logging.LogRecord) -> str:
+        text = super().format(record)
+        fields = getattr(record, "fields", None)
+        if fields:
+            text += " " + " ".join(f"{key}={value}" for key, value in fields.items())
+        return text
+
+
+class JsonFormatter(logging.Formatter):
+    def format(self, record: logging.LogRecord) -> str:
+        data = {
+            "time": self.formatTime(record),
+            "level": record.levelname,
+            "logger": record.name,
+            "message": record.getMessage(),
+        }
+        data.update(getattr(record, "fields", None) or {})
+        return json.dumps(data, ensure_ascii=False)
+
+
+class SamplingFilter(logging.Filter):
+    """Keeps a fraction of the records below WARNING of each module"""
+
+    def __init__(self, rates: Optional[Dict[str, float]] = None):
+        super().__init__()
+        self.rates: Dict[str, float] = dict(rates or {})
+        # not the global random, which the games use
+        self.random = Random()
+
+    def rate(self, name: str) -> float:
+        """The rate of the module or of its closest parent"""
+        while True:
+            if name in self.rates:
+                return self.rates[name]
+            if "." not in name:
+                return 1.0
+            name = name.rsplit(".", 1)[0]
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        if record.levelno >= logging.WARNING or not self.rates:
+            return True
+        return self.random.random() < self.rate(record.name)
+
+
+sampling = SamplingFilter()
+listener: Optional[QueueListener] = None
+handlers: List[logging.Handler] = []
+
+
+def setup(config: dict, stream: Optional[TextIO] = None):
+    """
+    Send every log record through a queue. Idempotent, every process sets
+    up its own listener.
+
+    Args:
+        config (dict): "level", "levels" and "sampling" by module and
+            "format" ("text" or "json")
+        stream: Where the records are written, stderr by default
+    """
+    global listener
+    if listener is not None:
+        return
+
+    # the formats need neither the caller, the thread nor the process
+    logging._srcfile = None
+    logging.logThreads = logging.logProcesses = logging.logMultiprocessing = False
+
+    handler = logging.StreamHandler(stream)
+    if config.get("format") == "json":
+        handler.setFormatter(JsonFormatter())
+    else:
+        handler.setFormatter(TextFormatter(FORMAT))
+    handlers[:] = [handler]
+
+    queue_handler = EventQueueHandler(SimpleQueue())
+    queue_handler.addFilter(sampling)
+    root = logging.getLogger()
+    for old in list(root.handlers):
+        root.removeHandler(old)
+    root.addHandler(queue_handler)
+    root.setLevel(config.get("level", "INFO"))
+    for name, level in config.get("levels", {}).items():
+        set_level(name, level)
+    for name, rate in config.get("sampling", {}).items():
+        set_sampling(name, rate)
+
+    listener = QueueListener(queue_handler.queue, *handlers, respect_handler_level=True)
+    listener.start()
+    atexit.register(shutdown)
+
+
+def shutdown():
+    """Write the queued records, later records are written synchronously"""
+    global listener
+    if listener is None:
+        return
+    listener.stop()
+    listener = None
+    root = logging.getLogger()
+    for handler in list(root.handlers):
+        if isinstance(handler, EventQueueHandler):
+            root.removeHandler(handler)
+    for handler in handlers:
+        handler.addFilter(sampling)
+        root.addHandler(handler)
+
+
+def set_level(name: str, level: Union[int, str]):
+    """
+    Raises:
+        ValueError: Unknown level name
+    """
+    logging.getLogger(name).setLevel(level.upper() if isinstance(level, str) else level)
+
+
+def set_sampling(name: str, rate: float):
+    if rate >= 1:
+        sampling.rates.pop(name, None)
+    else:
+        sampling.rates[name] = max(rate, 0.0)
+
+
+def describe() -> str:
+    """The levels and sampling rates, for the /log command"""
+    manager = logging.Logger.manager
+    lines = [f"root: {logging.getLevelName(logging.getLogger().level)}"]
+    for name in sorted(manager.loggerDict):
+        logger = manager.loggerDict[name]
+        if isinstance(logger, logging.Logger) and logger.level != logging.NOTSET:
+            lines.append(f"{name}: {logging.getLevelName(logger.level)}")
+    for name, rate in sorted(sampling.rates.items()):
+        lines.append(f"{name}: sampling {rate:g}")
+    return "\n".join(lines)
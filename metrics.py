@@ -0,0 +1,300 @@
+"""
+Handler and Bot API metrics.
+
+Latency histograms per handler and per Bot API method, the number of Bot
+API calls each update causes, error counts by exception type and gauges
+read when the metrics are collected. They are exposed as Prometheus text
+by MetricsServer and summarized by the /metrics command.
+
+Recording a value takes no lock and costs about a microsecond, so the
+metrics stay on in production (see test/bench_metrics.py).
+"""
+from __future__ import annotations
+
+from bisect import bisect_left
+from collections import Counter
+from functools import wraps
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from logging import getLogger
+from threading import Lock, Thread, local
+from time import perf_counter
+from typing import Callable, Dict, List, Optional, Sequence, Tuple
+
+PREFIX = "yellowcards_"
+
+# 0.1 ms to 10 s
+LATENCY_BUCKETS = tuple(
+    round(base * 10**exponent, 5) for exponent in range(-4, 2) for base in (1, 2.5, 5)
+)[:-2]
+CALL_BUCKETS = (0, 1, 2, 3, 5, 8, 13, 21)
+
+logger = getLogger(__name__)
+
+
+class HistogramShard:
+    """The observations of one thread"""
+
+    __slots__ = ("counts", "sum", "count")
+
+    def __init__(self, size: int):
+        self.counts = [0] * size
+        self.sum = 0.0
+        self.count = 0
+
+
+class Histogram:
+    """
+    Every thread records into its own shard, so observing takes no lock and
+    threads never wait for each other. Reading sums the shards.
+    """
+
+    def __init__(self, buckets: Sequence[float] = LATENCY_BUCKETS):
+        self.buckets = tuple(buckets)
+        self.shards: List[HistogramShard] = []
+        self.local = local()
+        self.lock = Lock()
+
+    def _shard(self) -> HistogramShard:
+        # the last count is for the values above every bucket
+        shard = self.local.shard = HistogramShard(len(self.buckets) + 1)
+        with self.lock:
+            self.shards.append(shard)
+        return shard
+
+    def observe(self, value: float):
+        try:
+            shard = self.local.shard
+        except AttributeError:
+            shard = self._shard()
+        shard.counts[bisect_left(self.buckets, value)] += 1
+        shard.sum += value
+        shard.count += 1
+
+    def snapshot(self) -> Tuple[List[int], float, int]:
+        """The counts of each bucket, the sum and the count"""
+        counts = [0] * (len(self.buckets) + 1)
+        total = 0.0
+        for shard in list(self.shards):
+            counts = [a + b for a, b in zip(counts, shard.counts)]
+            total += shard.sum
+        return counts, total, sum(counts)
+
+    @property
+    def count(self) -> int:
+        return sum(shard.count for shard in list(self.shards))
+
+    @property
+    def sum(self) -> float:
+        return sum(shard.sum for shard in list(self.shards))
+
+    def quantile(self, q: float) -> float:
+        """Estimated from the buckets, like Prometheus' histogram_quantile"""
+        counts, _, count = self.snapshot()
+        if count == 0:
+            return 0.0
+        rank = q * count
+        seen = 0
+        for index, bucket_count in enumerate(counts):
+            if seen + bucket_count >= rank and bucket_count:
+                if index == len(self.buckets):
+                    return self.buckets[-1]
+                lower = self.buckets[index - 1] if index else 0
+                upper = self.buckets[index]
+                return lower + (upper - lower) * (rank - seen) / bucket_count
+            seen += bucket_count
+        return self.buckets[-1]
+
+    def render(self, name: str, labels: str = "") -> List[str]:
+        counts, total, count = self.snapshot()
+        separator = "," if labels else ""
+        lines = []
+        cumulative = 0
+        for bucket, bucket_count in zip(self.buckets, counts):
+            cumulative += bucket_count
+            bucket_labels = f'{labels}{separator}le="{bucket}"'
+            lines.append(f"{name}_bucket{{{bucket_labels}}} {cumulative}")
+        lines.append(f'{name}_bucket{{{labels}{separator}le="+Inf"}} {count}')
+        braces = f"{{{labels}}}" if labels else ""
+        lines.append(f"{name}_sum{braces} {total}")
+        lines.append(f"{name}_count{braces} {count}")
+        return lines
+
+
+class Metrics:
+    def __init__(self, enabled: bool = True):
+        self.enabled = enabled
+        self.lock = Lock()
+        self.handlers: Dict[str, Histogram] = {}
+        self.api: Dict[str, Histogram] = {}
+        self.calls_per_update = Histogram(CALL_BUCKETS)
+        self.errors = Counter()
+        self.gauges: Dict[str, Tuple[str, Callable[[], float]]] = {}
+        self.counters: Dict[str, Tuple[str, str, Callable[[], dict]]] = {}
+        # Bot API calls of the update handled by the current thread
+        self.local = local()
+
+    def histogram(self, family: Dict[str, Histogram], label: str) -> Histogram:
+        histogram = family.get(label)
+        if histogram is None:
+            with self.lock:
+                histogram = family.setdefault(label, Histogram())
+        return histogram
+
+    def gauge(self, name: str, help: str, read: Callable[[], float]):
+        """A value read when the metrics are collected"""
+        self.gauges[PREFIX + name] = (help, read)
+
+    def counter(self, name: str, help: str, label: str, read: Callable[[], dict]):
+        """Counts by label, read when the metrics are collected"""
+        self.counters[PREFIX + name] = (help, label, read)
+
+    def count_error(self, error: BaseException):
+        with self.lock:
+            self.errors[type(error).__name__] += 1
+
+    def count_call(self):
+        """A Bot API call caused by the update of this thread"""
+        state = self.local
+        if state.__dict__.get("calls") is not None:
+            state.calls += 1
+
+    def observe_api(self, method: str, seconds: float):
+        self.histogram(self.api, method).observe(seconds)
+
+    def timed(self, callback: Callable) -> Callable:
+        """Wrap a handler to record its latency, errors and Bot API calls"""
+        if not self.enabled:
+            return callback
+        histogram = self.histogram(self.handlers, callback.__name__)
+
+        @wraps(callback)
+        def handler(update, context):
+            state = self.local
+            state.calls = 0
+            start = perf_counter()
+            try:
+                return callback(update, context)
+            except Exception as e:
+                self.count_error(e)
+                raise
+            finally:
+                histogram.observe(perf_counter() - start)
+                self.calls_per_update.observe(state.calls)
+                state.calls = None
+
+        return handler
+
+    def render(self) -> str:
+        """The metrics in the Prometheus text format"""
+        lines = []
+        for name, (help, read) in self.gauges.items():
+            lines += [f"# HELP {name} {help}", f"# TYPE {name} gauge", f"{name} {read()}"]
+
+        with self.lock:
+            errors = dict(self.errors)
+        counters = dict(self.counters)
+        counters[PREFIX + "errors_total"] = ("Errors by type", "type", lambda: errors)
+        for name, (help, label, read) in counters.items():
+            lines += [f"# HELP {name} {help}", f"# TYPE {name} counter"]
+            for value, count in sorted(read().items()):
+                lines.append(f'{name}{{{label}="{value}"}} {count}')
+
+        families = (
+            ("handler_seconds", "Handler latency", "handler", self.handlers),
+            ("api_seconds", "Bot API call latency", "method", self.api),
+        )
+        for name, help, label, family in families:
+            name = PREFIX + name
+            lines += [f"# HELP {name} {help}", f"# TYPE {name} histogram"]
+            for value, histogram in sorted(family.items()):
+                lines += histogram.render(name, f'{label}="{value}"')
+
+        name = PREFIX + "update_api_calls"
+        lines += [f"# HELP {name} Bot API calls per update", f"# TYPE {name} histogram"]
+        lines += self.calls_per_update.render(name)
+        return "\n".join(lines) + "\n"
+
+    def summary(self) -> str:
+        """A short report for the /metrics command"""
+        lines = [
+            f"{name[len(PREFIX):]}: {read()}" for name, (_, read) in self.gauges.items()
+        ]
+        for title, family in (("handler", self.handlers), ("api", self.api)):
+            for label, histogram in sorted(family.items()):
+                if histogram.count:
+                    lines.append(
+                        f"{title} {label}: {histogram.count} 次 "
+                        f"p50 {histogram.quantile(0.5) * 1000:.1f}ms "
+                        f"p99 {histogram.quantile(0.99) * 1000:.1f}ms"
+                    )
+        calls = self.calls_per_update
+        if calls.count:
+            lines.append(f"api calls per update: {calls.sum / calls.count:.2f}")
+        with self.lock:
+            errors = ", ".join(f"{name} {count}" for name, count in self.errors.items())
+        lines.append(f"errors: {errors or 0}")
+        return "\n".join(lines)
+
+
+class TimedRequest:
+    """Wraps the Request of a Bot to time every Bot API call"""
+
+    def __init__(self, request, metrics: Metrics):
+        self._request = request
+        self._metrics = metrics
+
+    def post(self, url: str, data: dict, timeout: float = None):
+        method = url.rsplit("/", 1)[-1]
+        self._metrics.count_call()
+        start = perf_counter()
+        try:
+            return self._request.post(url, data, timeout)
+        except Exception as e:
+            self._metrics.count_error(e)
+            raise
+        finally:
+            self._metrics.observe_api(method, perf_counter() - start)
+
+    def __getattr__(self, name):
+        return getattr(self._request, name)
+
+
+class MetricsHandler(BaseHTTPRequestHandler):
+    def do_GET(self):
+        if self.path != "/metrics":
+            self.send_response(404)
+            self.send_header("Content-Length", "0")
+            self.end_headers()
+            return
+        data = self.server.metrics.render().encode()
+        self.send_response(200)
+        self.send_header("Content-Type", "text/plain; version=0.0.4")
+        self.send_header("Content-Length", str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def log_message(self, format, *args):
+        logger.debug("%s - " + format, self.address_string(), *args)
+
+
+class MetricsServer:
+    """Serves the metrics at http://listen:port/metrics"""
+
+    def __init__(self, metrics: Metrics, listen: str = "127.0.0.1", port: int = 9100):
+        self.httpd = ThreadingHTTPServer((listen, port), MetricsHandler)
+        self.httpd.daemon_threads = True
+        self.httpd.metrics = metrics
+        self.thread: Optional[Thread] = None
+
+    @property
+    def port(self) -> int:
+        return self.httpd.server_address[1]
+
+    def start(self):
+        self.thread = Thread(target=self.httpd.serve_forever, name="metrics", daemon=True)
+        self.thread.start()
+        logger.info("Metrics on port %s", self.port)
+
+    def stop(self):
+        self.httpd.shutdown()
+        self.httpd.server_close()
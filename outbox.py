@@ -0,0 +1,336 @@
+"""
+Outbound message queue.
+
+Handlers enqueue their messages here and return immediately. A scheduler
+thread sends them while respecting Telegram's flood limits: a global token
+bucket for the whole bot, one token bucket per chat, and the retry_after of
+any 429 answer. Messages of one chat are sent one at a time and in order,
+while different chats are sent in parallel. When the global budget is short,
+the chat whose next message has the highest priority goes first, so a turn
+prompt is not starved behind the card reveal of another chat.
+
+A call sent with send_latest waits a moment first, and a later call of the
+same key replaces it meanwhile: a burst of edits to one message becomes a
+single call.
+"""
+from __future__ import annotations
+
+import time
+from collections import Counter, deque
+from heapq import heappop, heappush
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass, field
+from enum import IntEnum
+from itertools import count
+from logging import getLogger
+from threading import Condition, Thread
+from typing import (
+    TYPE_CHECKING,
+    Any,
+    Callable,
+    Deque,
+    Dict,
+    Hashable,
+    List,
+    Optional,
+    Set,
+    Tuple,
+)
+
+from telegram.error import RetryAfter
+
+if TYPE_CHECKING:
+    from telegram import Bot
+
+    from metrics import Metrics
+
+# Seconds between two scans for idle chats
+PRUNE_INTERVAL = 60
+
+logger = getLogger(__name__)
+
+
+class Priority(IntEnum):
+    """Lower values are sent first"""
+
+    HIGH = 0  # turn prompts and notices
+    NORMAL = 1
+    LOW = 2  # bulk messages such as the card reveal
+
+
+class TokenBucket:
+    def __init__(self, rate: float, capacity: float):
+        self.rate = rate
+        self.capacity = capacity
+        self.tokens = capacity
+        self.updated = time.monotonic()
+
+    def _refill(self, now: float):
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+    def delay(self, now: float) -> float:
+        """Seconds until a token is available"""
+        self._refill(now)
+        if self.tokens >= 1:
+            return 0
+        return (1 - self.tokens) / self.rate
+
+    def take(self, now: float):
+        self._refill(now)
+        self.tokens -= 1
+
+
+@dataclass(order=True)
+class OutgoingMessage:
+    priority: Priority
+    seq: int
+    method: str = field(compare=False)
+    chat_id: int = field(compare=False)
+    kwargs: Dict[str, Any] = field(compare=False)
+    # called with the result of the call, None when it failed
+    on_sent: Optional[Callable[[Any], object]] = field(default=None, compare=False)
+
+
+class ChatQueue:
+    def __init__(self, rate: float, capacity: float):
+        self.messages: Deque[OutgoingMessage] = deque()
+        self.bucket = TokenBucket(rate, capacity)
+        self.blocked_until = 0.0
+        self.sending = False
+
+    def delay(self, now: float) -> float:
+        return max(self.blocked_until - now, self.bucket.delay(now))
+
+
+class Outbox:
+    def __init__(
+        self,
+        bot: Bot,
+        global_rate: float = 30,
+        chat_rate: float = 1,
+        chat_burst: float = 3,
+        senders: int = 8,
+        metrics: Optional[Metrics] = None,
+    ):
+        """
+        Args:
+            bot (Bot): The bot sending the messages
+            global_rate (float): Messages per second for the whole bot
+            chat_rate (float): Messages per second in a single chat
+            chat_burst (float): Messages a chat may send at once after being idle
+            senders (int): Threads sending messages concurrently
+            metrics (Metrics): Counts the messages as Bot API calls of the
+                update being handled
+        """
+        self.bot = bot
+        self.metrics = metrics
+        self.chat_rate = chat_rate
+        self.chat_burst = chat_burst
+
+        self.bucket = TokenBucket(global_rate, global_rate)
+        self.chats: Dict[int, ChatQueue] = {}
+        self.pending: Set[int] = set()
+        # calls of send_latest by key, and their keys by due time
+        self.latest: Dict[Hashable, OutgoingMessage] = {}
+        self.delayed: List[Tuple[float, int, Hashable]] = []
+        self.stats = Counter()
+
+        self.seq = count()
+        self.pruned = time.monotonic()
+        self.condition = Condition()
+        self.running = False
+        self.in_flight = 0
+
+        self.senders = senders
+        self.executor: Optional[ThreadPoolExecutor] = None
+        self.thread: Optional[Thread] = None
+
+    def send(
+        self,
+        method: str,
+        chat_id: int,
+        priority=Priority.NORMAL,
+        on_sent: Optional[Callable[[Any], object]] = None,
+        **kwargs,
+    ):
+        """
+        Enqueues a Bot method call (e.g. "send_message") to a chat, on_sent is
+        called with its result (e.g. the Message), or None when it failed
+        """
+        message = OutgoingMessage(
+            priority, next(self.seq), method, chat_id, kwargs, on_sent
+        )
+        if self.metrics:
+            self.metrics.count_call()
+        with self.condition:
+            self._enqueue(message)
+            self.condition.notify()
+
+    def send_latest(
+        self,
+        key: Hashable,
+        method: str,
+        chat_id: int,
+        delay: float,
+        priority=Priority.NORMAL,
+        **kwargs,
+    ):
+        """
+        Enqueues a Bot method call in `delay` seconds, unless a later call of
+        the same key replaces it before (e.g. the edits of one message)
+        """
+        with self.condition:
+            message = self.latest.get(key)
+            if message is not None:
+                message.kwargs = kwargs
+                self.stats["coalesced"] += 1
+                return
+            message = OutgoingMessage(priority, next(self.seq), method, chat_id, kwargs)
+            self.latest[key] = message
+            heappush(self.delayed, (time.monotonic() + delay, message.seq, key))
+            self.condition.notify()
+        if self.metrics:
+            self.metrics.count_call()
+
+    def _enqueue(self, message: OutgoingMessage):
+        chat = self.chats.get(message.chat_id)
+        if chat is None:
+            chat = self.chats[message.chat_id] = ChatQueue(
+                self.chat_rate, self.chat_burst
+            )
+        chat.messages.append(message)
+        self.pending.add(message.chat_id)
+        self.stats["queued"] += 1
+
+    def send_message(self, chat_id: int, text: str, priority=Priority.NORMAL, **kwargs):
+        self.send("send_message", chat_id, priority, text=text, **kwargs)
+
+    def send_sticker(self, chat_id: int, sticker: str, priority=Priority.NORMAL, **kwargs):
+        self.send("send_sticker", chat_id, priority, sticker=sticker, **kwargs)
+
+    @property
+    def queued(self) -> int:
+        with self.condition:
+            queued = sum(len(self.chats[chat_id].messages) for chat_id in self.pending)
+            return queued + len(self.latest)
+
+    def start(self):
+        self.running = True
+        self.executor = ThreadPoolExecutor(self.senders, thread_name_prefix="outbox")
+        self.thread = Thread(target=self._schedule, name="outbox", daemon=True)
+        self.thread.start()
+
+    def stop(self, timeout: float = 10):
+        """Sends what is still queued (for at most `timeout` seconds) and stops"""
+        if not self.thread:
+            # never started, nothing sends what is queued
+            return
+        deadline = time.monotonic() + timeout
+        with self.condition:
+            self._release(float("inf"))
+            while (self.pending or self.in_flight) and time.monotonic() < deadline:
+                self.condition.wait(0.05)
+            self.running = False
+            self.condition.notify_all()
+        self.thread.join()
+        self.executor.shutdown()
+
+    def _release(self, now: float) -> Optional[float]:
+        """Enqueues the delayed calls that are due, the seconds until the next"""
+        while self.delayed and self.delayed[0][0] <= now:
+            _, _, key = heappop(self.delayed)
+            self._enqueue(self.latest.pop(key))
+        return self.delayed[0][0] - now if self.delayed else None
+
+    def _next(self, now: float):
+        """The best message that can be sent now, or the seconds to wait"""
+        best = None
+        wait = None
+        for chat_id in self.pending:
+            chat = self.chats[chat_id]
+            if chat.sending:
+                continue
+            delay = chat.delay(now)
+            if delay > 0:
+                wait = delay if wait is None else min(wait, delay)
+                continue
+            head = chat.messages[0]
+            if best is None or head < best.messages[0]:
+                best = chat
+        if best is None:
+            return None, wait
+
+        delay = self.bucket.delay(now)
+        if delay > 0:
+            return None, delay
+        return best, None
+
+    def _prune(self, now: float):
+        """Forgets idle chats whose bucket is full again"""
+        self.pruned = now
+        for chat_id, chat in list(self.chats.items()):
+            if chat_id in self.pending or chat.sending:
+                continue
+            chat.bucket.delay(now)
+            if chat.bucket.tokens >= chat.bucket.capacity:
+                del self.chats[chat_id]
+
+    def _schedule(self):
+        with self.condition:
+            while self.running:
+                now = time.monotonic()
+                if now - self.pruned > PRUNE_INTERVAL:
+                    self._prune(now)
+
+                due = self._release(now)
+                chat, wait = self._next(now)
+                if chat is None:
+                    if due is not None:
+                        wait = due if wait is None else min(wait, due)
+                    self.condition.wait(wait)
+                    continue
+
+                message = chat.messages.popleft()
+                if not chat.messages:
+                    self.pending.discard(message.chat_id)
+                chat.sending = True
+                chat.bucket.take(now)
+                self.bucket.take(now)
+                self.in_flight += 1
+                self.executor.submit(self._deliver, chat, message)
+
+    def _deliver(self, chat: ChatQueue, message: OutgoingMessage):
+        retry_after = None
+        result = "sent"
+        try:
+            sent = None
+            try:
+                method = getattr(self.bot, message.method)
+                sent = method(chat_id=message.chat_id, **message.kwargs)
+            except RetryAfter as e:
+                retry_after = e.retry_after
+                result = "retried"
+            except Exception:
+                # any error, or the chat would never send again
+                logger.exception("Failed to %s to %s", message.method, message.chat_id)
+                result = "failed"
+            if message.on_sent is not None and retry_after is None:
+                try:
+                    message.on_sent(sent)
+                except Exception:
+                    logger.exception("Callback of %s failed", message.method)
+        finally:
+            with self.condition:
+                self.stats[result] += 1
+                if retry_after is not None:
+                    # keep the message at the head of the chat and pause the chat
+                    logger.warning(
+                        "Chat %s flooded, retry in %ss", message.chat_id, retry_after
+                    )
+                    chat.blocked_until = time.monotonic() + retry_after
+                    chat.messages.appendleft(message)
+                    self.pending.add(message.chat_id)
+                chat.sending = False
+                self.in_flight -= 1
+                self.condition.notify_all()
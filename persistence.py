@@ -0,0 +1,357 @@
+"""
+Crash-safe snapshots of every running game.
+
+A snapshot stores the games of a GameManager in a compact form: cards as
+indexes into the card catalog, players in seat order, users/chats as plain
+tuples, and the seed, generator state and journal of every game. It is
+written atomically (temporary file + rename), so a crash while saving never
+leaves a broken snapshot behind.
+"""
+from __future__ import annotations
+
+import io
+import os
+import pickle
+import time
+from array import array
+from logging import getLogger
+from struct import Struct
+from threading import Condition, Thread
+from typing import TYPE_CHECKING, Iterable, List, Optional
+from zlib import crc32
+
+from telegram import Chat
+
+from card import PURPLE_CARDS, YELLOW_CARDS
+from game import Game
+from journal import Journal
+from player import Player, UserRecord
+
+if TYPE_CHECKING:
+    from card import Card
+    from random import Random
+
+    from deck import Deck
+    from executor import SerialExecutor
+    from game_manager import GameManager
+
+MAGIC = b"YCGS"
+VERSION = 4
+
+# magic, version, catalog fingerprint, crc32 of the payload
+HEADER = Struct("<4sHII")
+
+# Cards are stored as their index in the catalog, which must not change
+CATALOG_FINGERPRINT = crc32(
+    array("q", [card.id for card in YELLOW_CARDS + PURPLE_CARDS]).tobytes()
+)
+
+logger = getLogger(__name__)
+
+
+class SnapshotError(Exception):
+    pass
+
+
+class SafeUnpickler(pickle.Unpickler):
+    """Snapshots only hold builtin values, refuse to load anything else"""
+
+    def find_class(self, module, name):
+        raise SnapshotError(f"Unexpected object {module}.{name} in snapshot")
+
+
+def pack_cards(cards: Iterable[Card]) -> bytes:
+    return array("H", [card.index for card in cards]).tobytes()
+
+
+def unpack_cards(data: bytes, catalog: List[Card]) -> List[Card]:
+    indexes = array("H")
+    indexes.frombytes(data)
+    return [catalog[index] for index in indexes]
+
+
+def encode_deck(deck: Deck) -> tuple:
+    return (deck.indexes.tobytes(), deck.shuffled)
+
+
+def decode_deck(deck: Deck, data: tuple):
+    indexes, shuffled = data
+    deck.indexes = array("H")
+    deck.indexes.frombytes(indexes)
+    deck.shuffled = shuffled
+
+
+def encode_random(rng: Random) -> tuple:
+    version, internal, gauss_next = rng.getstate()
+    return (version, array("I", internal).tobytes(), gauss_next)
+
+
+def decode_random(rng: Random, data: tuple):
+    version, internal, gauss_next = data
+    state = array("I")
+    state.frombytes(internal)
+    rng.setstate((version, tuple(state), gauss_next))
+
+
+def encode_user(user: Optional[UserRecord]):
+    if user is None:
+        return None
+    return (user.id, user.first_name, user.username)
+
+
+def decode_user(data) -> Optional[UserRecord]:
+    if data is None:
+        return None
+    return UserRecord(*data)
+
+
+def encode_chat(chat: Chat):
+    return (chat.id, chat.type, chat.title)
+
+
+def decode_chat(data) -> Chat:
+    id, type, title = data
+    return Chat(id, type, title=title)
+
+
+def encode_game(game: Game) -> tuple:
+    """
+    Encode a game into builtin values.
+    Must not run concurrently with updates of the game (see dump).
+    """
+    board = game.board
+    # players who left after the reveal are dropped from the board, the
+    # others keep their group numbers
+    yellow = [(p, cards) for p, cards in board.yellow.items() if p.seat is not None]
+    positions = {p: position for position, p in enumerate(board.reveal, 1)}
+    order = [positions[p] for p, _ in yellow]
+    return (
+        encode_chat(game.chat),
+        encode_user(game.starter),
+        int(game.state),
+        game.open,
+        game.seating.current,
+        tuple(
+            (
+                encode_user(p.user),
+                p.number,
+                pack_cards(p.hand),
+                p.score,
+                p.discard_amount,
+            )
+            for p in game.seating.seats
+        ),
+        encode_deck(game.yellow_deck),
+        encode_deck(game.purple_deck),
+        (
+            board.purple.index if board.purple else -1,
+            tuple((p.seat, pack_cards(cards)) for p, cards in yellow),
+            tuple(order),
+            board.loser.seat if board.loser and board.loser.seat is not None else -1,
+        ),
+        (game.seed, encode_random(game.random), game.journal.tobytes()),
+    )
+
+
+def decode_game(data: tuple) -> Game:
+    chat, starter, state, is_open, current, players, yellow, purple, board, history = data
+    seed, rng, entries = history
+
+    game = Game(decode_chat(chat), seed)
+    game.starter = decode_user(starter)
+    game.open = is_open
+
+    # Players are seated in order, each one behind the previous one
+    for user, number, cards, score, discard_amount in players:
+        player = Player(game, decode_user(user))
+        player.number = number
+        player.hand.add(unpack_cards(cards, YELLOW_CARDS))
+        player.score = score
+        player.discard_amount = discard_amount
+    seats = game.seating.seats
+    if seats:
+        game.current_player = seats[current]
+
+    decode_deck(game.yellow_deck, yellow)
+    decode_deck(game.purple_deck, purple)
+
+    purple_index, board_yellow, order, loser = board
+    game.board.purple = PURPLE_CARDS[purple_index] if purple_index >= 0 else None
+    game.board.yellow = {
+        seats[seat]: unpack_cards(cards, YELLOW_CARDS) for seat, cards in board_yellow
+    }
+    # the groups of the players who left stay empty, so the buttons of the
+    # reveal still pick the same players
+    reveal = game.board.reveal = [None] * max(order, default=0)
+    for position, player in zip(order, game.board.yellow):
+        reveal[position - 1] = player
+    game.board.loser = seats[loser] if loser >= 0 else None
+    game.board.recount()
+
+    # seating the players above drew from the generator and wrote the journal
+    decode_random(game.random, rng)
+    game.journal = Journal(entries)
+
+    # Setting the state publishes the view of the restored game
+    game.state = state
+    return game
+
+
+def dump(gm: GameManager, executor: Optional[SerialExecutor] = None) -> bytes:
+    """
+    Serialize all games of the manager.
+    With an executor, every game is encoded inside its own mailbox so the
+    snapshot of each game is consistent.
+    """
+    with gm.lock:
+        games = [game for games in gm.chatid_games.values() for game in games]
+        current = {
+            user_id: player.game.chat.id for user_id, player in gm.userid_current.items()
+        }
+
+    if executor is None or executor.closed:
+        encoded = [encode_game(game) for game in games]
+    else:
+        futures = [executor.submit(game.chat.id, encode_game, game) for game in games]
+        encoded = [future.result() for future in futures]
+
+    payload = pickle.dumps((tuple(encoded), current), pickle.HIGHEST_PROTOCOL)
+    return HEADER.pack(MAGIC, VERSION, CATALOG_FINGERPRINT, crc32(payload)) + payload
+
+
+def load(data: bytes, gm: GameManager) -> int:
+    """Rebuild the games of a snapshot into an empty manager"""
+    if len(data) < HEADER.size:
+        raise SnapshotError("Truncated snapshot")
+    magic, version, fingerprint, checksum = HEADER.unpack_from(data)
+    if magic != MAGIC or version != VERSION:
+        raise SnapshotError("Unknown snapshot format")
+    if fingerprint != CATALOG_FINGERPRINT:
+        raise SnapshotError("Snapshot was made with another card catalog")
+    payload = data[HEADER.size :]
+    if crc32(payload) != checksum:
+        raise SnapshotError("Snapshot checksum mismatch")
+
+    encoded, current = SafeUnpickler(io.BytesIO(payload)).load()
+
+    with gm.lock:
+        for item in encoded:
+            game = decode_game(item)
+            chat_id = game.chat.id
+            gm.chatid_games.setdefault(chat_id, []).append(game)
+            gm.chatid_active[chat_id] = game
+            for player in game.players:
+                gm.userid_players.setdefault(player.user.id, []).append(player)
+                gm._index_player(player)
+
+        for user_id, players in gm.userid_players.items():
+            player = gm.user_chat_players.get((user_id, current.get(user_id)))
+            gm._set_current(user_id, player or players[0])
+
+        gm.check_invariants()
+    return len(encoded)
+
+
+def write_atomic(path: str, data: bytes):
+    tmp_path = path + ".tmp"
+    with open(tmp_path, "wb") as f:
+        f.write(data)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp_path, path)
+
+
+class Snapshotter:
+    """
+    Saves the games periodically and shortly after state transitions.
+    Saves are coalesced: many transitions within `min_interval` seconds
+    lead to a single snapshot.
+    """
+
+    def __init__(
+        self,
+        gm: GameManager,
+        path: str,
+        executor: Optional[SerialExecutor] = None,
+        interval: float = 60,
+        min_interval: float = 1,
+    ):
+        self.gm = gm
+        self.path = path
+        self.executor = executor
+        self.interval = interval
+        self.min_interval = min_interval
+
+        self.dirty = False
+        self.running = False
+        self.saved = 0.0
+        self.condition = Condition()
+        self.thread: Optional[Thread] = None
+
+    def restore(self) -> int:
+        """Load the last snapshot into the manager, returns the number of games"""
+        try:
+            with open(self.path, "rb") as f:
+                data = f.read()
+        except FileNotFoundError:
+            return 0
+        try:
+            count = load(data, self.gm)
+        except Exception:
+            logger.exception("Could not restore games from %s", self.path)
+            return 0
+        logger.info("Restored %s games from %s", count, self.path)
+        return count
+
+    def save(self):
+        start = time.perf_counter()
+        data = dump(self.gm, self.executor)
+        write_atomic(self.path, data)
+        self.saved = time.monotonic()
+        logger.debug(
+            "Saved %s bytes to %s in %.1f ms",
+            len(data),
+            self.path,
+            (time.perf_counter() - start) * 1000,
+        )
+
+    def request(self):
+        """Ask for a snapshot soon, called after state transitions"""
+        with self.condition:
+            self.dirty = True
+            self.condition.notify()
+
+    def start(self):
+        self.running = True
+        self.thread = Thread(target=self._run, name="snapshot", daemon=True)
+        self.thread.start()
+
+    def stop(self):
+        """Stop the background saves and write a final snapshot"""
+        with self.condition:
+            self.running = False
+            self.condition.notify()
+        if self.thread:
+            self.thread.join()
+        self.save()
+
+    def _run(self):
+        while True:
+            with self.condition:
+                deadline = self.saved + self.interval
+                while self.running and not self.dirty:
+                    remaining = deadline - time.monotonic()
+                    if remaining <= 0:
+                        break
+                    self.condition.wait(remaining)
+                if not self.running:
+                    return
+                self.dirty = False
+
+            # coalesce the transitions of a burst into one snapshot
+            time.sleep(max(0, self.saved + self.min_interval - time.monotonic()))
+            try:
+                self.save()
+            except Exception:
+                self.saved = time.monotonic()
+                logger.exception("Could not save games to %s", self.path)
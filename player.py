@@ -1,43 +1,79 @@
 from __future__ import annotations
 
-from logging import getLogger
+from typing import NamedTuple, Optional
 
 from card import YELLOW, Card
 from errors import CanNotDiscardError, NotEnoughPlayersError, TooManyCardsError
+from hand import Hand
+from journal import Action
+
+
+class UserRecord(NamedTuple):
+    """The parts of a Telegram user a game keeps"""
+
+    id: int
+    first_name: str
+    username: Optional[str] = None
+
+    @classmethod
+    def of(cls, user):
+        """A record of a Telegram user, anything else (e.g. a name in tests) is kept"""
+        if isinstance(user, cls) or not hasattr(user, "first_name"):
+            return user
+        return cls(user.id, user.first_name, user.username)
 
 
 class Player:
     """
     This class represents a player.
-    It is basically a circular doubly-linked list.
-    On initialization, it will connect itself to a game and its
-    other players by placing itself behind the current player.
+    On initialization, it will take a seat in the game's seating ring
+    by placing itself behind the current player.
     """
 
-    prev: Player
-    next: Player
+    __slots__ = (
+        "game",
+        "user",
+        "number",
+        "seat",
+        "discard_amount",
+        "hand",
+        "_score",
+        "__weakref__",
+    )
 
     def __init__(self, game, user):
         self.game = game
-        self.user = user
+        self.user = UserRecord.of(user)
+        self.seat: Optional[int] = None
+        # the player's number in the journal of the game, in order of joining
+        self.number = game.journal.joins
+        game.journal.record(Action.JOIN, self.number, getattr(user, "id", 0))
 
         self.discard_amount = 0
-        self.cards = []
-        self.purple_cards = []
-        self.score = 0
-
-        self.logger = getLogger(__name__)
-
-        # Check if this player is the first player in this game.
-        if game.current_player:
-            self.next = game.current_player
-            self.prev = game.current_player.prev
-            game.current_player.prev.next = self
-            game.current_player.prev = self
-        else:
-            self.next = self
-            self.prev = self
-            game.current_player = self
+        self.hand = Hand()
+        self._score = 0
+
+        game.seating.join(self)
+        game.board.join(self)
+        game.scoreboard.join(self)
+
+    @property
+    def score(self) -> int:
+        return self._score
+
+    @score.setter
+    def score(self, score: int):
+        if self.seat is not None:
+            self.game.scoreboard.move(self, self._score, score)
+        self._score = score
+
+    @property
+    def next(self) -> Optional[Player]:
+        return self.game.seating.offset(self, 1)
+
+    @property
+    def prev(self) -> Optional[Player]:
+        return self.game.seating.offset(self, -1)
 
     @property
     def left(self) -> Player:
@@ -49,27 +85,27 @@ class Player:
 
     @property
     def front(self) -> Player:
-        if len(self.game.players) < 4:
+        players_count = len(self.game.seating)
+        if players_count < 4:
             raise NotEnoughPlayersError()
-        if len(self.game.players) <= 7:
-            return self.next.next
-        return self.next.next.next
+        if players_count <= 7:
+            return self.game.seating.offset(self, 2)
+        return self.game.seating.offset(self, 3)
 
     def draw_first_hand(self):
-        for _ in range(13):
-            self.cards.append(self.game.yellow_deck.draw())
+        self.hand.add(self.game.yellow_deck.draw_many(13))
 
     def leave(self):
-        """Removes player from the game and closes the gap in the list"""
-        if self.next is self:
+        """Removes player from the game and closes the gap in the ring"""
+        if self.seat is None or self.next is self:
             return
 
-        self.next.prev = self.prev
-        self.prev.next = self.next
-        self.next = None
-        self.prev = None
+        self.game.journal.record(Action.LEAVE, self.number)
+        self.game.seating.leave(self)
+        self.game.board.leave(self)
+        self.game.scoreboard.leave(self)
 
-        self.cards = []
+        self.hand.clear()
         self.discard_amount = 0
 
     def __repr__(self):
@@ -79,15 +115,25 @@ class Player:
         return str(self.user)
 
     def draw(self):
-        while len(self.cards) < 13:
-            self.cards.append(self.game.yellow_deck.draw())
+        missing = 13 - len(self.hand)
+        if missing <= 0:
+            return
+        self.hand.add(self.game.yellow_deck.draw_many(missing))
 
     def play(self, card: Card):
-        """Plays a card and removes it from hand"""
+        """Plays a card and removes it from hand
+
+        Raises:
+            TooManyCardsError: The player already played enough yellow cards
+            CardNotInHandError: The player does not hold the yellow card
+        """
         if card.color == YELLOW:
-            if len(self.game.board.yellow[self]) >= self.game.board.purple.space:
+            if not self.game.board.owes(self):
                 raise TooManyCardsError()
-            self.cards.remove(card)
+            self.hand.remove(card)
+            self.game.journal.record(Action.YELLOW, self.number, card.index)
+        else:
+            self.game.journal.record(Action.PURPLE, self.number, card.index)
         self.game.board.play_card_by(self, card)
 
     def discard(self, card: Card):
@@ -98,10 +144,22 @@ class Player:
 
         Raises:
             CanNotDiscardError: When the discard_amount is equals to 0
+            CardNotInHandError: When the player does not hold the card
         """
         if self.discard_amount == 0:
             raise CanNotDiscardError()
-        self.cards.remove(card)
+        self.hand.remove(card)
+        self.game.journal.record(Action.DISCARD, self.number, card.index)
+
+    def choose_discards(self, amount: int):
+        """The loser chose to discard `amount` cards"""
+        self.discard_amount = amount
+        self.game.journal.record(Action.DISCARDS, self.number, amount)
+
+    def skip_discard(self):
+        """The loser keeps the hand, the next turn starts"""
+        self.game.journal.record(Action.SKIP, self.number)
+        self.game.turn()
 
     @property
     def discarded(self) -> bool:
@@ -111,7 +169,7 @@ class Player:
             bool: Own cards equal to 13 - space of the purple card - discard amount
         """
         return (
-            len(self.cards) == 13 - self.game.board.purple.space - self.discard_amount
+            len(self.hand) == 13 - self.game.board.purple.space - self.discard_amount
         )
 
     @property
@@ -121,9 +179,4 @@ class Player:
         Returns:
             bool: [description]
         """
-        purple_card = self.game.board.purple
-        return (
-            self.game.current_player != self
-            and purple_card is not None
-            and purple_card.space > len(self.game.board.yellow[self])
-        )
+        return self.game.board.owes(self)
@@ -0,0 +1,193 @@
+"""
+Ends games nobody plays any more.
+
+Lobbies that never start and games stalled in the middle of a turn would
+otherwise stay in the GameManager forever, with their decks, hands and
+users. The reaper ends them after a time to live, and ends the least
+recently active games when the process goes over its game or memory ceiling.
+"""
+from __future__ import annotations
+
+import os
+import time
+from collections import Counter
+from logging import getLogger
+from threading import Condition, Thread
+from typing import TYPE_CHECKING, Callable, List, Optional, Tuple
+
+if TYPE_CHECKING:
+    from executor import SerialExecutor
+    from game import Game
+    from game_manager import GameManager
+
+logger = getLogger(__name__)
+
+# reasons a game is reaped
+LOBBY = "lobby"
+STALLED = "stalled"
+EVICTED = "evicted"
+
+# after an eviction for memory, the ceiling applies again below this fraction
+LOW_WATERMARK = 0.9
+
+
+def game_size(game: Game) -> int:
+    """Estimated bytes held by a game, measured with test/bench_memory.py"""
+    return (6 if game.started else 2) * 1024 + 2 * 1024 * len(game.players)
+
+
+def resident_memory() -> Optional[int]:
+    """Resident set size of the process in bytes, None where unknown"""
+    try:
+        with open("/proc/self/statm") as f:
+            pages = int(f.read().split()[1])
+    except (OSError, IndexError, ValueError):
+        return None
+    return pages * os.sysconf("SC_PAGE_SIZE")
+
+
+class Reaper:
+    def __init__(
+        self,
+        gm: GameManager,
+        executor: Optional[SerialExecutor] = None,
+        notify: Optional[Callable[[Game, str], None]] = None,
+        lobby_ttl: float = 3600,
+        game_ttl: float = 6 * 3600,
+        max_games: Optional[int] = None,
+        max_memory: Optional[float] = None,
+        interval: float = 60,
+    ):
+        """
+        Args:
+            gm (GameManager): The games to watch
+            executor (SerialExecutor): Reap each game inside its mailbox
+            notify: Called with the game and the reason once it is reaped
+            lobby_ttl (float): Seconds a game may wait for /start
+            game_ttl (float): Seconds a started game may go without updates
+            max_games (int): Evict games above this count
+            max_memory (float): Evict games when the process holds more MiB
+                of memory, by their estimated size
+            interval (float): Seconds between two sweeps
+        """
+        self.gm = gm
+        self.executor = executor
+        self.notify = notify
+        self.lobby_ttl = lobby_ttl
+        self.game_ttl = game_ttl
+        self.max_games = max_games
+        self.max_memory = max_memory
+        self.interval = interval
+        # the resident size after the last eviction for memory, None when
+        # the memory is under the low watermark
+        self.evicted_at: Optional[int] = None
+
+        # reaped games by reason
+        self.stats: Counter = Counter()
+        self.running = False
+        self.condition = Condition()
+        self.thread: Optional[Thread] = None
+
+    def expired(self, game: Game, now: float) -> Optional[str]:
+        ttl = self.game_ttl if game.started else self.lobby_ttl
+        if now - game.last_activity < ttl:
+            return None
+        return STALLED if game.started else LOBBY
+
+    def memory_excess(self) -> int:
+        """Bytes to free to get under the memory ceiling, 0 if none"""
+        if not self.max_memory:
+            return 0
+        memory = resident_memory()
+        if memory is None:
+            return 0
+        ceiling = self.max_memory * 2 ** 20
+        if self.evicted_at is None:
+            excess = memory - ceiling
+        elif memory < ceiling * LOW_WATERMARK:
+            # the memory was given back, the ceiling applies again
+            self.evicted_at = None
+            return 0
+        else:
+            # CPython keeps the memory of the evicted games and reuses it for
+            # new ones, the resident size only grows once that is used up
+            excess = memory - self.evicted_at
+        if excess <= 0:
+            return 0
+        self.evicted_at = memory
+        return int(excess)
+
+    def select(self, now: float) -> List[Tuple[Game, str]]:
+        """The games to reap with their reasons"""
+        games = self.gm.games()
+        reaped = []
+        kept = []
+        for game in games:
+            reason = self.expired(game, now)
+            if reason:
+                reaped.append((game, reason))
+            else:
+                kept.append(game)
+
+        evict = 0
+        if self.max_games is not None:
+            evict = max(len(kept) - self.max_games, 0)
+        excess = self.memory_excess()
+        if evict or excess:
+            kept.sort(key=lambda game: game.last_activity)
+            freed = sum(game_size(game) for game in kept[:evict])
+            while freed < excess and evict < len(kept):
+                freed += game_size(kept[evict])
+                evict += 1
+            reaped.extend((game, EVICTED) for game in kept[:evict])
+        return reaped
+
+    def sweep(self, now: Optional[float] = None) -> int:
+        """Reap the expired games and evict over the ceilings, returns the count"""
+        now = time.monotonic() if now is None else now
+        reaped = self.select(now)
+        if self.executor is None or self.executor.closed:
+            done = [self.reap(game, reason, game.last_activity) for game, reason in reaped]
+        else:
+            futures = [
+                self.executor.submit(
+                    game.chat.id, self.reap, game, reason, game.last_activity
+                )
+                for game, reason in reaped
+            ]
+            done = [future.result() for future in futures]
+        return sum(done)
+
+    def reap(self, game: Game, reason: str, last_activity: float) -> bool:
+        """End the game unless an update came in since it was selected"""
+        if game.last_activity != last_activity or game.ended:
+            return False
+        self.gm.remove_game(game)
+        self.stats[reason] += 1
+        logger.info("Reaped game in chat %s (%s)", game.chat.id, reason)
+        if self.notify:
+            self.notify(game, reason)
+        return True
+
+    def start(self):
+        self.running = True
+        self.thread = Thread(target=self._run, name="reaper", daemon=True)
+        self.thread.start()
+
+    def stop(self):
+        with self.condition:
+            self.running = False
+            self.condition.notify()
+        if self.thread:
+            self.thread.join()
+
+    def _run(self):
+        while True:
+            with self.condition:
+                self.condition.wait(self.interval)
+                if not self.running:
+                    return
+            try:
+                self.sweep()
+            except Exception:
+                logger.exception("Could not reap the idle games")
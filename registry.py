@@ -0,0 +1,62 @@
+from __future__ import annotations
+
+from typing import TYPE_CHECKING, Dict, Iterable, Union
+
+from errors import CardNotFoundError
+
+if TYPE_CHECKING:
+    from card import Card
+
+
+class CardRegistry:
+    """
+    Constant-time lookup tables over the card catalog.
+    Cards are indexed by their integer sticker id, by the string form of that
+    id (which is what inline result ids carry) and by their sticker file_id.
+    """
+
+    def __init__(self, yellow: Iterable[Card], purple: Iterable[Card]):
+        self.yellow: Dict[int, Card] = {card.id: card for card in yellow}
+        self.purple: Dict[int, Card] = {card.id: card for card in purple}
+
+        self.by_id: Dict[int, Card] = {**self.yellow, **self.purple}
+        self.by_key: Dict[str, Card] = {
+            str(card_id): card for card_id, card in self.by_id.items()
+        }
+        self.by_file_id: Dict[str, Card] = {
+            card.sticker["file_id"]: card for card in self.by_id.values()
+        }
+
+    def __len__(self) -> int:
+        return len(self.by_id)
+
+    def __contains__(self, card_id: Union[int, str]) -> bool:
+        if isinstance(card_id, str):
+            return card_id in self.by_key
+        return card_id in self.by_id
+
+    def get(self, card_id: Union[int, str]) -> Card:
+        """Find a card by its sticker id, given either as int or as str"""
+        table = self.by_key if isinstance(card_id, str) else self.by_id
+        try:
+            return table[card_id]
+        except KeyError:
+            raise CardNotFoundError(card_id) from None
+
+    def get_yellow(self, card_id: int) -> Card:
+        try:
+            return self.yellow[card_id]
+        except KeyError:
+            raise CardNotFoundError(card_id) from None
+
+    def get_purple(self, card_id: int) -> Card:
+        try:
+            return self.purple[card_id]
+        except KeyError:
+            raise CardNotFoundError(card_id) from None
+
+    def from_file_id(self, file_id: str) -> Card:
+        try:
+            return self.by_file_id[file_id]
+        except KeyError:
+            raise CardNotFoundError(file_id) from None
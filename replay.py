@@ -0,0 +1,134 @@
+"""
+Rebuild games from their seed and journal.
+
+Usage: python replay.py FILE [CHAT_ID]
+
+FILE is a journal file (see "journal" in config.json) or a snapshot. Every
+game in it is replayed at full speed and checked against its journal; the
+actions of the games of CHAT_ID are printed step by step.
+"""
+from __future__ import annotations
+
+import sys
+import time
+from typing import Iterator, List, Optional, Tuple
+
+from telegram import Chat
+
+from card import PURPLE_CARDS, YELLOW_CARDS
+from game import Game
+from game_manager import GameManager
+from journal import Action, Entry, Journal, decode_journal
+from persistence import MAGIC, load
+from player import Player, UserRecord
+
+
+class ReplayError(Exception):
+    pass
+
+
+def apply(game: Game, players: List[Player], entry: Entry):
+    """Apply an action the way the bot's handlers do"""
+    action, number, argument = entry
+    if action == Action.JOIN:
+        players.append(game.join(UserRecord(argument, str(argument))))
+        return
+    player = players[number] if number >= 0 else None
+    if action == Action.LEAVE:
+        game.leave(player)
+    elif action == Action.START:
+        game.start()
+    elif action == Action.PURPLE:
+        player.play(PURPLE_CARDS[argument])
+    elif action == Action.YELLOW:
+        player.play(YELLOW_CARDS[argument])
+    elif action == Action.LOSER:
+        game.choose_loser(argument)
+    elif action == Action.DISCARDS:
+        player.choose_discards(argument)
+    elif action == Action.DISCARD:
+        player.discard(YELLOW_CARDS[argument])
+        if player.discarded:
+            game.turn()
+    elif action == Action.SKIP:
+        player.skip_discard()
+
+
+def play(game: Game, journal: Journal) -> Iterator[Entry]:
+    """
+    Apply the actions of the journal to a new game of the same seed
+
+    Raises:
+        ReplayError: The replayed game does not take the recorded actions
+    """
+    players: List[Player] = []
+    for step, entry in enumerate(journal):
+        try:
+            apply(game, players, entry)
+        except Exception as error:
+            raise ReplayError(f"Step {step} {entry} failed: {error!r}") from error
+        if len(game.journal) != step + 1:
+            raise ReplayError(f"Step {step} {entry} was not recorded")
+        yield entry
+    if game.journal.tobytes() != journal.tobytes():
+        raise ReplayError("The replayed journal differs from the recorded one")
+
+
+def replay_steps(
+    seed: int, journal: Journal, chat: Optional[Chat] = None
+) -> Iterator[Tuple[Game, Entry]]:
+    """Yields the game after every action of the journal"""
+    game = Game(chat, seed)
+    for entry in play(game, journal):
+        yield game, entry
+
+
+def replay(seed: int, journal: Journal, chat: Optional[Chat] = None) -> Game:
+    game = Game(chat, seed)
+    for _ in play(game, journal):
+        pass
+    return game
+
+
+def read_journals(path: str) -> Iterator[Tuple[int, int, Journal]]:
+    """The chat id, seed and journal of every game in a journal file or snapshot"""
+    with open(path, "rb") as f:
+        data = f.read()
+    if data.startswith(MAGIC):
+        gm = GameManager()
+        load(data, gm)
+        for games in gm.chatid_games.values():
+            for game in games:
+                yield game.chat.id, game.seed, game.journal
+        return
+    for line in data.decode().splitlines():
+        if line.strip():
+            yield decode_journal(line)
+
+
+def describe_step(game: Game, entry: Entry) -> str:
+    action, number, argument = entry
+    return f"{game.state.name:<8} {action.name:<8} player={number} {argument}"
+
+
+def main(path: str, chat_id: Optional[int] = None):
+    journals = list(read_journals(path))
+    actions = 0
+    start = time.perf_counter()
+    for game_chat_id, seed, journal in journals:
+        if game_chat_id == chat_id:
+            print(f"chat {chat_id} seed {seed}")
+            for game, entry in replay_steps(seed, journal):
+                print(describe_step(game, entry))
+        else:
+            replay(seed, journal)
+        actions += len(journal)
+    elapsed = time.perf_counter() - start
+    print(
+        f"replayed {len(journals)} games, {actions} actions in {elapsed:.3f} s "
+        f"({actions / max(elapsed, 1e-9):.0f} actions/s)"
+    )
+
+
+if __name__ == "__main__":
+    main(sys.argv[1], *map(int, sys.argv[2:]))
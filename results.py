@@ -1,12 +1,14 @@
 from __future__ import annotations
 
-from typing import TYPE_CHECKING, List
+from typing import TYPE_CHECKING, Dict, List, Tuple
+from weakref import WeakKeyDictionary
 
 from telegram import InlineQueryResultArticle
 from telegram import InlineQueryResultCachedSticker as Sticker
 from telegram import InputTextMessageContent
+from telegram.utils.helpers import DefaultValue
 
-from card import YELLOW_CARD
+from card import PURPLE_CARDS, YELLOW_CARD, YELLOW_CARDS
 
 if TYPE_CHECKING:
     from telegram import InlineQueryResult
@@ -15,47 +17,104 @@ if TYPE_CHECKING:
     from player import Player
 
 
+def without_defaults(data: dict) -> dict:
+    """
+    Drop the options left to the bot's defaults. The bot fills them in on the
+    result objects, which a cached dict would not see.
+    """
+    resolved = {}
+    for key, value in data.items():
+        if isinstance(value, DefaultValue):
+            value = value.value
+        elif isinstance(value, dict):
+            value = without_defaults(value)
+        if value is not None:
+            resolved[key] = value
+    return resolved
+
+
+class PrebuiltSticker(Sticker):
+    """A sticker result that is built and serialized once, then shared"""
+
+    __slots__ = ("_dict",)
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self._dict = without_defaults(super().to_dict())
+
+    def to_dict(self):
+        return self._dict
+
+
+class PrebuiltArticle(InlineQueryResultArticle):
+    """An article result that is built and serialized once, then shared"""
+
+    __slots__ = ("_dict",)
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self._dict = without_defaults(super().to_dict())
+
+    def to_dict(self):
+        return self._dict
+
+
+YELLOW_CONTENT = InputTextMessageContent("選ㄌ一張 " + YELLOW_CARD)
+
+YELLOW_RESULTS: Dict[int, PrebuiltSticker] = {
+    card.id: PrebuiltSticker(
+        str(card),
+        sticker_file_id=card.sticker["file_id"],
+        input_message_content=YELLOW_CONTENT,
+    )
+    for card in YELLOW_CARDS
+}
+PURPLE_RESULTS: Dict[int, PrebuiltSticker] = {
+    card.id: PrebuiltSticker("purple" + str(card), sticker_file_id=card.sticker["file_id"])
+    for card in PURPLE_CARDS
+}
+
+NO_GAME_RESULT = PrebuiltArticle(
+    "nogame",
+    title="你沒在玩ㄡ",
+    input_message_content=InputTextMessageContent("趕快加入遊戲好ㄇ"),
+)
+NOT_STARTED_RESULT = PrebuiltArticle(
+    "nogame",
+    title="還沒開始ㄡ",
+    input_message_content=InputTextMessageContent("趕快按開始ㄅ"),
+)
+
+# The results of each player's hand, cached until the hand changes
+hand_results: WeakKeyDictionary[Player, Tuple[int, List[PrebuiltSticker]]]
+hand_results = WeakKeyDictionary()
+
+
 def add_purple_cards(results: List[InlineQueryResult], game: Game):
     """Add purple cards"""
-    for card in game.purple_deck.cards[-2:]:
-        results.append(
-            Sticker("purple" + str(card), sticker_file_id=card.sticker["file_id"])
-        )
+    for card in game.view.purple_choices:
+        results.append(PURPLE_RESULTS[card.id])
 
 
 def add_cards(results: List[InlineQueryResult], player: Player):
     """Add player's cards"""
-    content = "選ㄌ一張 " + YELLOW_CARD
-    for card in player.cards:
-        results.append(
-            Sticker(
-                str(card),
-                sticker_file_id=card.sticker["file_id"],
-                input_message_content=InputTextMessageContent(content),
-            )
-        )
+    # read the published snapshot, the hand may be changing on another thread
+    version, cards = player.hand.view
+    cached = hand_results.get(player)
+    if cached is None or cached[0] != version:
+        cached = (version, [YELLOW_RESULTS[card.id] for card in cards])
+        hand_results[player] = cached
+    results.extend(cached[1])
 
 
 def add_no_game(results: List[InlineQueryResult]):
     """Add text result if user is not playing"""
-    results.append(
-        InlineQueryResultArticle(
-            "nogame",
-            title="你沒在玩ㄡ",
-            input_message_content=InputTextMessageContent("趕快加入遊戲好ㄇ"),
-        )
-    )
+    results.append(NO_GAME_RESULT)
 
 
 def add_not_started(results: List[InlineQueryResult]):
     """Add text result if the game has not yet started"""
-    results.append(
-        InlineQueryResultArticle(
-            "nogame",
-            title="還沒開始ㄡ",
-            input_message_content=InputTextMessageContent("趕快按開始ㄅ"),
-        )
-    )
+    results.append(NOT_STARTED_RESULT)
 
 
 def add_gameinfo(game, results):
@@ -63,4 +122,3 @@ def add_gameinfo(game, results):
 
     # TODO: show 每個人獲得幾張黃牌
     pass
-
@@ -0,0 +1,72 @@
+from __future__ import annotations
+
+from typing import TYPE_CHECKING, Dict, FrozenSet, Optional, Set
+
+if TYPE_CHECKING:
+    from player import Player
+
+
+class Scoreboard:
+    """
+    The scores of a game, with the players grouped by score.
+    A game only ever has a handful of distinct scores (0 down to the end
+    count), so the highest and the lowest score are kept up to date on every
+    change. Whether someone lost the game, the leaders and the worst players
+    are then answered without looking at every player.
+    """
+
+    __slots__ = ("groups", "highest", "lowest")
+
+    def __init__(self):
+        self.groups: Dict[int, Set[Player]] = {}
+        # None while nobody is seated
+        self.highest: Optional[int] = None
+        self.lowest: Optional[int] = None
+
+    def __len__(self) -> int:
+        return sum(len(group) for group in self.groups.values())
+
+    def join(self, player: Player):
+        self._add(player, player.score)
+
+    def leave(self, player: Player):
+        self._remove(player, player.score)
+
+    def move(self, player: Player, old: int, new: int):
+        """The score of a seated player changed from `old` to `new`"""
+        if old != new:
+            self._remove(player, old)
+            self._add(player, new)
+
+    def reached(self, count: int) -> bool:
+        """Whether a player lost `count` or more points"""
+        return self.lowest is not None and -self.lowest >= count
+
+    def leaders(self) -> FrozenSet[Player]:
+        """The players with the highest score"""
+        return frozenset(self.groups.get(self.highest, ()))
+
+    def worst(self) -> FrozenSet[Player]:
+        """The players with the lowest score"""
+        return frozenset(self.groups.get(self.lowest, ()))
+
+    def _add(self, player: Player, score: int):
+        group = self.groups.get(score)
+        if group is None:
+            group = self.groups[score] = set()
+            if self.highest is None or score > self.highest:
+                self.highest = score
+            if self.lowest is None or score < self.lowest:
+                self.lowest = score
+        group.add(player)
+
+    def _remove(self, player: Player, score: int):
+        group = self.groups[score]
+        group.discard(player)
+        if group:
+            return
+        del self.groups[score]
+        if score == self.highest:
+            self.highest = max(self.groups, default=None)
+        if score == self.lowest:
+            self.lowest = min(self.groups, default=None)
@@ -0,0 +1,88 @@
+from __future__ import annotations
+
+from typing import TYPE_CHECKING, List, Optional, Tuple
+
+if TYPE_CHECKING:
+    from player import Player
+
+
+class Seating:
+    """
+    The seats of a game, kept in an array-backed ring.
+    Each player knows its own seat index, so the neighbours of a player are
+    found in O(1). The roster (all players starting from the current one) is
+    cached as a tuple and only rebuilt after a join, a leave or a turn.
+    """
+
+    __slots__ = ("seats", "current", "version", "_roster", "_roster_version")
+
+    def __init__(self):
+        self.seats: List[Player] = []
+        self.current = 0
+        self.version = 0
+
+        self._roster: Tuple[Player, ...] = ()
+        self._roster_version = 0
+
+    def __len__(self) -> int:
+        return len(self.seats)
+
+    @property
+    def current_player(self) -> Optional[Player]:
+        if not self.seats:
+            return None
+        return self.seats[self.current]
+
+    @current_player.setter
+    def current_player(self, player: Player):
+        self.current = player.seat
+        self.version += 1
+
+    @property
+    def roster(self) -> Tuple[Player, ...]:
+        """All players in turn order, starting from the current player"""
+        if self._roster_version != self.version:
+            self._roster = tuple(self.seats[self.current :] + self.seats[: self.current])
+            self._roster_version = self.version
+        return self._roster
+
+    def join(self, player: Player):
+        """Seats the player behind the current player"""
+        if self.current == 0:
+            # behind the first seat is the end of the array
+            index = len(self.seats)
+        else:
+            index = self.current
+            self.current += 1
+
+        self.seats.insert(index, player)
+        self._renumber(index)
+        self.version += 1
+
+    def leave(self, player: Player):
+        """Removes the player and closes the gap in the ring"""
+        index = player.seat
+        del self.seats[index]
+        self._renumber(index)
+        player.seat = None
+
+        if index < self.current:
+            self.current -= 1
+        elif self.current >= len(self.seats):
+            self.current = 0
+        self.version += 1
+
+    def turn(self):
+        """Passes the turn to the next seat"""
+        self.current = (self.current + 1) % len(self.seats)
+        self.version += 1
+
+    def offset(self, player: Player, steps: int) -> Optional[Player]:
+        """The player sitting `steps` seats after (or before) the player"""
+        if player.seat is None:
+            return None
+        return self.seats[(player.seat + steps) % len(self.seats)]
+
+    def _renumber(self, start: int):
+        for index in range(start, len(self.seats)):
+            self.seats[index].seat = index
@@ -0,0 +1,232 @@
+"""
+Multi-process sharding of chats.
+
+The front process receives the updates (polling or webhook) and forwards
+each one to the worker process owning its chat. A chat belongs to shard
+`chat_id % shards`, every shard runs its own Room and GameManager.
+
+Inline queries and chosen inline results carry no chat, they go to the
+shard of the user's current game. Shards report every change of a user's
+current game to the front, which keeps them in a routing table. A user may
+play in chats of several shards, the table then follows the same rules as
+GameManager.userid_current: the game joined last is the current one.
+"""
+from __future__ import annotations
+
+import multiprocessing
+from logging import getLogger
+from queue import Empty
+from signal import SIG_IGN, SIGINT, SIGTERM, signal
+from threading import Event, Lock, Thread
+from typing import TYPE_CHECKING, Callable, Dict, List, Optional
+
+from telegram import Update
+
+if TYPE_CHECKING:
+    from telegram.ext import CallbackContext
+
+    from bot import Room
+
+# Updates sent in a chat
+CHAT_UPDATES = (
+    "message",
+    "edited_message",
+    "channel_post",
+    "edited_channel_post",
+    "my_chat_member",
+    "chat_member",
+    "chat_join_request",
+)
+
+logger = getLogger(__name__)
+
+
+def shard_of(chat_id: int, shards: int) -> int:
+    return chat_id % shards
+
+
+def chat_of(data: dict) -> Optional[int]:
+    """The chat of a raw update, if it has one"""
+    for kind in CHAT_UPDATES:
+        if kind in data:
+            return data[kind]["chat"]["id"]
+    message = data.get("callback_query", {}).get("message")
+    if message:
+        return message["chat"]["id"]
+    return None
+
+
+def user_of(data: dict) -> Optional[int]:
+    """The sender of a raw update"""
+    for value in data.values():
+        if isinstance(value, dict) and "from" in value:
+            return value["from"]["id"]
+    return None
+
+
+class RoutingTable:
+    """The chat of every user's current game, across the shards"""
+
+    def __init__(self, shards: int):
+        self.shards = shards
+        self.current: Dict[int, int] = {}
+        # user id -> {shard: chat of the current game on that shard}
+        self.shard_chats: Dict[int, Dict[int, int]] = {}
+        self.lock = Lock()
+
+    def get(self, user_id: int) -> Optional[int]:
+        return self.current.get(user_id)
+
+    def update(self, shard: int, user_id: int, chat_id: Optional[int], joined: bool):
+        """Apply the change of the current game of a user on a shard"""
+        with self.lock:
+            chats = self.shard_chats.setdefault(user_id, {})
+            if chat_id is None:
+                chats.pop(shard, None)
+            else:
+                chats[shard] = chat_id
+
+            current = self.current.get(user_id)
+            if joined:
+                self.current[user_id] = chat_id
+            elif current is None or shard_of(current, self.shards) == shard:
+                # the current game was on this shard, switch to another game
+                if chat_id is not None:
+                    self.current[user_id] = chat_id
+                elif chats:
+                    self.current[user_id] = next(iter(chats.values()))
+                else:
+                    self.current.pop(user_id, None)
+            if not chats:
+                del self.shard_chats[user_id]
+
+
+def run_shard(index: int, shards: int, factory: Callable, inbox, reports):
+    """Main function of a worker process"""
+    # NOTE: the front process decides when to stop
+    for signum in (SIGINT, SIGTERM):
+        signal(signum, SIG_IGN)
+
+    room: Room = factory(index, shards)
+    room.gm.on_current = lambda user_id, chat_id, joined: reports.put(
+        ("route", index, user_id, chat_id, joined)
+    )
+    room.open()
+
+    dispatcher = room.updater.dispatcher
+    ready = Event()
+    thread = Thread(target=dispatcher.start, name="dispatcher", kwargs={"ready": ready})
+    thread.start()
+    ready.wait()
+    reports.put(("ready", index))
+
+    handled = 0
+    for data in iter(inbox.get, None):
+        update = Update.de_json(data, dispatcher.bot)
+        if update is not None:
+            dispatcher.update_queue.put(update)
+            handled += 1
+
+    # The dispatcher only stops once the update queue is empty
+    dispatcher.stop()
+    thread.join()
+    room.close()
+    reports.put(("done", index, handled))
+
+
+class ShardRouter:
+    """Runs the shards and forwards every update to its shard"""
+
+    def __init__(self, shards: int, factory: Callable[[int, int], Room]):
+        """
+        Args:
+            shards (int): Number of worker processes
+            factory (Callable): Picklable function building the Room of a
+                shard from (index, shards)
+        """
+        self.shards = shards
+        self.factory = factory
+        self.table = RoutingTable(shards)
+        self.routed = [0] * shards
+        self.handled: Dict[int, int] = {}
+
+        context = multiprocessing.get_context("spawn")
+        self.inboxes = [context.Queue() for _ in range(shards)]
+        self.reports = context.Queue()
+        self.processes: List[multiprocessing.Process] = [
+            context.Process(
+                target=run_shard,
+                args=(index, shards, factory, inbox, self.reports),
+                name=f"shard-{index}",
+            )
+            for index, inbox in enumerate(self.inboxes)
+        ]
+        self.thread: Optional[Thread] = None
+
+    def route(self, data: dict) -> int:
+        """The shard of a raw update"""
+        chat_id = chat_of(data)
+        if chat_id is None:
+            user_id = user_of(data) or 0
+            chat_id = self.table.get(user_id)
+            if chat_id is None:
+                # the user's private chat, which answers there is no game
+                chat_id = user_id
+        return shard_of(chat_id, self.shards)
+
+    def put(self, data: dict):
+        shard = self.route(data)
+        self.routed[shard] += 1
+        self.inboxes[shard].put(data)
+
+    def handle(self, update: Update, context: CallbackContext):
+        """Handler of the front dispatcher"""
+        self.put(update.to_dict())
+
+    def start(self):
+        """Starts the shards and waits until all of them restored their games"""
+        for process in self.processes:
+            process.start()
+
+        waiting = set(range(self.shards))
+        while waiting:
+            try:
+                report = self.reports.get(timeout=1)
+            except Empty:
+                if not all(process.is_alive() for process in self.processes):
+                    self.stop()
+                    raise RuntimeError("A shard died while starting")
+                continue
+            self.process(report)
+            if report[0] == "ready":
+                waiting.discard(report[1])
+        logger.info("%s shards are ready", self.shards)
+
+        self.thread = Thread(target=self._read_reports, name="shard-reports", daemon=True)
+        self.thread.start()
+
+    def stop(self):
+        """Lets every shard finish its updates and save its games"""
+        for inbox in self.inboxes:
+            inbox.put(None)
+        for process in self.processes:
+            if process.is_alive():
+                process.join()
+        # every report of the shards was sent before they exited
+        self.reports.put(None)
+        if self.thread:
+            self.thread.join()
+        else:
+            self._read_reports()
+        logger.info("Shards stopped after %s updates", sum(self.handled.values()))
+
+    def process(self, report: tuple):
+        kind, index, *args = report
+        if kind == "route":
+            self.table.update(index, *args)
+        elif kind == "done":
+            self.handled[index] = args[0]
+
+    def _read_reports(self):
+        for report in iter(self.reports.get, None):
+            self.process(report)
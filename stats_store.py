@@ -0,0 +1,255 @@
+"""
+Statistics of the players across games, kept in SQLite.
+
+Handlers only add the results of a finished game, and the cards picked as
+the worst, to counters in memory. A background thread writes the counters
+of many games in one transaction every `interval` seconds, or sooner once
+`batch` games are waiting, so a handler never waits for the disk. The
+leaderboard is read from the database by the same thread after a commit of
+any process sharing the database, at most every `refresh` seconds, and
+served from memory.
+"""
+from __future__ import annotations
+
+import sqlite3
+import time
+from collections import Counter
+from logging import getLogger
+from threading import Condition, Lock, Thread
+from typing import TYPE_CHECKING, Dict, Iterable, NamedTuple, Optional, Tuple
+
+if TYPE_CHECKING:
+    from card import Card
+    from game import Game
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS players (
+    user_id INTEGER PRIMARY KEY,
+    first_name TEXT NOT NULL,
+    username TEXT,
+    games INTEGER NOT NULL DEFAULT 0,
+    wins INTEGER NOT NULL DEFAULT 0,
+    losses INTEGER NOT NULL DEFAULT 0,
+    yellow INTEGER NOT NULL DEFAULT 0
+);
+CREATE INDEX IF NOT EXISTS players_by_wins ON players (wins DESC, games);
+CREATE TABLE IF NOT EXISTS cards (
+    card_id INTEGER PRIMARY KEY,
+    picked INTEGER NOT NULL DEFAULT 0
+);
+"""
+
+UPSERT_PLAYER = """
+INSERT INTO players (user_id, first_name, username, games, wins, losses, yellow)
+VALUES (?, ?, ?, ?, ?, ?, ?)
+ON CONFLICT (user_id) DO UPDATE SET
+    first_name = excluded.first_name,
+    username = excluded.username,
+    games = games + excluded.games,
+    wins = wins + excluded.wins,
+    losses = losses + excluded.losses,
+    yellow = yellow + excluded.yellow
+"""
+
+UPSERT_CARD = """
+INSERT INTO cards (card_id, picked) VALUES (?, ?)
+ON CONFLICT (card_id) DO UPDATE SET picked = picked + excluded.picked
+"""
+
+SELECT_TOP = """
+SELECT user_id, first_name, username, games, wins, losses, yellow
+FROM players ORDER BY wins DESC, games LIMIT ?
+"""
+
+logger = getLogger(__name__)
+
+
+class PlayerStats(NamedTuple):
+    user_id: int
+    first_name: str
+    username: Optional[str]
+    games: int = 0
+    wins: int = 0
+    losses: int = 0
+    yellow: int = 0
+
+    def __add__(self, other: PlayerStats) -> PlayerStats:
+        """The counters of both, with the newer name of `other`"""
+        return PlayerStats(
+            self.user_id,
+            other.first_name,
+            other.username,
+            self.games + other.games,
+            self.wins + other.wins,
+            self.losses + other.losses,
+            self.yellow + other.yellow,
+        )
+
+
+class StatsStore:
+    def __init__(
+        self,
+        path: str,
+        interval: float = 5,
+        batch: int = 500,
+        refresh: float = 60,
+        top: int = 10,
+    ):
+        """
+        Args:
+            path (str): The SQLite database
+            interval (float): Seconds between two commits
+            batch (int): Finished games that are committed at once
+            refresh (float): Seconds between two reads of the leaderboard
+            top (int): Players in the leaderboard
+        """
+        self.path = path
+        self.interval = interval
+        self.batch = batch
+        self.refresh = refresh
+        self.top_size = top
+
+        self.condition = Condition()
+        # the counters waiting to be written, by user and by card id
+        self.players: Dict[int, PlayerStats] = {}
+        self.cards: Counter = Counter()
+        self.games = 0
+        # the counters of the transaction being written
+        self.writing: Dict[int, PlayerStats] = {}
+
+        # the leaderboard, replaced as a whole by the writer thread
+        self.top: Tuple[PlayerStats, ...] = ()
+        self.refreshed = 0.0
+        self.committed = 0
+        # commits of this process since the leaderboard was read, the commits
+        # of other processes change the data_version of the connection
+        self.stale = False
+        self.data_version: Optional[int] = None
+
+        self.connection = self.connect()
+        self.connection.executescript(SCHEMA)
+        # single lookups of /stats on the handler threads
+        self.reader = self.connect()
+        self.reader_lock = Lock()
+        self.load_top()
+
+        self.running = False
+        self.thread: Optional[Thread] = None
+
+    def connect(self) -> sqlite3.Connection:
+        connection = sqlite3.connect(self.path, check_same_thread=False)
+        # readers do not block the writer, and commits do not wait for fsync
+        connection.execute("PRAGMA journal_mode = WAL")
+        connection.execute("PRAGMA synchronous = NORMAL")
+        return connection
+
+    def record_game(self, game: Game):
+        """Count a finished game for its players"""
+        loser = game.get_loser()
+        if loser is None:
+            # killed or reaped games are not counted
+            return
+        winners = set(game.get_winners())
+        results = [
+            PlayerStats(
+                player.user.id,
+                player.user.first_name,
+                player.user.username,
+                1,
+                int(player in winners),
+                int(player is loser),
+                -player.score,
+            )
+            for player in game.players
+        ]
+        with self.condition:
+            for stats in results:
+                pending = self.players.get(stats.user_id)
+                if pending is not None:
+                    stats = pending + stats
+                self.players[stats.user_id] = stats
+            self.games += 1
+            if self.games >= self.batch:
+                self.condition.notify()
+
+    def record_picked(self, cards: Iterable[Card]):
+        """Count the yellow cards of the group picked as the worst"""
+        with self.condition:
+            self.cards.update(card.id for card in cards)
+
+    def player(self, user_id: int) -> Optional[PlayerStats]:
+        """The statistics of a user, including the games not written yet"""
+        with self.reader_lock:
+            row = self.reader.execute(
+                "SELECT * FROM players WHERE user_id = ?", (user_id,)
+            ).fetchone()
+        stats = PlayerStats(*row) if row else None
+        with self.condition:
+            for pending in (self.writing.get(user_id), self.players.get(user_id)):
+                if pending is not None:
+                    stats = pending if stats is None else stats + pending
+        return stats
+
+    def flush(self):
+        """Write the waiting counters in one transaction"""
+        with self.condition:
+            players, self.players = self.players, {}
+            cards, self.cards = self.cards, Counter()
+            games, self.games = self.games, 0
+            self.writing = players
+        if players or cards:
+            try:
+                with self.connection:
+                    self.connection.executemany(UPSERT_PLAYER, players.values())
+                    self.connection.executemany(UPSERT_CARD, cards.items())
+            finally:
+                with self.condition:
+                    self.writing = {}
+            self.committed += games
+            self.stale = True
+        self.refresh_top()
+
+    def refresh_top(self):
+        """Read the leaderboard again if any process committed since"""
+        if time.monotonic() - self.refreshed < self.refresh:
+            return
+        if self.stale or self.read_data_version() != self.data_version:
+            self.load_top()
+
+    def read_data_version(self) -> int:
+        (version,) = self.connection.execute("PRAGMA data_version").fetchone()
+        return version
+
+    def load_top(self):
+        self.data_version = self.read_data_version()
+        rows = self.connection.execute(SELECT_TOP, (self.top_size,)).fetchall()
+        self.top = tuple(PlayerStats(*row) for row in rows)
+        self.refreshed = time.monotonic()
+        self.stale = False
+
+    def start(self):
+        self.running = True
+        self.thread = Thread(target=self._run, name="stats", daemon=True)
+        self.thread.start()
+
+    def stop(self):
+        """Write what is waiting and stop the writer"""
+        with self.condition:
+            self.running = False
+            self.condition.notify()
+        if self.thread:
+            self.thread.join()
+        self.flush()
+        self.load_top()
+
+    def _run(self):
+        while True:
+            with self.condition:
+                if self.running and self.games < self.batch:
+                    self.condition.wait(self.interval)
+                if not self.running:
+                    return
+            try:
+                self.flush()
+            except sqlite3.Error:
+                logger.exception("Could not write the statistics to %s", self.path)
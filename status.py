@@ -0,0 +1,118 @@
+"""
+The live status message of the games.
+
+Every game has one status message: whose turn it is, who still owes yellow
+cards and the scores. It is sent once, when the game starts, and then edited
+in place as the game changes instead of a new message for every step. The
+edits go through Outbox.send_latest, so a burst of plays within `delay`
+seconds becomes a single editMessageText.
+"""
+from __future__ import annotations
+
+from functools import partial
+from threading import Lock
+from typing import TYPE_CHECKING, Any, Callable, Dict, Optional, Tuple
+
+from outbox import Priority
+
+if TYPE_CHECKING:
+    from telegram import Message
+
+    from game import Game
+    from outbox import Outbox
+
+# The text and the reply markup of a status message
+Content = Tuple[str, Any]
+
+
+class Status:
+    __slots__ = ("seed", "message_id", "created", "shown")
+
+    def __init__(self, seed: int, content: Content):
+        # the game of the message, chats play one game after another
+        self.seed = seed
+        # None until the message was sent
+        self.message_id: Optional[int] = None
+        # the content the message was sent with, and the latest content
+        self.created = content
+        self.shown = content
+
+
+class StatusBoard:
+    def __init__(
+        self, outbox: Outbox, render: Callable[[Game], Content], delay: float = 1
+    ):
+        """
+        Args:
+            outbox (Outbox): Sends and edits the messages
+            render: The text and the reply markup of the status of a game
+            delay (float): Seconds an edit waits for the changes after it
+        """
+        self.outbox = outbox
+        self.render = render
+        self.delay = delay
+
+        self.lock = Lock()
+        # chat id to the status message of its game
+        self.chats: Dict[int, Status] = {}
+
+    def update(self, game: Game):
+        """Show the current state of a game, called in the mailbox of the game"""
+        content = self.render(game)
+        chat_id = game.chat.id
+        with self.lock:
+            status = self.chats.get(chat_id)
+            if status is None or status.seed != game.seed:
+                status = self.chats[chat_id] = Status(game.seed, content)
+            elif status.shown == content:
+                return
+            else:
+                status.shown = content
+                if status.message_id is None:
+                    # the message is on its way, _created brings it up to date
+                    return
+                self._edit(chat_id, status.message_id, content)
+                return
+
+        text, markup = content
+        self.outbox.send_message(
+            chat_id,
+            text,
+            Priority.HIGH,
+            on_sent=partial(self._created, chat_id, status),
+            reply_markup=markup,
+        )
+
+    def end(self, game: Game):
+        """Forget the status message of a game that ended"""
+        chat_id = game.chat.id
+        with self.lock:
+            status = self.chats.get(chat_id)
+            if status is not None and status.seed == game.seed:
+                del self.chats[chat_id]
+
+    def _created(self, chat_id: int, status: Status, message: Optional[Message]):
+        """The status message was sent, or None if it failed"""
+        with self.lock:
+            if self.chats.get(chat_id) is not status:
+                return
+            if message is None:
+                # the next update sends a new one
+                del self.chats[chat_id]
+                return
+            status.message_id = message.message_id
+            if status.shown != status.created:
+                self._edit(chat_id, status.message_id, status.shown)
+
+    def _edit(self, chat_id: int, message_id: int, content: Content):
+        text, markup = content
+        self.outbox.send_latest(
+            ("status", chat_id),
+            "edit_message_text",
+            chat_id,
+            self.delay,
+            Priority.HIGH,
+            message_id=message_id,
+            text=text,
+            reply_markup=markup,
+        )
@@ -0,0 +1,51 @@
+"""
+Cold import benchmark of card.py
+
+Usage: python -m test.bench_catalog [runs]
+
+Every run imports card.py in a fresh interpreter, once loading the
+precompiled catalog and once forcing the JSON sources.
+"""
+import subprocess
+import sys
+from os import path
+from statistics import median
+
+import catalog
+
+BASE_DIR = path.dirname(path.dirname(path.abspath(__file__)))
+
+TIMED_IMPORT = """
+import time
+import catalog
+{setup}
+t = time.perf_counter()
+import card
+print(time.perf_counter() - t)
+"""
+
+FORCE_JSON = """
+catalog.read = lambda *args, **kwargs: None
+catalog.write = lambda *args, **kwargs: None
+"""
+
+
+def cold_import(setup: str) -> float:
+    output = subprocess.check_output(
+        [sys.executable, "-c", TIMED_IMPORT.format(setup=setup)], cwd=BASE_DIR
+    )
+    return float(output)
+
+
+def main(runs: int = 20):
+    catalog.build()
+
+    results = {}
+    for name, setup in (("json", FORCE_JSON), ("catalog", "")):
+        results[name] = median(cold_import(setup) for _ in range(runs))
+        print(f"{name:>8}: {results[name] * 1000:.2f} ms (median of {runs})")
+    print(f" speedup: {results['json'] / results['catalog']:.2f}x")
+
+
+if __name__ == "__main__":
+    main(*map(int, sys.argv[1:]))
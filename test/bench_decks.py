@@ -0,0 +1,77 @@
+"""
+Deck benchmark at many concurrent games
+
+Usage: python -m test.bench_decks [games] [players]
+
+Starts `games` games of `players` players each and reports the memory held
+by the decks of one game and the CPU time of Game.start and of the refill
+of every hand after a turn.
+"""
+import gc
+import sys
+import time
+
+from telegram import User
+
+from game import Game
+from player import Player
+
+
+def make_games(games: int, players: int):
+    tables = []
+    for chat in range(games):
+        game = Game(None, seed=chat)
+        for i in range(players):
+            Player(game, User(chat * players + i + 1, f"player{i}", False))
+        game.starter = game.players[0].user
+        tables.append(game)
+    return tables
+
+
+def deck_memory(games: int, players: int) -> float:
+    """Bytes held by the two decks of a started game"""
+    tables = make_games(games, players)
+    for game in tables:
+        game.start()
+    decks = sum(
+        sys.getsizeof(game.yellow_deck.indexes) + sys.getsizeof(game.purple_deck.indexes)
+        for game in tables
+    )
+    return decks / games
+
+
+def start_time(games: int, players: int) -> float:
+    tables = make_games(games, players)
+    start = time.thread_time()
+    for game in tables:
+        game.start()
+    return (time.thread_time() - start) / games
+
+
+def refill_time(games: int, players: int, turns: int = 5) -> float:
+    """Every player but the current one plays three cards, then Game.turn"""
+    tables = make_games(games, players)
+    for game in tables:
+        game.start()
+    elapsed = 0.0
+    for _ in range(turns):
+        for game in tables:
+            for player in game.players[1:]:
+                for card in player.hand.cards[-3:]:
+                    player.hand.remove(card)
+            start = time.thread_time()
+            game.turn()
+            elapsed += time.thread_time() - start
+    return elapsed / games / turns
+
+
+def main(games: int = 1000, players: int = 6):
+    gc.disable()
+    print(f"{games} games of {players} players")
+    print(f"deck memory  {deck_memory(games, players) / 1024:8.2f} KiB per game")
+    print(f"Game.start   {start_time(games, players) * 1e6:8.1f} us per game")
+    print(f"Game.turn    {refill_time(games, players) * 1e6:8.1f} us per game")
+
+
+if __name__ == "__main__":
+    main(*map(int, sys.argv[1:]))
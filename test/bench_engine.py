@@ -0,0 +1,252 @@
+"""
+Game engine microbenchmarks
+
+Usage: python -m test.bench_engine [--output FILE] [--baseline FILE]
+                                   [--threshold RATIO] [--update-baseline]
+                                   [--runs N] [--filter TEXT]
+
+Times the operations run for every update across table sizes and deck fill
+levels, and writes the results as JSON. Timings are in CPU time of the
+benchmark thread, so time spent descheduled or throttled by a CPU quota is
+not counted. Every timing is also divided by the time of a fixed pure Python
+reference workload measured right before it: this score stays comparable
+between machines. With --baseline (the committed test/baselines/engine.json
+by default) the run fails when the score of an operation got worse than the
+baseline by more than --threshold; suspected regressions are measured again
+before they are reported. A new baseline keeps the median of three runs.
+"""
+import argparse
+import gc
+import json
+import sys
+import time
+from array import array
+from functools import partial
+from os import path
+from typing import Callable, Dict, Iterator, List, Tuple
+
+from telegram import User
+
+import utils
+from card import PURPLE_CARDS, YELLOW_CARDS, Card
+from deck import Deck
+from game import Game
+from player import Player
+
+BASELINE = path.join(path.dirname(path.abspath(__file__)), "baselines", "engine.json")
+
+TABLE_SIZES = (3, 4, 6, 8, 12)
+# fraction of the yellow cards left in the deck after dealing
+FILL_LEVELS = (1.0, 0.5, 0.1)
+
+# renderer name and the arguments after the game
+RENDERERS = (
+    ("make_status", ()),
+    ("make_play_progress", ()),
+    ("make_current_settlement", ()),
+    ("make_settlement", ()),
+    ("make_card_players", (1,)),
+    ("make_room_info", ()),
+)
+
+# a timing repeats the statement for at least this many seconds
+MIN_TIME = 0.02
+REPEAT = 7
+
+Case = Tuple[str, Callable[[], object]]
+
+
+def reference():
+    """A fixed mix of Python operations measuring the speed of the machine"""
+    values = {}
+    for i in range(200):
+        values[i] = str(i)
+    return sorted(values.values())
+
+
+def make_game(players: int, fill: float = 1.0) -> Game:
+    """A started game after every player played, waiting for the loser"""
+    game = Game(None, seed=players)
+    for i in range(players):
+        Player(game, User(i + 1, f"player{i}", False, username=f"player{i}"))
+    game.starter = game.players[0].user
+    game.start()
+
+    deck = game.yellow_deck
+    del deck.indexes[: len(deck) - int(len(deck) * fill)]
+    deck.shuffled = min(deck.shuffled, len(deck))
+
+    purple = max(game.view.purple_choices, key=lambda card: card.space)
+    game.current_player.play(purple)
+    for player in game.players[1:]:
+        for card in player.hand.cards[: purple.space]:
+            player.play(card)
+
+    game.board.loser = game.players[-1]
+    game.players[-1].score = -2
+    return game
+
+
+def put_back(deck: Deck, cards: List[Card]):
+    """Put cards back at the bottom of the deck"""
+    deck.indexes[:0] = array("H", [card.index for card in cards])
+
+
+def redraw(deck: Deck, n: int):
+    put_back(deck, deck.draw_many(n))
+
+
+def played_turn(game: Game):
+    """Give the played cards back to the deck and start the next turn"""
+    deck = game.yellow_deck
+    space = game.board.purple.space
+    for player in game.players:
+        if player is not game.current_player:
+            played = player.hand.cards[-space:]
+            for card in played:
+                player.hand.remove(card)
+            put_back(deck, played)
+    game.turn()
+    game.board.purple = game.purple_deck.peek(1)[0]
+
+
+def restart(game: Game):
+    game.state = Game.State.START
+    for player in game.players:
+        player.hand.clear()
+    game.start()
+
+
+def cases() -> Iterator[Case]:
+    ids = [str(card.id) for card in YELLOW_CARDS + PURPLE_CARDS]
+    yield "Card.from_id", lambda: Card.from_id(ids[len(ids) // 2])
+
+    for players in TABLE_SIZES:
+        tag = f"[players={players}]"
+        game = make_game(players)
+        board = game.board
+        player = game.players[-1]
+
+        yield "Game.players" + tag, lambda game=game: game.players
+        if players >= 4:
+            yield "Player.front" + tag, lambda player=player: player.front
+        yield "Board.is_others_played" + tag, lambda board=board: board.is_others_played
+        yield "Board.get_cards" + tag, board.get_cards
+        yield "Board.get_players" + tag, board.get_players
+        yield "Board.get_loser" + tag, lambda board=board, n=players - 1: board.get_loser(n)
+        yield "Game.get_loser" + tag, game.get_loser
+        yield "Game.start" + tag, lambda game=make_game(players): restart(game)
+        for name, args in RENDERERS:
+            render = partial(getattr(utils, name), game, *args)
+            yield f"utils.{name}{tag}", render
+
+        for fill in FILL_LEVELS:
+            tag = f"[players={players},fill={fill}]"
+            game = make_game(players, fill)
+            deck = game.yellow_deck
+            yield "Deck.draw" + tag, lambda deck=deck: redraw(deck, 1)
+            yield "Deck.draw_many" + tag, lambda deck=deck: redraw(deck, 13)
+            yield "Game.turn" + tag, lambda game=game: played_turn(game)
+
+
+def measure(stmt: Callable[[], object]) -> float:
+    """The best CPU time of one call in nanoseconds"""
+    gc.disable()
+    try:
+        return _measure(stmt)
+    finally:
+        gc.enable()
+
+
+def _measure(stmt: Callable[[], object]) -> float:
+    number = 1
+    while True:
+        start = time.thread_time()
+        for _ in range(number):
+            stmt()
+        elapsed = time.thread_time() - start
+        if elapsed >= MIN_TIME:
+            break
+        number *= 2 if elapsed * 10 > MIN_TIME else 10
+
+    best = elapsed
+    for _ in range(REPEAT - 1):
+        start = time.thread_time()
+        for _ in range(number):
+            stmt()
+        best = min(best, time.thread_time() - start)
+    return best / number * 1e9
+
+
+def score(stmt: Callable[[], object], runs: int = 1) -> dict:
+    """The median timing and score of several runs"""
+    results = []
+    for _ in range(runs):
+        reference_ns = measure(reference)
+        ns = measure(stmt)
+        results.append({"ns": round(ns, 1), "score": round(ns / reference_ns, 5)})
+    return sorted(results, key=lambda result: result["score"])[runs // 2]
+
+
+def run(pattern: str = "", runs: int = 1) -> dict:
+    return {name: score(stmt, runs) for name, stmt in cases() if pattern in name}
+
+
+def compare(current: dict, baseline: dict, threshold: float) -> Dict[str, float]:
+    """The operations slower than the baseline by more than the threshold"""
+    regressions = {}
+    for name, result in current.items():
+        if name in baseline:
+            ratio = result["score"] / baseline[name]["score"]
+            if ratio > threshold:
+                regressions[name] = ratio
+    return regressions
+
+
+def confirm(current: dict, baseline: dict, threshold: float, retries: int = 2):
+    """Measure the suspected regressions again and keep their best scores"""
+    statements = dict(cases())
+    for _ in range(retries):
+        for name in compare(current, baseline, threshold):
+            result = score(statements[name])
+            if result["score"] < current[name]["score"]:
+                current[name] = result
+    return compare(current, baseline, threshold)
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--output", default="bench_engine.json")
+    parser.add_argument("--baseline", default=BASELINE)
+    parser.add_argument("--threshold", type=float, default=1.5)
+    parser.add_argument("--update-baseline", action="store_true")
+    parser.add_argument("--runs", type=int)
+    parser.add_argument("--filter", default="")
+    args = parser.parse_args(argv)
+
+    current = run(args.filter, args.runs or (3 if args.update_baseline else 1))
+
+    baseline = {}
+    if path.exists(args.baseline) and not args.update_baseline:
+        with open(args.baseline) as f:
+            baseline = json.load(f)
+    regressions = confirm(current, baseline, args.threshold)
+
+    with open(args.update_baseline and args.baseline or args.output, "w") as f:
+        json.dump(current, f, indent=2)
+        f.write("\n")
+
+    print(f"{'operation':<60} {'ns':>10} {'score':>8} {'baseline':>9}")
+    for name, result in current.items():
+        ratio = ""
+        if name in baseline:
+            ratio = f"{result['score'] / baseline[name]['score']:.2f}x"
+        print(f"{name:<60} {result['ns']:>10.0f} {result['score']:>8.3f} {ratio:>9}")
+
+    for name, ratio in regressions.items():
+        print(f"REGRESSION {name}: {ratio:.2f}x the baseline")
+    return 1 if regressions else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,23 @@
+"""
+End-to-end game throughput benchmark
+
+Usage: python -m test.bench_games [chats] [players] [games]
+
+Plays `games` full games in `chats` concurrent chats through the Room
+handlers with the headless simulation, then reports games/s, the handler
+latency percentiles of each update type and the outbound calls per game.
+"""
+import logging
+import sys
+
+from test.simulation import Simulation
+
+
+def main(chats: int = 20, players: int = 5, games: int = 100):
+    # the handlers log every join and state change
+    logging.getLogger().setLevel(logging.WARNING)
+    print(Simulation(chats, players, games).run().report())
+
+
+if __name__ == "__main__":
+    main(*map(int, sys.argv[1:]))
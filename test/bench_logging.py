@@ -0,0 +1,110 @@
+"""
+Logging overhead benchmark
+
+Usage: python -m test.bench_logging [games]
+
+Counts the log calls of the simulated games per update and level, then
+times one call in the handler thread: below the level, through the queue
+of log.setup and written synchronously by a StreamHandler as before. The
+per-update overhead is the number of calls times their cost.
+"""
+import logging
+import os
+import sys
+import time
+from collections import Counter
+
+import log
+from game import Game
+from log import game_event
+from player import Player
+from test.simulation import Simulation
+
+OLD_FORMAT = "%(asctime)s - %(filename)s:%(lineno)d - %(levelname)s - %(message)s"
+
+
+class CountingHandler(logging.Handler):
+    """Counts the records of the bot's modules by level"""
+
+    def __init__(self):
+        super().__init__()
+        self.counts = Counter()
+
+    def emit(self, record):
+        if not record.name.startswith("telegram"):
+            self.counts[record.levelno >= logging.INFO] += 1
+
+
+def reset_root(*handlers, level=logging.DEBUG):
+    root = logging.getLogger()
+    for handler in list(root.handlers):
+        root.removeHandler(handler)
+    for handler in handlers:
+        root.addHandler(handler)
+    root.setLevel(level)
+
+
+def calls_per_update(games: int):
+    """The INFO and above, and the DEBUG log calls of the bot in an update"""
+    counter = CountingHandler()
+    reset_root(counter)
+    simulation = Simulation(10, 4, games, metrics=False).run()
+    updates = sum(map(len, simulation.latencies.values()))
+    return counter.counts[True] / updates, counter.counts[False] / updates
+
+
+def cost(call, number: int = 20000) -> float:
+    """CPU time of one call in the calling thread in microseconds"""
+    best = float("inf")
+    for _ in range(5):
+        start = time.thread_time()
+        for _ in range(number):
+            call()
+        best = min(best, time.thread_time() - start)
+    return best / number * 1e6
+
+
+def main(games: int = 40):
+    info, debug = calls_per_update(games)
+    print(f"log calls per update: {info:.2f} INFO and above, {debug:.2f} DEBUG")
+
+    game = Game(None)
+    players = [Player(game, f"Player {i}") for i in range(3)]
+    game.start()
+    player, card = players[1], players[1].hand.cards[0]
+    logger = logging.getLogger("board")
+
+    def event():
+        logger.debug("Yellow card played", extra=game_event(game, player, card))
+
+    def eager():
+        logger.info(f"{card.color} == {card.color}")
+
+    reset_root(level=logging.INFO)
+    disabled = cost(event)
+
+    devnull = open(os.devnull, "w")
+    old = logging.StreamHandler(devnull)
+    old.setFormatter(logging.Formatter(OLD_FORMAT))
+    reset_root(old, level=logging.INFO)
+    synchronous = cost(eager)
+
+    reset_root()
+    log.setup({"level": "DEBUG"}, devnull)
+    queued = cost(event)
+    log.shutdown()
+    reset_root(level=logging.WARNING)
+    devnull.close()
+
+    print(f"{'call':<32} {'us':>6}")
+    print(f"{'below the level':<32} {disabled:>6.2f}")
+    print(f"{'queued (log.setup)':<32} {queued:>6.2f}")
+    print(f"{'written synchronously':<32} {synchronous:>6.2f}")
+    print("overhead per update")
+    print(f"  INFO, queued           {info * queued + debug * disabled:>6.2f} us")
+    print(f"  DEBUG, queued          {(info + debug) * queued:>6.2f} us")
+    print(f"  DEBUG, synchronously   {(info + debug) * synchronous:>6.2f} us")
+
+
+if __name__ == "__main__":
+    main(*map(int, sys.argv[1:]))
@@ -0,0 +1,73 @@
+"""
+Memory budget of the games
+
+Usage: python -m test.bench_memory [games]
+
+Measures with tracemalloc the bytes held by an idle lobby of 3 players, by
+a running game of 4 and of 8 players in the middle of a turn, and by each
+player of a running game, to plan the games a process can hold.
+"""
+import gc
+import sys
+import tracemalloc
+
+from telegram import Chat, User
+
+from game_manager import GameManager
+
+
+def make_users(first: int, count: int):
+    """Users as they come with the updates"""
+    return [
+        User(i, f"player{i}", False, username=f"player{i}", language_code="zh-hant")
+        for i in range(first, first + count)
+    ]
+
+
+def play_turn(game):
+    """Play the purple card and the yellow cards of half of the players"""
+    game.current_player.play(game.view.purple_choices[0])
+    for player in game.players[1 : len(game.players) // 2 + 1]:
+        player.play(player.hand.cards[0])
+
+
+def measure(games: int, players: int, started: bool) -> float:
+    """Bytes per game held by a GameManager of `games` games"""
+    chats = [Chat(-i - 1, "group", title=f"group{i}") for i in range(games)]
+    gc.collect()
+    tracemalloc.start()
+    before = tracemalloc.get_traced_memory()[0]
+
+    gm = GameManager()
+    for chat in chats:
+        users = make_users(-chat.id * 100, players)
+        game = gm.new_game(chat)
+        game.starter = users[0]
+        for user in users:
+            gm.join_game(user, chat)
+        if started:
+            game.start()
+            play_turn(game)
+
+    del users, game
+    gc.collect()
+    after = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    del gm
+    return (after - before) / games
+
+
+def main(games: int = 200):
+    lobby = measure(games, 3, False)
+    small = measure(games, 4, True)
+    large = measure(games, 8, True)
+    print(f"{'':<24} {'KiB':>8}")
+    print(f"{'idle lobby (3 players)':<24} {lobby / 1024:>8.2f}")
+    print(f"{'running game (4 players)':<24} {small / 1024:>8.2f}")
+    print(f"{'running game (8 players)':<24} {large / 1024:>8.2f}")
+    print(f"{'player':<24} {(large - small) / 4 / 1024:>8.2f}")
+    print(f"running games of 4 per 100 MiB: {100 * 2 ** 20 / small:.0f}")
+
+
+if __name__ == "__main__":
+    main(*map(int, sys.argv[1:]))
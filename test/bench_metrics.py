@@ -0,0 +1,60 @@
+"""
+Metrics overhead benchmark
+
+Usage: python -m test.bench_metrics [games] [runs]
+
+Times the recording primitives, then plays the same simulated games with
+the metrics on and off (alternating, best of `runs`) and reports the cost
+per update.
+"""
+import logging
+import sys
+from timeit import timeit
+
+from metrics import Histogram, Metrics, TimedRequest
+from test.simulation import FakeRequest, Simulation
+
+
+def handler(update, context):
+    pass
+
+
+def micro(number: int = 200000):
+    metrics = Metrics()
+    histogram = Histogram()
+    timed = metrics.timed(handler)
+    request = FakeRequest()
+    timed_request = TimedRequest(request, metrics)
+    url = "https://api.telegram.org/bot/answerCallbackQuery"
+    stmts = (
+        ("Histogram.observe", lambda: histogram.observe(0.003)),
+        ("bare handler", lambda: handler(None, None)),
+        ("timed handler", lambda: timed(None, None)),
+        ("bare request", lambda: request.post(url, {})),
+        ("timed request", lambda: timed_request.post(url, {})),
+    )
+    for name, stmt in stmts:
+        print(f"{name:<20} {timeit(stmt, number=number) / number * 1e9:>8.0f} ns")
+
+
+def main(games: int = 60, runs: int = 3):
+    logging.getLogger().setLevel(logging.WARNING)
+    micro()
+
+    best = {}
+    for _ in range(runs):
+        for enabled in (False, True):
+            simulation = Simulation(chats=10, players=5, games=games, metrics=enabled)
+            simulation.run()
+            updates = sum(map(len, simulation.latencies.values()))
+            rate = updates / simulation.elapsed
+            best[enabled] = max(best.get(enabled, 0), rate)
+
+    off, on = best[False], best[True]
+    print(f"metrics off {off:>8.0f} updates/s")
+    print(f"metrics on  {on:>8.0f} updates/s")
+    print(f"overhead    {(1 / on - 1 / off) * 1e6:>8.1f} us per update ({off / on - 1:+.1%})")
+
+
+if __name__ == "__main__":
+    main(*map(int, sys.argv[1:]))
@@ -0,0 +1,48 @@
+"""
+Replay benchmark
+
+Usage: python -m test.bench_replay [FILE]
+
+Replays the journals of FILE (a journal file or a snapshot), or of the games
+of a simulation, with the engine alone: no Bot API, no handlers. Reports
+the games and actions replayed per second of CPU time.
+"""
+import sys
+import time
+from collections import Counter
+
+from journal import Action, Journal
+from replay import read_journals, replay
+from test.simulation import Simulation
+
+
+def simulated(games: int = 40):
+    """The journals of the games of a simulation"""
+    journals = []
+    simulation = Simulation(10, 4, games, metrics=False)
+    simulation.room.gm.on_end = lambda game: journals.append(
+        (game.chat.id, game.seed, Journal(game.journal.tobytes()))
+    )
+    simulation.run()
+    return journals
+
+
+def main(path: str = ""):
+    journals = list(read_journals(path)) if path else simulated()
+    actions = Counter(action for _, _, journal in journals for action, _, _ in journal)
+    total = sum(actions.values())
+    print(f"{len(journals)} games, {total} actions")
+    for action in Action:
+        print(f"  {action.name:<10} {actions[action] / max(len(journals), 1):>8.1f} per game")
+
+    best = float("inf")
+    for _ in range(5):
+        start = time.thread_time()
+        for _, seed, journal in journals:
+            replay(seed, journal)
+        best = min(best, time.thread_time() - start)
+    print(f"{len(journals) / best:.0f} games/s, {total / best:.0f} actions/s")
+
+
+if __name__ == "__main__":
+    main(*sys.argv[1:])
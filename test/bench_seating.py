@@ -0,0 +1,53 @@
+"""
+Seating microbenchmark
+
+Usage: python -m test.bench_seating [number]
+
+Compares the cached roster and O(1) neighbour lookups of the seating ring
+with walking the players one by one, as the former linked list did.
+"""
+import sys
+from timeit import timeit
+
+from game import Game
+from player import Player
+
+
+def walk_players(game):
+    """The former Game.players: walk the ring and build a new list"""
+    players = []
+    current_player = game.current_player
+    itplayer = current_player.next
+    players.append(current_player)
+    while itplayer and itplayer is not current_player:
+        players.append(itplayer)
+        itplayer = itplayer.next
+    return players
+
+
+def walk_front(game, player):
+    """The former Player.front: two roster walks plus pointer chasing"""
+    if len(walk_players(game)) <= 7:
+        return player.next.next
+    return player.next.next.next
+
+
+def main(number: int = 100000):
+    print(f"{'seats':>5} {'walk':>10} {'roster':>10} {'walk front':>11} {'front':>10}")
+    for seats in (3, 4, 5, 8, 12, 16, 20):
+        game = Game(None)
+        players = [Player(game, i) for i in range(seats)]
+        player = players[-1]
+
+        stmts = [lambda: walk_players(game), lambda: game.players]
+        # a table needs at least 4 seats to have a front player
+        if seats >= 4:
+            stmts += [lambda: walk_front(game, player), lambda: player.front]
+
+        row = [f"{timeit(stmt, number=number) / number * 1e9:.0f} ns" for stmt in stmts]
+        row += ["-"] * (4 - len(row))
+        print(f"{seats:>5} {row[0]:>10} {row[1]:>10} {row[2]:>11} {row[3]:>10}")
+
+
+if __name__ == "__main__":
+    main(*map(int, sys.argv[1:]))
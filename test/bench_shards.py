@@ -0,0 +1,73 @@
+"""
+Sharding throughput benchmark
+
+Usage: python -m test.bench_shards [chats] [infos] [max_shards]
+
+Every chat plays the same script: /new, three /join, /start and `infos`
+times /info, so each update answers with one message. The updates of all
+chats are interleaved and fed to a ShardRouter, the time is measured until
+the fake Bot API received every answer. Runs from 1 to `max_shards`
+processes (default: the number of cores).
+"""
+import os
+import sys
+import time
+from functools import partial
+
+from shard import ShardRouter
+from test.fake_api import FakeBotAPI
+from test.test_shard import command, fake_room
+
+
+def script(chats: int, infos: int):
+    """The interleaved updates of all chats and the number of answers"""
+    scripts = []
+    for chat in range(chats):
+        chat_id = -1000 - chat
+        users = [chat * 4 + i + 1 for i in range(4)]
+        texts = [(users[0], "/new")] + [(user, "/join") for user in users[1:]]
+        texts += [(users[0], "/start")] + [(users[i % 4], "/info") for i in range(infos)]
+        scripts.append([(chat_id, user, text) for user, text in texts])
+
+    updates = []
+    for step in zip(*scripts):
+        for chat_id, user, text in step:
+            updates.append(command(len(updates) + 1, chat_id, user, text))
+    # /new and /start answer twice
+    return updates, chats * (len(scripts[0]) + 2)
+
+
+def bench(shards: int, updates: list, answers: int) -> float:
+    api = FakeBotAPI()
+    api.start()
+    router = ShardRouter(shards, partial(fake_room, api.base_url))
+    router.start()
+
+    start = time.perf_counter()
+    for update in updates:
+        router.put(update)
+    while api.count("sendMessage") < answers:
+        time.sleep(0.001)
+    elapsed = time.perf_counter() - start
+
+    router.stop()
+    api.stop()
+    return elapsed
+
+
+def main(chats: int = 64, infos: int = 20, max_shards: int = os.cpu_count()):
+    updates, answers = script(chats, infos)
+    print(f"{len(updates)} updates in {chats} chats, {os.cpu_count()} cores")
+    print(f"{'shards':>6} {'time':>8} {'updates/s':>10} {'speedup':>8}")
+    base = None
+    for shards in range(1, max_shards + 1):
+        elapsed = bench(shards, updates, answers)
+        base = base or elapsed
+        print(
+            f"{shards:>6} {elapsed:>7.2f}s {len(updates) / elapsed:>10.0f} "
+            f"{base / elapsed:>7.2f}x"
+        )
+
+
+if __name__ == "__main__":
+    main(*map(int, sys.argv[1:]))
@@ -0,0 +1,42 @@
+"""
+Snapshot benchmark
+
+Usage: python -m test.bench_snapshot [games] [players]
+
+Reports the size of a snapshot of running games and the time to save and
+restore it.
+"""
+import random
+import sys
+from timeit import timeit
+
+from telegram import Chat, User
+
+from game_manager import GameManager
+from persistence import dump, load
+
+
+def main(games: int = 1000, players: int = 5):
+    gm = GameManager()
+    for i in range(games):
+        chat = Chat(-i - 1, "group", title=f"group{i}")
+        game = gm.new_game(chat)
+        for j in range(players):
+            user = User(i * players + j, f"user{j}", False, username=f"user{j}")
+            game.starter = game.starter or user
+            gm.join_game(user, chat)
+        random.seed(i)
+        game.start()
+
+    data = dump(gm)
+    number = 5
+    save = timeit(lambda: dump(gm), number=number) / number
+    restore = timeit(lambda: load(data, GameManager()), number=number) / number
+    print(f"{games} games, {players} players each")
+    print(f"size    {len(data) / 1024:.0f} KiB ({len(data) / games:.0f} bytes per game)")
+    print(f"save    {save * 1000:.1f} ms")
+    print(f"restore {restore * 1000:.1f} ms")
+
+
+if __name__ == "__main__":
+    main(*map(int, sys.argv[1:]))
@@ -0,0 +1,60 @@
+"""
+Statistics store benchmark
+
+Usage: python -m test.bench_stats [games] [players] [batch]
+
+Ends `games` finished games of `players` players each as fast as possible
+while the StatsStore writes them in the background. Reports the time a
+handler spends recording a game, and the games per minute the writer
+commits, which must stay well above the games ending in production.
+"""
+import os
+import sys
+import tempfile
+import time
+
+from telegram import User
+
+from game import Game
+from stats_store import StatsStore
+
+# distinct tables whose results are recorded again and again
+TABLES = 200
+
+
+def finished_game(table: int, players: int) -> Game:
+    game = Game(None, seed=table)
+    for i in range(players):
+        user_id = table * players + i
+        game.join(User(user_id, f"user{user_id}", False, username=f"user{user_id}"))
+    game.start()
+    game.players[table % players].score = -6
+    return game
+
+
+def main(games: int = 50000, players: int = 5, batch: int = 500):
+    tables = [finished_game(table, players) for table in range(TABLES)]
+    with tempfile.TemporaryDirectory() as directory:
+        store = StatsStore(os.path.join(directory, "stats.db"), batch=batch)
+        store.start()
+
+        start = time.perf_counter()
+        handler = 0.0
+        for i in range(games):
+            game = tables[i % TABLES]
+            began = time.perf_counter()
+            store.record_game(game)
+            store.record_picked(game.players[0].hand.cards[:2])
+            handler += time.perf_counter() - began
+        store.stop()
+        elapsed = time.perf_counter() - start
+        size = os.path.getsize(store.path)
+
+    print(f"{games} games of {players} players, batches of {batch} games")
+    print(f"handler   {handler / games * 1e6:.1f} µs per game")
+    print(f"committed {store.committed / elapsed * 60:,.0f} games/min")
+    print(f"database  {size / 1024:.0f} KiB")
+
+
+if __name__ == "__main__":
+    main(*map(int, sys.argv[1:]))
@@ -0,0 +1,118 @@
+"""
+Ingestion latency benchmark: long polling against the webhook server
+
+Usage: python -m test.bench_webhook [updates] [interval_ms] [latency_ms]
+
+A local fake Bot API emits inline queries at a fixed interval. With polling
+they are fetched through getUpdates, with the webhook they are POSTed to
+WebhookServer. The latency is measured from the moment an update is emitted
+until a handler sees it. `latency_ms` is the simulated one-way network delay.
+"""
+import json
+import sys
+import time
+from queue import Queue
+from statistics import median, quantiles
+from threading import Thread
+from urllib.request import Request, urlopen
+
+from telegram import Update
+from telegram.ext import Dispatcher, TypeHandler, Updater
+from telegram.utils.request import Request as BotRequest
+
+from test.fake_api import FakeBotAPI
+from webhook import SECRET_TOKEN_HEADER, WebhookServer
+
+SECRET_TOKEN = "secret"
+
+
+def make_update(update_id: int) -> dict:
+    user = {"id": update_id % 50, "is_bot": False, "first_name": "user"}
+    return {
+        "update_id": update_id,
+        "inline_query": {"id": str(update_id), "from": user, "query": "", "offset": ""},
+    }
+
+
+def recorder(received: dict):
+    def record(update: Update, context):
+        received[update.update_id] = time.perf_counter()
+
+    return TypeHandler(Update, record)
+
+
+def wait_for(received: dict, count: int, timeout: float = 30):
+    deadline = time.monotonic() + timeout
+    while len(received) < count and time.monotonic() < deadline:
+        time.sleep(0.01)
+
+
+def bench_polling(count: int, interval: float, latency: float) -> list:
+    api = FakeBotAPI(latency)
+    api.start()
+    received = {}
+    updater = Updater(bot=api.bot(request=BotRequest(con_pool_size=8)), workers=4)
+    updater.dispatcher.add_handler(recorder(received))
+    updater.start_polling(poll_interval=0, timeout=10)
+
+    emitted = {}
+    for update_id in range(1, count + 1):
+        emitted[update_id] = time.perf_counter()
+        api.push_update(make_update(update_id))
+        time.sleep(interval)
+
+    wait_for(received, count)
+    updater.stop()
+    api.stop()
+    return [received[i] - emitted[i] for i in received]
+
+
+def bench_webhook(count: int, interval: float, latency: float) -> list:
+    api = FakeBotAPI(latency)
+    api.start()
+    received = {}
+    dispatcher = Dispatcher(api.bot(), Queue(), workers=4)
+    dispatcher.add_handler(recorder(received))
+    server = WebhookServer(dispatcher, port=0, secret_token=SECRET_TOKEN)
+    server.start()
+    url = f"http://127.0.0.1:{server.port}/"
+
+    def deliver(update: dict):
+        # Telegram pushes every update over its own connection
+        time.sleep(latency)
+        request = Request(
+            url,
+            data=json.dumps(update).encode(),
+            headers={SECRET_TOKEN_HEADER: SECRET_TOKEN},
+        )
+        urlopen(request).close()
+
+    emitted = {}
+    for update_id in range(1, count + 1):
+        emitted[update_id] = time.perf_counter()
+        Thread(target=deliver, args=(make_update(update_id),)).start()
+        time.sleep(interval)
+
+    wait_for(received, count)
+    server.stop()
+    api.stop()
+    return [received[i] - emitted[i] for i in received]
+
+
+def report(name: str, latencies: list):
+    ms = sorted(t * 1000 for t in latencies)
+    p95 = quantiles(ms, n=20)[-1]
+    print(
+        f"{name:>8}: n={len(ms)} p50={median(ms):.2f} ms "
+        f"p95={p95:.2f} ms max={ms[-1]:.2f} ms"
+    )
+
+
+def main(count: int = 200, interval_ms: float = 5, latency_ms: float = 20):
+    count, interval, latency = int(count), interval_ms / 1000, latency_ms / 1000
+    report("polling", bench_polling(count, interval, latency))
+    report("webhook", bench_webhook(count, interval, latency))
+
+
+if __name__ == "__main__":
+    main(*map(float, sys.argv[1:]))
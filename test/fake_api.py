@@ -0,0 +1,148 @@
+"""
+A local fake of the Telegram Bot API.
+
+It records every call, serves queued updates to getUpdates and can answer
+with 429 (flood control) errors on demand, so the bot can be exercised
+without a network connection or a real token.
+"""
+import json
+import time
+from collections import Counter
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from threading import Condition, Lock, Thread
+
+from telegram import Bot
+
+TOKEN = "123:abc"
+
+BOT_USER = {"id": 123, "is_bot": True, "first_name": "Bot", "username": "bot"}
+
+
+class FakeAPIHandler(BaseHTTPRequestHandler):
+    def do_POST(self):
+        api = self.server.api
+
+        method = self.path.rsplit("/", 1)[-1]
+        length = int(self.headers.get("Content-Length", 0))
+        body = self.rfile.read(length)
+        params = json.loads(body) if body else {}
+
+        data = json.dumps(api.call(method, params)).encode()
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def log_message(self, format, *args):
+        pass
+
+
+class FakeBotAPI:
+    def __init__(self, latency: float = 0):
+        # simulated one-way network latency, paid on the request and the response
+        self.latency = latency
+
+        self.calls = []
+        self.counts = Counter()
+        self.floods = Counter()
+        self.flood_retry_after = 1
+        self.lock = Lock()
+
+        self.updates = []
+        self.update_condition = Condition()
+
+        self.message_id = 0
+
+        self.httpd = ThreadingHTTPServer(("127.0.0.1", 0), FakeAPIHandler)
+        self.httpd.daemon_threads = True
+        self.httpd.api = self
+        self.thread = None
+
+    @property
+    def base_url(self) -> str:
+        return f"http://127.0.0.1:{self.httpd.server_address[1]}/bot"
+
+    def bot(self, **kwargs) -> Bot:
+        return Bot(TOKEN, base_url=self.base_url, **kwargs)
+
+    def start(self):
+        self.thread = Thread(target=self.httpd.serve_forever, daemon=True)
+        self.thread.start()
+
+    def stop(self):
+        self.httpd.shutdown()
+        self.httpd.server_close()
+        with self.update_condition:
+            self.update_condition.notify_all()
+
+    def push_update(self, update: dict):
+        """Queue an update for getUpdates"""
+        with self.update_condition:
+            self.updates.append(update)
+            self.update_condition.notify_all()
+
+    def flood(self, method: str, times: int, retry_after: float = 1):
+        """Answer the next `times` calls of a method with a 429 error"""
+        with self.lock:
+            self.floods[method] += times
+            self.flood_retry_after = retry_after
+
+    def count(self, method: str = None) -> int:
+        if method is None:
+            return sum(self.counts.values())
+        return self.counts[method]
+
+    def call(self, method: str, params: dict) -> dict:
+        if self.latency:
+            time.sleep(self.latency)
+
+        with self.lock:
+            if self.floods[method] > 0:
+                self.floods[method] -= 1
+                return {
+                    "ok": False,
+                    "error_code": 429,
+                    "description": "Too Many Requests: retry after "
+                    + str(self.flood_retry_after),
+                    "parameters": {"retry_after": self.flood_retry_after},
+                }
+            self.calls.append((method, params))
+            self.counts[method] += 1
+
+        handler = getattr(self, "api_" + method, None)
+        result = handler(params) if handler else True
+        if self.latency:
+            time.sleep(self.latency)
+        return {"ok": True, "result": result}
+
+    def api_getMe(self, params):
+        return BOT_USER
+
+    def api_getUpdates(self, params):
+        # the parameters may be sent as strings
+        offset = int(params.get("offset") or 0)
+        deadline = time.monotonic() + float(params.get("timeout") or 0)
+        with self.update_condition:
+            while True:
+                updates = [u for u in self.updates if u["update_id"] >= offset]
+                remaining = deadline - time.monotonic()
+                if updates or remaining <= 0:
+                    return updates
+                self.update_condition.wait(remaining)
+
+    def make_message(self, params) -> dict:
+        with self.lock:
+            self.message_id += 1
+            message_id = self.message_id
+        return {
+            "message_id": int(params.get("message_id", message_id)),
+            "date": int(time.time()),
+            "chat": {"id": int(params.get("chat_id", 0)), "type": "group"},
+            "from": BOT_USER,
+            "text": params.get("text", ""),
+        }
+
+    api_sendMessage = make_message
+    api_sendSticker = make_message
+    api_editMessageText = make_message
@@ -0,0 +1,305 @@
+"""
+Headless game simulation.
+
+Drives full games through the real Room handlers without Telegram: the
+updates are synthetic, the bot talks to an in-process fake request object
+that records every outgoing call. Every chat is played by scripted players
+in its own thread, from /new through the reveal, the loser selection and
+the discard until the settlement.
+"""
+import random
+import time
+from collections import Counter, defaultdict
+from itertools import count
+from statistics import quantiles
+from threading import Event, Lock, Thread
+from typing import Dict, List, Optional
+
+from telegram import Bot, Update
+from telegram.ext import CallbackContext, Updater
+
+from bot import Room
+from game import Game
+from game_manager import GameManager
+from metrics import Metrics, TimedRequest
+
+TOKEN = "123:abc"
+
+BOT_USER = {"id": 123, "is_bot": True, "first_name": "Bot", "username": "bot"}
+
+# Never throttle the simulated Bot API
+OUTBOX = {"global_rate": 1e6, "chat_rate": 1e6, "chat_burst": 1e6}
+
+# Updates of a single game before the game is given up
+MAX_STEPS = 2000
+
+
+class FakeRequest:
+    """Replaces the HTTP requests of a Bot, answers and records every call"""
+
+    con_pool_size = 1024
+
+    def __init__(self):
+        self.lock = Lock()
+        self.counts = Counter()
+        self.answers: Dict[str, list] = {}
+        self.message_ids = count(1)
+
+    def post(self, url: str, data: dict, timeout: float = None):
+        method = url.rsplit("/", 1)[-1]
+        with self.lock:
+            self.counts[method] += 1
+        if method == "getMe":
+            return BOT_USER
+        if method == "answerInlineQuery":
+            self.answers[data["inline_query_id"]] = data["results"]
+            return True
+        if method.startswith("send") or method.startswith("edit"):
+            return {
+                "message_id": next(self.message_ids),
+                "date": int(time.time()),
+                "chat": {"id": data["chat_id"], "type": "group"},
+                "from": BOT_USER,
+                "text": data.get("text", ""),
+            }
+        return True
+
+    def stop(self):
+        pass
+
+
+class SimulatedRoom(Room):
+    """A Room reporting when each update was handled"""
+
+    def __init__(self, simulation: "Simulation", bot: Bot, debug: bool, metrics: Metrics):
+        self.simulation = simulation
+        updater = Updater(bot=bot, workers=8)
+        super().__init__(updater, GameManager(debug=debug), None, OUTBOX, metrics)
+
+    def run(self, key: int, callback, update: Update, context: CallbackContext):
+        try:
+            super().run(key, callback, update, context)
+        finally:
+            self.simulation.handled(update)
+
+    def reply_query(self, update: Update, context: CallbackContext):
+        try:
+            super().reply_query(update, context)
+        finally:
+            self.simulation.handled(update)
+
+    def error(self, update: Update, context: CallbackContext):
+        self.simulation.errors.append(context.error)
+        super().error(update, context)
+
+
+class Table:
+    """A chat where scripted players play games one after another"""
+
+    def __init__(self, simulation: "Simulation", chat_id: int, players: int, seed: int):
+        self.simulation = simulation
+        self.chat = {"id": chat_id, "type": "group", "title": f"group{chat_id}"}
+        self.users = [
+            {"id": -chat_id * 100 + i, "is_bot": False, "first_name": f"player{i}"}
+            for i in range(players)
+        ]
+        self.random = random.Random(seed)
+
+    @property
+    def game(self) -> Optional[Game]:
+        return self.simulation.room.gm.active_game(self.chat["id"])
+
+    def user_of(self, player) -> dict:
+        return next(user for user in self.users if user["id"] == player.user.id)
+
+    def send(self, kind: str, payload: dict):
+        self.simulation.send(kind, payload)
+
+    def message(self, user: dict, text: str) -> dict:
+        return {
+            "message_id": self.simulation.next_id(),
+            "date": int(time.time()),
+            "chat": self.chat,
+            "from": user,
+            "text": text,
+        }
+
+    def command(self, user: dict, text: str):
+        message = self.message(user, text)
+        message["entities"] = [{"type": "bot_command", "offset": 0, "length": len(text)}]
+        self.send("message", message)
+
+    def results(self, user: dict) -> List[str]:
+        """The ids of the inline results the user gets"""
+        query_id = str(self.simulation.next_id())
+        payload = {"id": query_id, "from": user, "query": "", "offset": ""}
+        self.send("inline_query", payload)
+        return [result["id"] for result in self.simulation.request.answers.pop(query_id)]
+
+    def choose(self, user: dict, purple=False):
+        """Pick one of the inline results, a card of the hand or a purple card"""
+        ids = [
+            result_id
+            for result_id in self.results(user)
+            if (result_id.startswith("purple") if purple else result_id.isdigit())
+        ]
+        payload = {"result_id": self.random.choice(ids), "from": user, "query": ""}
+        self.send("chosen_inline_result", payload)
+
+    def press(self, user: dict, data: str):
+        payload = {
+            "id": str(self.simulation.next_id()),
+            "from": user,
+            "chat_instance": str(self.chat["id"]),
+            "message": self.message(BOT_USER, "buttons"),
+            "data": data,
+        }
+        self.send("callback_query", payload)
+
+    def play(self) -> bool:
+        """Play a game until the settlement, False if it got stuck"""
+        starter = self.users[0]
+        self.command(starter, "/new")
+        for user in self.users[1:]:
+            self.command(user, "/join")
+        self.command(starter, "/start")
+
+        for _ in range(MAX_STEPS):
+            game = self.game
+            if game is None:
+                return True
+            state = game.state
+            if state == Game.State.PURPLE:
+                self.choose(self.user_of(game.current_player), purple=True)
+            elif state == Game.State.YELLOW:
+                player = next(p for p in game.players if p.can_play)
+                self.choose(self.user_of(player))
+            elif state == Game.State.LOSE:
+                group = self.random.randint(1, len(game.board.yellow))
+                self.press(self.user_of(game.current_player), str(group))
+            elif state == Game.State.DISCARD:
+                loser = game.board.loser
+                user = self.user_of(loser)
+                if loser.discard_amount:
+                    self.choose(user)
+                else:
+                    amount = self.random.randint(0, 2)
+                    self.press(user, f"discard{amount}" if amount else "skip_discard")
+            else:
+                return False
+        return False
+
+
+class Simulation:
+    def __init__(
+        self, chats: int = 10, players: int = 4, games: int = 20, debug=False, metrics=True
+    ):
+        """
+        Args:
+            chats (int): Chats playing at the same time
+            players (int): Players in every game
+            games (int): Games to play in total
+            debug (bool): Verify the GameManager indexes after every change
+            metrics (bool): Record the handler and Bot API metrics
+        """
+        self.chats = chats
+        self.players = players
+        self.games = games
+
+        self.request = FakeRequest()
+        self.metrics = Metrics(metrics)
+        request = TimedRequest(self.request, self.metrics) if metrics else self.request
+        self.room = SimulatedRoom(self, Bot(TOKEN, request=request), debug, self.metrics)
+        self.dispatcher = self.room.updater.dispatcher
+
+        self.ids = count(1)
+        self.lock = Lock()
+        self.waiting: Dict[int, Event] = {}
+        self.sent: Dict[int, float] = {}
+        self.latencies: Dict[str, List[float]] = defaultdict(list)
+        self.errors: List[Exception] = []
+
+        self.remaining = games
+        self.finished = 0
+        self.stuck = 0
+        self.elapsed = 0.0
+
+    def next_id(self) -> int:
+        return next(self.ids)
+
+    def send(self, kind: str, payload: dict, timeout: float = 10):
+        """Feed an update to the dispatcher and wait until it was handled"""
+        update_id = self.next_id()
+        update = Update.de_json({"update_id": update_id, kind: payload}, self.dispatcher.bot)
+        done = self.waiting[update_id] = Event()
+        self.sent[update_id] = time.perf_counter()
+        self.dispatcher.update_queue.put(update)
+        if not done.wait(timeout):
+            raise TimeoutError(f"{kind} {payload} was not handled")
+
+    def handled(self, update: Update):
+        latency = time.perf_counter() - self.sent.pop(update.update_id)
+        kind = next(key for key in update.to_dict() if key != "update_id")
+        with self.lock:
+            self.latencies[kind].append(latency)
+        self.waiting.pop(update.update_id).set()
+
+    def take_game(self) -> bool:
+        with self.lock:
+            if self.remaining == 0:
+                return False
+            self.remaining -= 1
+            return True
+
+    def play_table(self, table: Table):
+        while self.take_game():
+            finished = table.play()
+            with self.lock:
+                if finished:
+                    self.finished += 1
+                else:
+                    self.stuck += 1
+
+    def run(self) -> "Simulation":
+        self.room.open()
+        thread = Thread(target=self.dispatcher.start, name="dispatcher")
+        thread.start()
+
+        tables = [Table(self, -(i + 1), self.players, seed=i) for i in range(self.chats)]
+        threads = [Thread(target=self.play_table, args=(table,)) for table in tables]
+        start = time.perf_counter()
+        for table_thread in threads:
+            table_thread.start()
+        for table_thread in threads:
+            table_thread.join()
+        self.elapsed = time.perf_counter() - start
+
+        self.dispatcher.stop()
+        thread.join()
+        self.room.close()
+        return self
+
+    def report(self) -> str:
+        lines = [
+            f"{self.chats} chats, {self.players} players, "
+            f"{self.finished} games finished, {self.stuck} stuck, {len(self.errors)} errors",
+            f"{self.finished / self.elapsed:.1f} games/s, "
+            f"{sum(map(len, self.latencies.values())) / self.elapsed:.0f} updates/s",
+            f"{'latency':<22} {'count':>7} {'p50':>8} {'p90':>8} {'p99':>8}",
+        ]
+        for kind, latencies in sorted(self.latencies.items()):
+            p = quantiles(latencies, n=100) if len(latencies) > 1 else latencies * 99
+            lines.append(
+                f"{kind:<22} {len(latencies):>7} {p[49] * 1000:>6.2f}ms "
+                f"{p[89] * 1000:>6.2f}ms {p[98] * 1000:>6.2f}ms"
+            )
+        games = max(self.finished, 1)
+        lines.append("outbound calls per game")
+        for method, calls in self.request.counts.most_common():
+            lines.append(f"  {method:<20} {calls / games:>8.1f}")
+        total = sum(self.request.counts.values())
+        coalesced = self.room.outbox.stats["coalesced"]
+        lines.append(f"  {'total':<20} {total / games:>8.1f}")
+        lines.append(f"  {'edits coalesced':<20} {coalesced / games:>8.1f}")
+        return "\n".join(lines)
+
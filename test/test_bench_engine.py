@@ -0,0 +1,26 @@
+import json
+import unittest
+
+from test.bench_engine import BASELINE, cases, compare
+
+
+class Test(unittest.TestCase):
+    def test_compare(self):
+        baseline = {"a": {"ns": 100, "score": 1.0}, "b": {"ns": 100, "score": 1.0}}
+        current = {
+            "a": {"ns": 300, "score": 1.4},
+            "b": {"ns": 100, "score": 2.0},
+            "new": {"ns": 100, "score": 5.0},
+        }
+        self.assertDictEqual(compare(current, baseline, 1.5), {"b": 2.0})
+
+    def test_cases(self):
+        names = []
+        for name, stmt in cases():
+            stmt()
+            names.append(name)
+        self.assertEqual(len(names), len(set(names)))
+
+        # the committed baseline covers every operation
+        with open(BASELINE) as f:
+            self.assertSetEqual(set(json.load(f)), set(names))
@@ -0,0 +1,104 @@
+import unittest
+
+from errors import TooManyCardsError
+from game import Game
+from player import Player
+
+
+class Test(unittest.TestCase):
+    def setUp(self):
+        self.game = Game(None)
+        self.players = [Player(self.game, f"Player {i}") for i in range(4)]
+        self.game.start()
+        self.board = self.game.board
+        self.current = self.game.current_player
+        self.others = list(self.game.players[1:])
+
+    def play_purple(self):
+        self.current.play(max(self.game.view.purple_choices, key=lambda c: c.space))
+        return self.board.purple.space
+
+    def play_all(self, player):
+        while self.board.owes(player):
+            player.play(player.hand.cards[0])
+
+    def test_bookkeeping(self):
+        self.assertSetEqual(self.board.pending, set(self.others))
+        self.assertFalse(self.board.owes(self.others[0]))
+
+        space = self.play_purple()
+        self.assertEqual(self.board.missing, space * 3)
+        self.assertTrue(self.others[0].can_play)
+
+        self.others[0].play(self.others[0].hand.cards[0])
+        self.assertEqual(self.board.missing, space * 3 - 1)
+        self.play_all(self.others[0])
+        self.assertSetEqual(self.board.pending, set(self.others[1:]))
+        self.assertRaises(TooManyCardsError, self.others[0].play, self.others[0].hand.cards[0])
+
+        self.play_all(self.others[1])
+        self.play_all(self.others[2])
+        self.assertEqual(self.board.missing, 0)
+        self.assertEqual(self.game.state, Game.State.LOSE)
+        self.assertTrue(self.board.is_revealed)
+
+    def test_reveal_order(self):
+        self.play_purple()
+        for player in self.others:
+            self.play_all(player)
+        players = self.board.get_players()
+        self.assertSetEqual({p for _, p in players}, set(self.others))
+        for (idx, player), (idx2, cards) in zip(players, self.board.get_cards()):
+            self.assertEqual(idx, idx2)
+            self.assertIs(self.board.get_loser(int(idx)), player)
+            self.assertIs(cards, self.board.yellow[player])
+        self.assertRaises(IndexError, self.board.get_loser, 0)
+        self.assertRaises(IndexError, self.board.get_loser, 4)
+
+    def test_join(self):
+        before = Player(self.game, "Player 4")
+        before.draw_first_hand()
+        self.assertIn(before, self.board.pending)
+        self.assertIn(before, self.board.reveal)
+
+        self.play_purple()
+        after = Player(self.game, "Player 5")
+        after.draw_first_hand()
+        self.assertFalse(after.can_play)
+        self.assertRaises(TooManyCardsError, after.play, after.hand.cards[0])
+
+        for player in self.others + [before]:
+            self.play_all(player)
+        self.assertEqual(self.game.state, Game.State.LOSE)
+        self.assertEqual(len(self.board.get_players()), 4)
+
+    def test_leave(self):
+        space = self.play_purple()
+        self.play_all(self.others[0])
+        self.others[1].play(self.others[1].hand.cards[0])
+
+        self.others[1].leave()
+        self.assertNotIn(self.others[1], self.board.reveal)
+        self.assertEqual(self.board.missing, space)
+
+        # the reveal follows when the last player who owed cards leaves
+        self.others[2].leave()
+        self.assertEqual(self.game.state, Game.State.LOSE)
+        self.assertListEqual(self.board.get_players(), [("1", self.others[0])])
+
+    def test_leave_after_reveal(self):
+        self.play_purple()
+        for player in self.others:
+            self.play_all(player)
+        players = self.board.get_players()
+        self.others[0].leave()
+        self.assertListEqual(self.board.get_players(), players)
+
+    def test_recount(self):
+        space = self.play_purple()
+        self.others[0].play(self.others[0].hand.cards[0])
+        pending, missing = set(self.board.pending), self.board.missing
+        self.board.recount()
+        self.assertSetEqual(self.board.pending, pending)
+        self.assertEqual(self.board.missing, missing)
+        self.assertEqual(missing, space * 3 - 1)
@@ -0,0 +1,34 @@
+import unittest
+
+from card import PURPLE_CARDS, REGISTRY, YELLOW_CARDS, Card
+from errors import CardNotFoundError
+
+
+class Test(unittest.TestCase):
+    def test_from_id(self):
+        card = YELLOW_CARDS[0]
+
+        self.assertIs(Card.from_id(card.id), card)
+        self.assertIs(Card.from_id(str(card.id)), card)
+
+        self.assertRaises(CardNotFoundError, Card.from_id, 0)
+        self.assertRaises(CardNotFoundError, Card.from_id, "0")
+
+    def test_colors(self):
+        yellow = YELLOW_CARDS[-1]
+        purple = PURPLE_CARDS[-1]
+
+        self.assertIs(REGISTRY.get_yellow(yellow.id), yellow)
+        self.assertIs(REGISTRY.get_purple(purple.id), purple)
+
+        self.assertRaises(CardNotFoundError, REGISTRY.get_yellow, purple.id)
+        self.assertRaises(CardNotFoundError, REGISTRY.get_purple, yellow.id)
+
+    def test_file_id(self):
+        for card in (YELLOW_CARDS[0], PURPLE_CARDS[0]):
+            self.assertIs(REGISTRY.from_file_id(card.sticker["file_id"]), card)
+
+        self.assertRaises(CardNotFoundError, REGISTRY.from_file_id, "")
+
+    def test_len(self):
+        self.assertEqual(len(REGISTRY), len(YELLOW_CARDS) + len(PURPLE_CARDS))
@@ -0,0 +1,37 @@
+import os
+import tempfile
+import unittest
+
+import catalog
+
+
+class Test(unittest.TestCase):
+    def setUp(self):
+        fd, self.path = tempfile.mkstemp()
+        os.close(fd)
+
+    def tearDown(self):
+        os.remove(self.path)
+
+    def test_round_trip(self):
+        stickers, spaces = catalog.load_json()
+        catalog.build(self.path)
+
+        self.assertEqual(catalog.read(self.path), (stickers, spaces))
+
+    def test_outdated(self):
+        stickers, spaces = catalog.load_json()
+        catalog.write(stickers, spaces, (0, 0, 0, 0), self.path)
+
+        self.assertIsNone(catalog.read(self.path))
+
+    def test_corrupted(self):
+        catalog.build(self.path)
+        with open(self.path, "r+b") as f:
+            f.seek(-1, os.SEEK_END)
+            f.write(b"\0")
+
+        self.assertIsNone(catalog.read(self.path))
+
+    def test_missing(self):
+        self.assertIsNone(catalog.read(self.path + ".missing"))
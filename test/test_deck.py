@@ -0,0 +1,55 @@
+import unittest
+from collections import Counter
+from random import Random
+
+from card import YELLOW_CARDS
+from deck import Deck
+from errors import DeckEmptyError
+
+
+class Test(unittest.TestCase):
+    def setUp(self):
+        self.deck = Deck(YELLOW_CARDS, Random(0))
+        self.deck.init()
+
+    def test_draw_all(self):
+        drawn = self.deck.draw_many(13)
+        while len(self.deck) >= 100:
+            drawn += self.deck.draw_many(100)
+        drawn += self.deck.draw_many(len(self.deck))
+        self.assertEqual(Counter(drawn), Counter(YELLOW_CARDS))
+        self.assertNotEqual(drawn, YELLOW_CARDS)
+        self.assertRaises(DeckEmptyError, self.deck.draw)
+
+    def test_draw_many(self):
+        self.deck.draw_many(len(self.deck) - 5)
+        self.assertRaises(DeckEmptyError, self.deck.draw_many, 6)
+        self.assertEqual(len(self.deck), 5)
+        self.assertListEqual(self.deck.draw_many(0), [])
+
+    def test_peek(self):
+        top = self.deck.peek(2)
+        self.assertListEqual(self.deck.peek(2), top)
+        self.assertListEqual(self.deck.cards[-2:], top)
+        self.assertListEqual(self.deck.draw_many(3)[:2], top[::-1])
+        self.assertEqual(len(self.deck), len(YELLOW_CARDS) - 3)
+
+    def test_same_order_as_single_draws(self):
+        self.deck.random.seed(1)
+        self.deck.init()
+        many = self.deck.draw_many(20)
+
+        self.deck.random.seed(1)
+        self.deck.init()
+        single = [self.deck.draw() for _ in range(20)]
+        self.assertListEqual(many, single)
+
+    def test_uniform(self):
+        """The top card is any card of a small deck equally often"""
+        deck = Deck(YELLOW_CARDS[:4])
+        tops = Counter()
+        for _ in range(4000):
+            deck.init()
+            tops[deck.draw()] += 1
+        self.assertEqual(len(tops), 4)
+        self.assertLess(max(tops.values()) - min(tops.values()), 250)
@@ -0,0 +1,137 @@
+import random
+import time
+import unittest
+from collections import defaultdict
+from threading import Barrier, Lock, Thread
+
+from executor import SerialExecutor
+from game import Game
+from player import Player
+
+
+class Test(unittest.TestCase):
+    def setUp(self):
+        self.executor = SerialExecutor(8)
+
+    def tearDown(self):
+        self.executor.shutdown()
+
+    def test_order(self):
+        seen = defaultdict(list)
+        futures = [
+            self.executor.submit(key, seen[key].append, i)
+            for i in range(200)
+            for key in range(5)
+        ]
+        for future in futures:
+            future.result()
+
+        for key in range(5):
+            self.assertListEqual(seen[key], list(range(200)))
+        self.assertEqual(self.executor.pending, 0)
+        self.assertDictEqual(self.executor.mailboxes, {})
+
+    def test_serial_per_key(self):
+        lock = Lock()
+        running = defaultdict(int)
+        overlaps = []
+        peak = [0]
+
+        def task(key):
+            with lock:
+                running[key] += 1
+                overlaps.append(running[key])
+                peak[0] = max(peak[0], sum(running.values()))
+            time.sleep(0.002)
+            with lock:
+                running[key] -= 1
+
+        futures = [self.executor.submit(i % 4, task, i % 4) for i in range(80)]
+        for future in futures:
+            future.result()
+
+        # never two tasks of one key at once, but keys run in parallel
+        self.assertEqual(max(overlaps), 1)
+        self.assertGreater(peak[0], 1)
+
+    def test_exception(self):
+        future = self.executor.submit(0, lambda: 1 / 0)
+        self.assertRaises(ZeroDivisionError, future.result)
+        self.assertEqual(self.executor.submit(0, lambda: 1).result(), 1)
+
+    def test_submit_after_shutdown(self):
+        self.executor.shutdown()
+        with self.assertRaises(RuntimeError):
+            self.executor.submit(1, time.sleep, 0)
+        self.assertDictEqual(self.executor.mailboxes, {})
+
+    def hammer(self, games, threads: int = 16):
+        """Let every player of every game submit its yellow cards at once"""
+        reveals = defaultdict(int)
+
+        def play(game, player, card):
+            if game.state != Game.State.YELLOW or not player.can_play:
+                return
+            # handlers do I/O between their checks and mutations
+            time.sleep(0.0001)
+            player.play(card)
+            if game.state == Game.State.LOSE:
+                reveals[game] += 1
+
+        actions = []
+        for game in games:
+            for player in game.players[1:]:
+                # submit more cards than allowed, extra ones must be refused
+                for card in player.hand.cards[:4]:
+                    actions.append((game, player, card))
+        random.shuffle(actions)
+
+        barrier = Barrier(threads)
+        futures = []
+
+        def submit(chunk):
+            barrier.wait()
+            for game, player, card in chunk:
+                futures.append(
+                    self.executor.submit(id(game), play, game, player, card)
+                )
+
+        workers = [
+            Thread(target=submit, args=(actions[i::threads],)) for i in range(threads)
+        ]
+        for worker in workers:
+            worker.start()
+        for worker in workers:
+            worker.join()
+        for future in futures:
+            future.result()
+        return reveals
+
+    def make_game(self, players: int) -> Game:
+        game = Game(None)
+        for i in range(players):
+            Player(game, f"Player {i}")
+        game.start()
+        game.current_player.play(game.purple_deck.cards[-1])
+        return game
+
+    def check(self, game, reveals):
+        space = game.board.purple.space
+        self.assertEqual(game.state, Game.State.LOSE)
+        self.assertEqual(reveals[game], 1)
+        for player in game.players[1:]:
+            self.assertEqual(len(game.board.yellow[player]), space)
+            self.assertEqual(len(player.hand), 13 - space)
+            self.assertEqual(len(player.hand.view[1]), 13 - space)
+            self.assertTrue(all(card in player.hand for card in player.hand.view[1]))
+
+    def test_one_game(self):
+        for _ in range(20):
+            game = self.make_game(12)
+            self.check(game, self.hammer([game]))
+
+    def test_many_games(self):
+        games = [self.make_game(random.randint(3, 12)) for _ in range(50)]
+        reveals = self.hammer(games)
+        for game in games:
+            self.check(game, reveals)
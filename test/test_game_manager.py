@@ -1,4 +1,5 @@
 import unittest
+from threading import Thread
 
 from telegram import User, Chat
 
@@ -12,7 +13,7 @@ class Test(unittest.TestCase):
     game = None
 
     def setUp(self):
-        self.gm = GameManager()
+        self.gm = GameManager(debug=True)
 
         self.chat0 = Chat(0, 'group')
         self.chat1 = Chat(1, 'group')
@@ -88,4 +89,55 @@ class Test(unittest.TestCase):
         self.assertFalse(0 in self.gm.chatid_games)
         self.assertFalse(0 in self.gm.userid_players)
         self.assertFalse(1 in self.gm.userid_players)
-        self.assertFalse(2 in self.gm.userid_players)
\ No newline at end of file
+        self.assertFalse(2 in self.gm.userid_players)
+
+    def test_indexes(self):
+        g0 = self.gm.new_game(self.chat0)
+        g1 = self.gm.new_game(self.chat1)
+
+        self.gm.join_game(self.user0, self.chat0)
+        self.gm.join_game(self.user0, self.chat1)
+        self.gm.join_game(self.user1, self.chat1)
+
+        self.assertIs(self.gm.active_game(0), g0)
+        self.assertIs(self.gm.active_game(1), g1)
+        self.assertIsNone(self.gm.active_game(2))
+
+        p0 = self.gm.player_for_user_in_chat(self.user0, self.chat0)
+        self.assertIs(p0.game, g0)
+        self.assertIs(self.gm.player_for_user_in_chat(self.user0, self.chat1).game, g1)
+        self.assertIsNone(self.gm.player_for_user_in_chat(self.user1, self.chat0))
+        self.assertSetEqual(self.gm.userid_chats[0], {0, 1})
+
+        self.gm.end_game(self.chat1, self.user1)
+        self.assertIsNone(self.gm.active_game(1))
+        self.assertSetEqual(self.gm.userid_chats[0], {0})
+        self.assertIs(self.gm.userid_current[0], p0)
+        self.assertFalse(1 in self.gm.userid_chats)
+
+    def test_on_end_unlocked(self):
+        g0 = self.gm.new_game(self.chat0)
+        self.gm.join_game(self.user0, self.chat0)
+        self.gm.join_game(self.user1, self.chat0)
+
+        ended = []
+
+        def other_chat():
+            acquired = self.gm.lock.acquire(False)
+            if acquired:
+                self.gm.lock.release()
+            ended.append(acquired)
+
+        def on_end(game):
+            # another chat can take the lock meanwhile
+            thread = Thread(target=other_chat)
+            thread.start()
+            thread.join()
+            ended.append(game)
+
+        self.gm.on_end = on_end
+        self.gm.new_game(self.chat0)
+        # ends the lobby of two players from inside join_game
+        self.gm.join_game(self.user0, self.chat0)
+        self.assertListEqual(ended, [True, g0])
+        self.assertListEqual(self.gm.ended, [])
@@ -0,0 +1,53 @@
+import unittest
+
+from card import YELLOW_CARDS
+from errors import CardNotInHandError
+from hand import Hand
+
+
+class Test(unittest.TestCase):
+    def setUp(self):
+        self.hand = Hand(YELLOW_CARDS[:13])
+
+    def test_order(self):
+        self.assertTupleEqual(self.hand.cards, tuple(YELLOW_CARDS[:13]))
+        self.hand.remove(YELLOW_CARDS[5])
+        self.hand.add(YELLOW_CARDS[20:22])
+        self.assertListEqual(
+            list(self.hand), YELLOW_CARDS[:5] + YELLOW_CARDS[6:13] + YELLOW_CARDS[20:22]
+        )
+        self.assertEqual(len(self.hand), 14)
+
+    def test_contains(self):
+        card = YELLOW_CARDS[3]
+        self.assertIn(card, self.hand)
+        self.assertIn(card.id, self.hand)
+        self.assertNotIn(YELLOW_CARDS[13], self.hand)
+
+    def test_remove_missing(self):
+        self.hand.remove(YELLOW_CARDS[0])
+        version = self.hand.version
+        self.assertRaises(CardNotInHandError, self.hand.remove, YELLOW_CARDS[0])
+        self.assertRaises(CardNotInHandError, self.hand.remove, YELLOW_CARDS[13])
+        self.assertEqual(self.hand.version, version)
+        self.assertEqual(len(self.hand), 12)
+
+    def test_version(self):
+        version, cards = self.hand.view
+        self.hand.remove(cards[0])
+        self.assertEqual(self.hand.version, version + 1)
+        self.assertTupleEqual(self.hand.view, (version + 1, cards[1:]))
+        # the old view is not changed
+        self.assertEqual(len(cards), 13)
+
+        self.hand.clear()
+        self.assertEqual(self.hand.view, (version + 2, ()))
+
+    def test_view_cached(self):
+        view = self.hand.view
+        self.assertIs(self.hand.view, view)
+        self.hand.remove(view[1][0])
+        self.hand.remove(view[1][1])
+        # built once on read, not on every change
+        self.assertIsNot(self.hand.view, view)
+        self.assertTupleEqual(self.hand.cards, view[1][2:])
@@ -0,0 +1,62 @@
+import unittest
+
+from telegram import Bot, Chat, Update, User
+from telegram.ext import DispatcherHandlerStop
+
+from game_manager import GameManager
+from ingress import IngressFilter
+from test.fake_api import TOKEN
+
+CHAT = {"id": -1, "type": "group", "title": "group"}
+
+
+def user(user_id: int) -> dict:
+    return {"id": user_id, "is_bot": False, "first_name": f"user{user_id}"}
+
+
+def message(user_id: int, **fields) -> dict:
+    return {"message_id": 1, "date": 1615000000, "chat": CHAT, "from": user(user_id), **fields}
+
+
+class Test(unittest.TestCase):
+    def setUp(self):
+        self.bot = Bot(TOKEN)
+        self.gm = GameManager(debug=True)
+        chat = Chat(-1, "group")
+        self.gm.new_game(chat)
+        for user_id in (1, 2, 3):
+            self.gm.join_game(User(user_id, f"user{user_id}", False), chat)
+        self.ingress = IngressFilter(self.gm)
+
+    def kind(self, **data):
+        return self.ingress.irrelevant(Update.de_json({"update_id": 1, **data}, self.bot))
+
+    def test_messages(self):
+        self.assertIsNone(self.kind(message=message(9, text="/new")))
+        self.assertEqual(self.kind(message=message(9, text="hello")), "message")
+        self.assertEqual(
+            self.kind(message=message(9, new_chat_members=[user(8)])), "status_update"
+        )
+        self.assertIsNone(self.kind(message=message(9, left_chat_member=user(2))))
+        self.assertEqual(
+            self.kind(message=message(9, left_chat_member=user(8))), "status_update"
+        )
+        self.assertEqual(self.kind(edited_message=message(1, text="/new")), "other")
+
+    def test_players(self):
+        chosen = {"result_id": "1", "from": user(1), "query": ""}
+        self.assertIsNone(self.kind(chosen_inline_result=chosen))
+        chosen["from"] = user(9)
+        self.assertEqual(self.kind(chosen_inline_result=chosen), "chosen_inline_result")
+
+        callback = {"id": "1", "from": user(9), "chat_instance": "1", "data": "1"}
+        self.assertEqual(self.kind(callback_query=callback), "callback_query")
+        query = {"id": "1", "from": user(9), "query": "", "offset": ""}
+        self.assertIsNone(self.kind(inline_query=query))
+
+    def test_stop(self):
+        update = Update.de_json(
+            {"update_id": 1, "message": message(9, text="hello")}, self.bot
+        )
+        self.assertRaises(DispatcherHandlerStop, self.ingress, update, None)
+        self.assertEqual(self.ingress.stats, {"message": 1})
@@ -0,0 +1,75 @@
+import time
+import unittest
+from types import SimpleNamespace
+
+from inline import InlineStage
+
+
+def query(user_id: int, text: str = ""):
+    user = SimpleNamespace(id=user_id)
+    return SimpleNamespace(inline_query=SimpleNamespace(from_user=user, query=text))
+
+
+class Test(unittest.TestCase):
+    def setUp(self):
+        self.tasks = []
+        self.answered = []
+        self.errors = []
+        self.stage = InlineStage(
+            lambda update, context: self.answered.append(update.inline_query.query),
+            lambda fn, *args: self.tasks.append((fn, args)),
+            lambda update, error: self.errors.append(error),
+        )
+
+    def run_tasks(self):
+        while self.tasks:
+            fn, args = self.tasks.pop(0)
+            fn(*args)
+
+    def test_coalesce(self):
+        for text in "abc":
+            self.stage(query(1, text), None)
+        self.stage(query(2, "x"), None)
+        self.assertEqual(len(self.tasks), 2)
+
+        self.run_tasks()
+        self.assertListEqual(self.answered, ["c", "x"])
+        self.assertEqual(self.stage.stats, {"answered": 2, "coalesced": 2})
+        self.assertDictEqual(self.stage.waiting, {})
+
+    def test_while_answering(self):
+        """A query coming in while the last one is answered waits for it"""
+
+        def answer(update, context):
+            self.answered.append(update.inline_query.query)
+            if len(self.answered) == 1:
+                self.stage(query(1, "b"), None)
+                self.stage(query(1, "c"), None)
+
+        self.stage.answer = answer
+        self.stage(query(1, "a"), None)
+        self.run_tasks()
+        self.assertListEqual(self.answered, ["a", "c"])
+        self.assertEqual(self.stage.stats["coalesced"], 1)
+
+    def test_stale(self):
+        self.stage.max_age = 0.01
+        self.stage(query(1, "a"), None)
+        time.sleep(0.02)
+        self.run_tasks()
+        self.assertListEqual(self.answered, [])
+        self.assertEqual(self.stage.stats, {"stale": 1})
+
+        self.stage(query(1, "b"), None)
+        self.run_tasks()
+        self.assertListEqual(self.answered, ["b"])
+
+    def test_error(self):
+        def answer(update, context):
+            raise ValueError(update.inline_query.query)
+
+        self.stage.answer = answer
+        self.stage(query(1, "a"), None)
+        self.run_tasks()
+        self.assertEqual(len(self.errors), 1)
+        self.assertDictEqual(self.stage.waiting, {})
@@ -0,0 +1,132 @@
+import os
+import random
+import tempfile
+import unittest
+
+from telegram import Chat, User
+
+from errors import TooManyCardsError
+from game import Game
+from game_manager import GameManager
+from journal import Action, Journal, JournalWriter, decode_journal
+from replay import ReplayError, read_journals, replay, replay_steps
+
+
+def play_turn(game: Game, rng: random.Random):
+    """Play a turn with the actions the bot takes, choosing from rng"""
+    if game.state == Game.State.PURPLE:
+        game.current_player.play(rng.choice(game.view.purple_choices))
+    while game.state == Game.State.YELLOW:
+        player = rng.choice(game.players[1:])
+        try:
+            player.play(rng.choice(player.hand.cards))
+        except TooManyCardsError:
+            pass
+    if game.state == Game.State.LOSE:
+        game.choose_loser(rng.randint(1, len(game.board.reveal)))
+    if game.state == Game.State.DISCARD:
+        loser = game.board.loser
+        amount = rng.randint(0, 2)
+        if not amount:
+            loser.skip_discard()
+            return
+        loser.choose_discards(amount)
+        while not loser.discarded:
+            loser.discard(rng.choice(loser.hand.cards))
+        game.turn()
+
+
+def state_of(game: Game):
+    board = game.board
+    return (
+        game.state,
+        [(p.user.id, p.hand.cards, p.score) for p in game.players],
+        game.yellow_deck.cards,
+        game.purple_deck.cards,
+        board.purple,
+        [(p.user.id, cards) for p, cards in board.yellow.items()],
+        [p.user.id for p in board.reveal],
+    )
+
+
+class Test(unittest.TestCase):
+    def setUp(self):
+        self.rng = random.Random(0)
+        self.game = Game(None, seed=42)
+        self.users = [User(i, str(i), False) for i in range(1, 7)]
+        for user in self.users[:4]:
+            self.game.join(user)
+        self.game.start()
+
+    def play(self, turns: int):
+        for _ in range(turns):
+            if self.game.get_loser():
+                return
+            play_turn(self.game, self.rng)
+
+    def test_encoding(self):
+        journal = self.game.journal
+        self.assertEqual(len(journal), 5)
+        self.assertEqual(list(journal)[-1], (Action.START, -1, 0))
+        copy = Journal(journal.tobytes())
+        self.assertListEqual(list(copy), list(journal))
+        self.assertEqual(copy.joins, 4)
+
+        chat_id, seed, decoded = decode_journal(
+            '{"chat_id": -1, "seed": 42, "journal": "AQAAAAAAAAAAAAAAAAAAAAcAAAAAAAAA"}'
+        )
+        self.assertEqual((chat_id, seed), (-1, 42))
+        self.assertListEqual(list(decoded), [(Action.JOIN, 0, 7)])
+
+    def test_seeded(self):
+        other = Game(None, seed=42)
+        for user in self.users[:4]:
+            other.join(user)
+        other.start()
+        self.assertEqual(state_of(other), state_of(self.game))
+        self.assertNotEqual(Game(None).seed, Game(None).seed)
+
+    def test_replay(self):
+        self.play(2)
+        self.game.join(self.users[4])
+        self.play(1)
+        self.game.leave(self.game.players[2])
+        self.game.join(self.users[5])
+        self.play(3)
+
+        replayed = replay(self.game.seed, self.game.journal)
+        self.assertEqual(state_of(replayed), state_of(self.game))
+        self.assertEqual(replayed.random.getstate(), self.game.random.getstate())
+
+    def test_steps(self):
+        self.play(1)
+        steps = list(replay_steps(self.game.seed, self.game.journal))
+        self.assertEqual(len(steps), len(self.game.journal))
+        game, entry = steps[-1]
+        self.assertIn(entry[0], (Action.SKIP, Action.DISCARD))
+        self.assertEqual(state_of(game), state_of(self.game))
+
+    def test_diverged(self):
+        self.play(1)
+        self.assertRaises(ReplayError, replay, self.game.seed + 1, self.game.journal)
+
+    def test_journal_file(self):
+        fd, path = tempfile.mkstemp()
+        os.close(fd)
+        try:
+            gm = GameManager(debug=True)
+            gm.on_end = JournalWriter(path).write
+            chat = Chat(-1, "group")
+            gm.new_game(chat)
+            for user in self.users[:3]:
+                gm.join_game(user, chat)
+            game = gm.active_game(chat.id)
+            game.start()
+            gm.end_game(chat, self.users[0])
+
+            (chat_id, seed, journal), = read_journals(path)
+            self.assertEqual((chat_id, seed), (chat.id, game.seed))
+            # the end of a game is not an action, the rest is replayed
+            self.assertEqual(state_of(replay(seed, journal))[1:], state_of(game)[1:])
+        finally:
+            os.remove(path)
@@ -0,0 +1,91 @@
+import io
+import json
+import logging
+import unittest
+from threading import Thread
+
+import log
+from game import Game
+from log import game_event
+from player import Player
+
+
+class Test(unittest.TestCase):
+    def setUp(self):
+        root = logging.getLogger()
+        self.saved = (list(root.handlers), root.level)
+        self.stream = io.StringIO()
+
+        self.game = Game(None)
+        self.players = [Player(self.game, f"Player {i}") for i in range(3)]
+        self.game.start()
+
+    def tearDown(self):
+        log.shutdown()
+        log.sampling.rates.clear()
+        root = logging.getLogger()
+        for handler in list(root.handlers):
+            root.removeHandler(handler)
+        handlers, level = self.saved
+        for handler in handlers:
+            root.addHandler(handler)
+        root.setLevel(level)
+        logging.getLogger("test.log").setLevel(logging.NOTSET)
+
+    def lines(self):
+        log.shutdown()
+        return self.stream.getvalue().splitlines()
+
+    def test_structured(self):
+        log.setup({"level": "DEBUG"}, self.stream)
+        player, card = self.players[1], self.players[1].hand.cards[0]
+        logger = logging.getLogger("test.log")
+        logger.debug("Yellow card played", extra=game_event(self.game, player, card))
+        logger.info("Joined %s", "x")
+
+        first, second = self.lines()
+        self.assertTrue(
+            first.endswith(f"Yellow card played state=PURPLE player=Player 1 card={card.id}")
+        )
+        self.assertTrue(second.endswith("INFO - Joined x"))
+
+    def test_json(self):
+        log.setup({"level": "DEBUG", "format": "json"}, self.stream)
+        logging.getLogger("test.log").info("Game started", extra=game_event(self.game))
+        data = json.loads(self.lines()[0])
+        self.assertEqual(data["message"], "Game started")
+        self.assertEqual(data["state"], "PURPLE")
+        self.assertEqual(data["logger"], "test.log")
+
+    def test_threads(self):
+        log.setup({"level": "INFO"}, self.stream)
+        logger = logging.getLogger("test.log")
+
+        def write(i):
+            for j in range(100):
+                logger.info("%d %d", i, j)
+
+        threads = [Thread(target=write, args=(i,)) for i in range(4)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        self.assertEqual(len(self.lines()), 400)
+
+    def test_runtime_control(self):
+        log.setup({"level": "INFO", "sampling": {"test": 0}}, self.stream)
+        logger = logging.getLogger("test.log")
+        logger.debug("hidden by the level")
+        logger.info("dropped by the sampling")
+        logger.warning("always kept")
+
+        log.set_sampling("test", 1)
+        log.set_level("test.log", "debug")
+        logger.debug("shown")
+        self.assertIn("test.log: DEBUG", log.describe())
+        self.assertRaises(ValueError, log.set_level, "test.log", "LOUD")
+
+        lines = self.lines()
+        self.assertEqual(len(lines), 2)
+        self.assertIn("always kept", lines[0])
+        self.assertIn("shown", lines[1])
@@ -0,0 +1,92 @@
+import unittest
+from threading import Thread
+from unittest.mock import patch
+from urllib.request import urlopen
+
+from telegram import User
+
+from errors import DeckEmptyError
+from metrics import Histogram, Metrics, MetricsServer
+from test.simulation import Simulation
+
+
+class Test(unittest.TestCase):
+    def test_histogram(self):
+        histogram = Histogram((1, 2, 4))
+        for value in (0.5, 1, 1.5, 3, 10):
+            histogram.observe(value)
+        self.assertListEqual(histogram.snapshot()[0], [2, 1, 1, 1])
+        self.assertEqual(histogram.count, 5)
+        self.assertEqual(histogram.sum, 16)
+        self.assertEqual(histogram.quantile(0.4), 1)
+        self.assertEqual(histogram.quantile(0.5), 1.5)
+        self.assertEqual(histogram.quantile(1), 4)
+        self.assertListEqual(
+            histogram.render("h", 'a="b"')[-3:],
+            ['h_bucket{a="b",le="+Inf"} 5', 'h_sum{a="b"} 16.0', 'h_count{a="b"} 5'],
+        )
+
+    def test_threads(self):
+        histogram = Histogram((1,))
+        threads = [Thread(target=histogram.observe, args=(i,)) for i in range(4)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        self.assertEqual(len(histogram.shards), 4)
+        self.assertTupleEqual(histogram.snapshot(), ([2, 2], 6.0, 4))
+
+    def test_timed(self):
+        metrics = Metrics()
+
+        def handler(update, context):
+            metrics.count_call()
+            metrics.count_call()
+            if update:
+                raise DeckEmptyError()
+
+        timed = metrics.timed(handler)
+        timed(None, None)
+        self.assertRaises(DeckEmptyError, timed, True, None)
+        # calls outside of a handler are not counted to any update
+        metrics.count_call()
+
+        self.assertEqual(metrics.handlers["handler"].count, 2)
+        self.assertEqual(metrics.calls_per_update.sum, 4)
+        self.assertDictEqual(dict(metrics.errors), {"DeckEmptyError": 1})
+        self.assertIs(Metrics(enabled=False).timed(handler), handler)
+
+    def test_simulation(self):
+        simulation = Simulation(chats=2, players=3, games=2).run()
+        metrics = simulation.metrics
+
+        for name in ("reply_query", "process_result", "reply_callback", "new", "join"):
+            self.assertGreater(metrics.handlers[name].count, 0, name)
+        self.assertEqual(
+            metrics.api["answerInlineQuery"].count,
+            simulation.request.counts["answerInlineQuery"],
+        )
+        self.assertGreater(metrics.calls_per_update.count, 0)
+
+        text = metrics.render()
+        self.assertIn('yellowcards_handler_seconds_count{handler="reply_query"}', text)
+        self.assertIn('yellowcards_outbox_messages_total{result="sent"}', text)
+        self.assertIn("yellowcards_games 0\n", text)
+
+        with patch("bot.ADMIN_LIST", ["admin"]):
+            room = simulation.room
+            self.assertTrue(room.is_admin(User(1, "a", False, username="admin")))
+            self.assertFalse(room.is_admin(User(2, "b", False, username="other")))
+        self.assertIn("handler reply_query:", metrics.summary())
+
+    def test_server(self):
+        metrics = Metrics()
+        metrics.gauge("answer", "The answer", lambda: 42)
+        server = MetricsServer(metrics, port=0)
+        server.start()
+        try:
+            with urlopen(f"http://127.0.0.1:{server.port}/metrics") as response:
+                text = response.read().decode()
+        finally:
+            server.stop()
+        self.assertIn("# TYPE yellowcards_answer gauge\nyellowcards_answer 42\n", text)
@@ -0,0 +1,119 @@
+import time
+import unittest
+
+from outbox import Outbox, Priority
+from test.fake_api import FakeBotAPI
+
+
+class Test(unittest.TestCase):
+    def setUp(self):
+        self.api = FakeBotAPI()
+        self.api.start()
+
+    def tearDown(self):
+        self.api.stop()
+
+    def make_outbox(self, **kwargs) -> Outbox:
+        outbox = Outbox(self.api.bot(), **kwargs)
+        outbox.start()
+        return outbox
+
+    def texts(self, chat_id: int):
+        return [
+            params["text"]
+            for method, params in self.api.calls
+            if method == "sendMessage" and int(params["chat_id"]) == chat_id
+        ]
+
+    def test_order(self):
+        outbox = self.make_outbox(chat_rate=100, chat_burst=100)
+        for i in range(20):
+            outbox.send_message(1, str(i))
+            outbox.send_message(2, str(i))
+        outbox.stop()
+
+        self.assertListEqual(self.texts(1), [str(i) for i in range(20)])
+        self.assertListEqual(self.texts(2), [str(i) for i in range(20)])
+        self.assertEqual(outbox.stats["sent"], 40)
+
+    def test_enqueue_returns_immediately(self):
+        self.api.latency = 0.05
+        outbox = self.make_outbox(chat_rate=100, chat_burst=100)
+
+        start = time.monotonic()
+        for i in range(10):
+            outbox.send_sticker(1, "file_id")
+        self.assertLess(time.monotonic() - start, 0.05)
+
+        outbox.stop()
+        self.assertEqual(self.api.count("sendSticker"), 10)
+
+    def test_retry_after(self):
+        self.api.flood("sendMessage", 2, retry_after=0.1)
+        outbox = self.make_outbox(chat_rate=100, chat_burst=100)
+        for i in range(5):
+            outbox.send_message(1, str(i))
+        outbox.stop()
+
+        self.assertListEqual(self.texts(1), [str(i) for i in range(5)])
+        self.assertEqual(outbox.stats["retried"], 2)
+        self.assertEqual(outbox.stats["sent"], 5)
+
+    def test_chat_rate(self):
+        outbox = self.make_outbox(chat_rate=20, chat_burst=1)
+
+        start = time.monotonic()
+        for i in range(5):
+            outbox.send_message(1, str(i))
+        outbox.stop()
+
+        # the first message uses the burst, the other four wait 1/20 s each
+        self.assertGreaterEqual(time.monotonic() - start, 0.19)
+
+    def test_priority(self):
+        outbox = self.make_outbox(global_rate=10, chat_rate=100, chat_burst=100)
+        for i in range(15):
+            outbox.send_sticker(1, str(i), priority=Priority.LOW)
+        outbox.send_message(2, "turn", priority=Priority.HIGH)
+        outbox.stop()
+
+        methods = [method for method, _ in self.api.calls]
+        # the prompt goes out as soon as the global budget refills
+        self.assertLess(methods.index("sendMessage"), 12)
+        self.assertEqual(methods.count("sendSticker"), 15)
+
+    def test_latest(self):
+        outbox = self.make_outbox(chat_rate=100, chat_burst=100)
+        sent = []
+        outbox.send_message(1, "status", on_sent=sent.append)
+        for i in range(10):
+            outbox.send_latest("status", "edit_message_text", 1, 0.2, text=str(i))
+        time.sleep(0.4)
+        outbox.send_latest("status", "edit_message_text", 1, 0.2, text="last")
+        outbox.stop()
+
+        self.assertEqual(sent[0].text, "status")
+        edits = [
+            params["text"] for method, params in self.api.calls if method != "sendMessage"
+        ]
+        self.assertListEqual(edits, ["9", "last"])
+        self.assertEqual(outbox.stats["coalesced"], 9)
+
+    def test_unexpected_error(self):
+        outbox = self.make_outbox(chat_rate=100, chat_burst=100)
+        outbox.send("no_such_method", 1)
+        outbox.send_message(1, "after")
+
+        start = time.monotonic()
+        outbox.stop(timeout=1)
+        self.assertLess(time.monotonic() - start, 0.5)
+        self.assertListEqual(self.texts(1), ["after"])
+        self.assertEqual(outbox.stats["failed"], 1)
+
+    def test_stop_unstarted(self):
+        outbox = Outbox(self.api.bot())
+        outbox.send_message(1, "queued", Priority.HIGH)
+        start = time.monotonic()
+        outbox.stop(timeout=1)
+        self.assertLess(time.monotonic() - start, 0.5)
+        self.assertListEqual(self.texts(1), [])
@@ -0,0 +1,152 @@
+import os
+import random
+import tempfile
+import unittest
+
+from telegram import Chat, User
+
+from errors import TooManyCardsError
+from executor import SerialExecutor
+from game import Game
+from game_manager import GameManager
+from persistence import Snapshotter, SnapshotError, dump, load
+
+
+def state_of(game):
+    """Everything that must survive a snapshot"""
+    board = game.board
+    return (
+        game.chat.id,
+        game.state,
+        game.starter.id,
+        [(p.user.id, p.user.first_name, p.hand.cards, p.score, p.discard_amount) for p in game.players],
+        game.yellow_deck.cards,
+        game.purple_deck.cards,
+        board.purple,
+        [(p.user.id, cards) for p, cards in board.yellow.items()],
+        [p.user.id for p in board.reveal],
+        board.loser.user.id if board.loser else None,
+        game.seed,
+        game.random.getstate(),
+        game.journal.tobytes(),
+    )
+
+
+def play_turn(game, seed):
+    """Play a full turn, choosing cards and the loser from the seed"""
+    rng = random.Random(seed)
+    current = game.current_player
+    if game.state == Game.State.PURPLE:
+        current.play(rng.choice(game.purple_deck.cards[-2:]))
+    while game.state == Game.State.YELLOW:
+        player = rng.choice(game.players[1:])
+        try:
+            player.play(rng.choice(player.hand.cards))
+        except TooManyCardsError:
+            pass
+    if game.state == Game.State.LOSE:
+        group, _ = rng.choice(game.board.get_players())
+        game.choose_loser(int(group))
+    if game.state == Game.State.DISCARD:
+        loser = game.board.loser
+        amount = rng.randint(0, 2)
+        if amount:
+            loser.choose_discards(amount)
+            for _ in range(amount):
+                loser.discard(rng.choice(loser.hand.cards))
+            game.turn()
+        else:
+            loser.skip_discard()
+
+
+class Test(unittest.TestCase):
+    def setUp(self):
+        self.gm = GameManager(debug=True)
+        self.users = [User(i, f"user{i}", False, username=f"u{i}") for i in range(6)]
+        self.chats = [Chat(-i, "group", title=f"group{i}") for i in range(1, 4)]
+
+        # a running game, a lobby, and a game in the middle of a turn
+        for chat, users in zip(self.chats, (self.users[:4], self.users[3:5], self.users[1:])):
+            game = self.gm.new_game(chat)
+            game.starter = users[0]
+            for user in users:
+                self.gm.join_game(user, chat)
+        self.gm.active_game(-1).start()
+        play_turn(self.gm.active_game(-1), 0)
+        game = self.gm.active_game(-3)
+        game.start()
+        game.current_player.play(game.purple_deck.cards[-1])
+        game.players[1].play(game.players[1].hand.cards[0])
+
+    def restored(self) -> GameManager:
+        gm = GameManager(debug=True)
+        self.assertEqual(load(dump(self.gm), gm), 3)
+        return gm
+
+    def test_round_trip(self):
+        gm = self.restored()
+
+        for chat in self.chats:
+            self.assertEqual(
+                state_of(gm.active_game(chat.id)), state_of(self.gm.active_game(chat.id))
+            )
+        for user in self.users:
+            self.assertEqual(
+                gm.userid_current[user.id].game.chat.id,
+                self.gm.userid_current[user.id].game.chat.id,
+            )
+        game = gm.active_game(-1)
+        self.assertIs(game.view.current_player, game.current_player)
+
+    def test_plays_on_identically(self):
+        gm = self.restored()
+
+        for chat_id in (-1, -3):
+            original, restored = self.gm.active_game(chat_id), gm.active_game(chat_id)
+            for seed in range(5):
+                play_turn(original, seed)
+                play_turn(restored, seed)
+                self.assertEqual(state_of(restored), state_of(original))
+
+    def test_leave_after_reveal(self):
+        game = self.gm.active_game(-3)
+        while game.state == Game.State.YELLOW:
+            player = next(p for p in game.players if game.board.owes(p))
+            player.play(player.hand.cards[0])
+        groups = {int(group): p.user.id for group, p in game.board.get_players()}
+        left = game.players[2]
+        position = next(g for g, user_id in groups.items() if user_id == left.user.id)
+        self.gm.leave_game(left.user, game.chat)
+
+        restored = self.restored().active_game(-3)
+        del groups[position]
+        self.assertDictEqual(
+            {int(group): p.user.id for group, p in restored.board.get_players()}, groups
+        )
+        self.assertRaises(IndexError, restored.board.get_loser, position)
+        for group, user_id in groups.items():
+            self.assertEqual(restored.board.get_loser(group).user.id, user_id)
+
+    def test_invalid(self):
+        data = dump(self.gm)
+        self.assertRaises(SnapshotError, load, data[:-1], GameManager())
+        self.assertRaises(SnapshotError, load, b"XXXX" + data[4:], GameManager())
+
+    def test_snapshotter(self):
+        fd, path = tempfile.mkstemp()
+        os.close(fd)
+        executor = SerialExecutor(4)
+        try:
+            snapshots = Snapshotter(self.gm, path, executor, min_interval=0)
+            snapshots.start()
+            snapshots.request()
+            snapshots.stop()
+
+            gm = GameManager(debug=True)
+            self.assertEqual(Snapshotter(gm, path).restore(), 3)
+            self.assertEqual(
+                state_of(gm.active_game(-3)), state_of(self.gm.active_game(-3))
+            )
+        finally:
+            executor.shutdown()
+            os.remove(path)
@@ -31,22 +31,57 @@ class Test(unittest.TestCase):
         self.assertEqual(p0, p2.next)
         self.assertEqual(p2, p0.next)
 
+    def test_roster(self):
+        p0 = Player(self.game, "Player 0")
+        p1 = Player(self.game, "Player 1")
+        p2 = Player(self.game, "Player 2")
+
+        self.assertTupleEqual(self.game.players, (p0, p1, p2))
+        self.assertIs(self.game.players, self.game.players)
+
+        self.game.seating.turn()
+        self.assertTupleEqual(self.game.players, (p1, p2, p0))
+
+        p3 = Player(self.game, "Player 3")
+        self.assertTupleEqual(self.game.players, (p1, p2, p0, p3))
+
+        p2.leave()
+        self.assertTupleEqual(self.game.players, (p1, p0, p3))
+        self.assertIsNone(p2.next)
+
+    def test_front(self):
+        players = [Player(self.game, f"Player {i}") for i in range(8)]
+
+        self.assertIs(players[0].front, players[3])
+        self.assertIs(players[6].front, players[1])
+
+        players[7].leave()
+        self.assertIs(players[0].front, players[2])
+        self.assertIs(players[5].front, players[0])
+
     def test_draw(self):
         p = Player(self.game, "Player 0")
         self.game.start()
 
         draw_count = 13
 
-        self.assertEqual(len(p.cards), draw_count)
+        self.assertEqual(len(p.hand), draw_count)
 
     def test_play(self):
-        p = Player(self.game, "Player 0")
-        p1 = Player(self.game, "Player 1")
-        p2 = Player(self.game, "Player 2")
-
+        for i in range(3):
+            Player(self.game, f"Player {i}")
         self.game.start()
 
-        p.play(p.cards[0])
-        p1.play(p1.cards[0])
-        p2.play(p2.cards[0])
+        # the current player opens the turn with a purple card
+        purple = self.game.view.purple_choices[0]
+        self.game.current_player.play(purple)
+        self.assertIs(self.game.board.purple, purple)
+        self.assertEqual(self.game.state, Game.State.YELLOW)
+
+        for player in self.game.players[1:]:
+            card = player.hand.cards[0]
+            player.play(card)
+            self.assertNotIn(card, player.hand)
+            self.assertEqual(len(player.hand), 12)
+            self.assertListEqual(self.game.board.yellow[player], [card])
 
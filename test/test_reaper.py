@@ -0,0 +1,93 @@
+import unittest
+from unittest.mock import patch
+
+from telegram import Chat, User
+
+from executor import SerialExecutor
+from game_manager import GameManager
+from reaper import EVICTED, LOBBY, STALLED, Reaper, game_size
+
+
+class Test(unittest.TestCase):
+    def setUp(self):
+        self.gm = GameManager(debug=True)
+        self.users = [User(i, f"user{i}", False) for i in range(9)]
+        self.games = []
+        for chat_id in range(3):
+            chat = Chat(-chat_id - 1, "group")
+            game = self.gm.new_game(chat)
+            for user in self.users[chat_id * 3 : chat_id * 3 + 3]:
+                self.gm.join_game(user, chat)
+            game.last_activity = 1000.0 + chat_id
+            self.games.append(game)
+        # a started game and two lobbies
+        self.games[0].start()
+
+        self.reaped = []
+        self.reaper = Reaper(
+            self.gm,
+            notify=lambda game, reason: self.reaped.append((game, reason)),
+            lobby_ttl=60,
+            game_ttl=600,
+        )
+
+    def test_ttl(self):
+        self.assertEqual(self.reaper.sweep(now=1059.0), 0)
+        self.assertEqual(self.reaper.sweep(now=1061.5), 1)
+        self.assertListEqual(self.reaped, [(self.games[1], LOBBY)])
+        self.assertIsNone(self.gm.active_game(-2))
+        self.assertTrue(self.games[1].ended)
+
+        self.assertEqual(self.reaper.sweep(now=1700.0), 2)
+        self.assertEqual(self.reaper.stats, {LOBBY: 2, STALLED: 1})
+        self.assertDictEqual(self.gm.chatid_games, {})
+        self.assertDictEqual(self.gm.userid_players, {})
+        self.assertDictEqual(self.gm.userid_current, {})
+
+    def test_evict(self):
+        self.reaper.max_games = 1
+        self.assertEqual(self.reaper.sweep(now=1010.0), 2)
+        self.assertListEqual(
+            self.reaped, [(self.games[0], EVICTED), (self.games[1], EVICTED)]
+        )
+        self.assertIs(self.gm.active_game(-3), self.games[2])
+
+    @patch("reaper.resident_memory")
+    def test_evict_memory(self, resident_memory):
+        self.reaper.max_memory = 1
+        ceiling = 2 ** 20
+        # over by the size of the least recently active game
+        resident_memory.return_value = ceiling + game_size(self.games[0])
+        self.assertEqual(self.reaper.sweep(now=1010.0), 1)
+        self.assertListEqual(self.reaped, [(self.games[0], EVICTED)])
+
+        # the memory is not given back, nothing more is evicted
+        for now in (1020.0, 1030.0, 1040.0):
+            self.assertEqual(self.reaper.sweep(now=now), 0)
+        # only what grows past it
+        resident_memory.return_value += 1
+        self.assertEqual(self.reaper.sweep(now=1050.0), 1)
+        self.assertEqual(self.reaper.sweep(now=1055.0), 0)
+        # under the low watermark the ceiling applies again
+        resident_memory.return_value = ceiling // 2
+        self.assertEqual(self.reaper.sweep(now=1059.0), 0)
+        self.assertIsNone(self.reaper.evicted_at)
+        self.assertIs(self.gm.active_game(-3), self.games[2])
+
+    def test_active_meanwhile(self):
+        game = self.games[1]
+        reaped = self.reaper.select(now=1100.0)
+        self.assertIn((game, LOBBY), reaped)
+        last_activity = game.last_activity
+        game.last_activity = 1099.0
+        self.assertFalse(self.reaper.reap(game, LOBBY, last_activity))
+        self.assertIs(self.gm.active_game(-2), game)
+
+    def test_executor(self):
+        executor = SerialExecutor(2)
+        try:
+            self.reaper.executor = executor
+            self.assertEqual(self.reaper.sweep(now=2000.0), 3)
+        finally:
+            executor.shutdown()
+        self.assertDictEqual(self.gm.chatid_games, {})
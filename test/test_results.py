@@ -0,0 +1,57 @@
+import json
+import unittest
+
+from game import Game
+from player import Player
+from results import (
+    NO_GAME_RESULT,
+    YELLOW_RESULTS,
+    add_cards,
+    add_no_game,
+    add_purple_cards,
+    hand_results,
+)
+
+
+class Test(unittest.TestCase):
+    def setUp(self):
+        self.game = Game(None)
+        self.players = [Player(self.game, f"Player {i}") for i in range(3)]
+        self.game.start()
+
+    def test_add_cards(self):
+        player = self.players[1]
+
+        results = []
+        add_cards(results, player)
+        self.assertListEqual([r.id for r in results], [str(c) for c in player.hand.cards])
+        self.assertIs(results[0], YELLOW_RESULTS[player.hand.cards[0].id])
+
+        cached = hand_results[player]
+        add_cards([], player)
+        self.assertIs(hand_results[player], cached)
+
+        player.discard_amount = 1
+        player.discard(player.hand.cards[0])
+        results = []
+        add_cards(results, player)
+        self.assertEqual(len(results), 12)
+        self.assertIsNot(hand_results[player], cached)
+
+    def test_prebuilt(self):
+        results = []
+        add_no_game(results)
+        add_purple_cards(results, self.game)
+
+        self.assertIs(results[0], NO_GAME_RESULT)
+        self.assertIs(results[0].to_dict(), NO_GAME_RESULT.to_dict())
+        self.assertListEqual(
+            [r.id for r in results[1:]],
+            ["purple" + str(c) for c in self.game.purple_deck.cards[-2:]],
+        )
+        self.assertEqual(results[1].to_dict()["type"], "sticker")
+
+    def test_serializable(self):
+        for result in (NO_GAME_RESULT, YELLOW_RESULTS[self.players[0].hand.cards[0].id]):
+            data = json.loads(json.dumps(result.to_dict()))
+            self.assertNotIn("parse_mode", data["input_message_content"])
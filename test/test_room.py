@@ -0,0 +1,74 @@
+import os
+import tempfile
+import unittest
+
+from telegram import Bot, Chat, Update, User
+from telegram.ext import Updater
+
+from bot import Room
+from card import PURPLE
+from game import Game
+from game_manager import GameManager
+from persistence import Snapshotter
+from test.fake_api import TOKEN
+
+
+class Test(unittest.TestCase):
+    def setUp(self):
+        bot = Bot(TOKEN)
+        self.room = Room(Updater(bot=bot, workers=1), GameManager(debug=True), None)
+        self.games = []
+        for chat_id in (-1, -2):
+            chat = Chat(chat_id, "group")
+            game = self.room.gm.new_game(chat)
+            for user_id in (1, 2, 3):
+                self.room.gm.join_game(User(user_id, f"user{user_id}", False), chat)
+            game.start()
+            game.current_player = game.seating.seats[0]
+            self.games.append(game)
+
+    def tearDown(self):
+        self.room.executor.shutdown()
+
+    def chosen_purple(self, game: Game) -> Update:
+        card = game.view.purple_choices[0]
+        return Update.de_json(
+            {
+                "update_id": 1,
+                "chosen_inline_result": {
+                    "result_id": PURPLE + str(card.id),
+                    "from": {"id": 1, "is_bot": False, "first_name": "user1"},
+                    "query": "",
+                },
+            },
+            self.room.updater.bot,
+        )
+
+    def test_routed_game(self):
+        """A result chosen for one game is played there, not in the current game"""
+        game, other = self.games
+        self.assertIs(self.room.gm.userid_current[1].game, other)
+        card = game.view.purple_choices[0]
+        self.room.run(-1, self.room.process_result, self.chosen_purple(game), None)
+
+        self.assertEqual(game.state, Game.State.YELLOW)
+        self.assertIs(game.board.purple, card)
+        self.assertEqual(other.state, Game.State.PURPLE)
+
+    def test_snapshot_on_transition(self):
+        """Only updates that change a game ask for a snapshot"""
+        with tempfile.TemporaryDirectory() as directory:
+            snapshots = Snapshotter(self.room.gm, os.path.join(directory, "games"))
+            self.room.snapshots = snapshots
+            game = self.games[0]
+            update = self.chosen_purple(game)
+            self.room.run(-1, lambda update, context: None, update, None)
+            self.assertFalse(snapshots.dirty)
+
+            self.room.run(-1, self.room.process_result, update, None)
+            self.assertEqual(game.state, Game.State.YELLOW)
+            self.assertTrue(snapshots.dirty)
+
+            snapshots.dirty = False
+            self.room.gm.remove_game(game)
+            self.assertTrue(snapshots.dirty)
@@ -0,0 +1,102 @@
+import random
+import unittest
+
+from telegram import User
+
+from card import YELLOW_CARD
+from game import Game
+from utils import HEADER, display_name, make_settlement
+
+
+def scan_loser(game):
+    """Game.get_loser as a scan of every player"""
+    count = game.get_end_count()
+    for player in game.players:
+        if -player.score >= count:
+            return player
+    return None
+
+
+def scan_winners(game):
+    highest = max(player.score for player in game.players)
+    return [player for player in game.players if player.score == highest]
+
+
+def scan_settlement(game):
+    text = HEADER.format(text="結束")
+    highest, lowest = float("-inf"), 0
+    for p in game.players:
+        highest = max(highest, p.score)
+        lowest = min(lowest, p.score)
+    for p in game.players:
+        if p.score == highest:
+            text += "🏆 "
+        elif p.score == lowest:
+            text += "👎 "
+        else:
+            text += "👍 "
+        text += f"{display_name(p.user)}（{-p.score} 張 {YELLOW_CARD}）\n"
+    return text.rstrip()
+
+
+class Test(unittest.TestCase):
+    def make_game(self, players: int) -> Game:
+        game = Game(None, seed=1)
+        for i in range(players):
+            game.join(User(i, f"user{i}", False))
+        game.start()
+        return game
+
+    def check(self, game: Game):
+        scores = [player.score for player in game.players]
+        scoreboard = game.scoreboard
+        self.assertEqual(len(scoreboard), len(scores))
+        self.assertEqual(scoreboard.highest, max(scores))
+        self.assertEqual(scoreboard.lowest, min(scores))
+        self.assertSetEqual(set(scoreboard.leaders()), set(scan_winners(game)))
+        self.assertSetEqual(
+            set(scoreboard.worst()), {p for p in game.players if p.score == min(scores)}
+        )
+        self.assertIs(game.get_loser(), scan_loser(game))
+        if game.get_loser() is not None:
+            self.assertListEqual(game.get_winners(), scan_winners(game))
+            self.assertEqual(make_settlement(game), scan_settlement(game))
+
+    def test_random_games(self):
+        for seed in range(50):
+            rng = random.Random(seed)
+            game = self.make_game(rng.randint(3, 8))
+            users = len(game.players)
+            for _ in range(60):
+                action = rng.random()
+                if action < 0.1 and len(game.yellow_deck) >= 13:
+                    game.join(User(users, f"user{users}", False))
+                    users += 1
+                elif action < 0.2 and len(game.players) > 3:
+                    game.leave(rng.choice(game.players))
+                elif action < 0.3:
+                    game.seating.turn()
+                else:
+                    player = rng.choice(game.players)
+                    player.score -= rng.randint(1, 3)
+                self.check(game)
+
+    def test_left_players(self):
+        game = self.make_game(4)
+        player = game.players[1]
+        player.score = -5
+        self.assertEqual(game.scoreboard.lowest, -5)
+        game.leave(player)
+        self.assertEqual(game.scoreboard.lowest, 0)
+        # the score of a player who left is not counted
+        player.score = -9
+        self.check(game)
+
+    def test_join_lowers_end_count(self):
+        game = self.make_game(7)
+        game.players[2].score = -4
+        self.assertIsNone(game.get_loser())
+        # with 8 players the game ends at 4 points
+        game.join(User(7, "user7", False))
+        self.assertIs(game.get_loser(), game.players[2])
+        self.check(game)
@@ -0,0 +1,134 @@
+import time
+import unittest
+from functools import partial
+
+from telegram import Bot
+from telegram.ext import Updater
+
+from bot import Room
+from game_manager import GameManager
+from shard import RoutingTable, ShardRouter, chat_of, user_of
+from test.fake_api import TOKEN, FakeBotAPI
+
+
+def fake_room(base_url: str, index: int, shards: int) -> Room:
+    """A shard talking to the fake API"""
+    bot = Bot(TOKEN, base_url=base_url)
+    outbox = {"global_rate": 10000, "chat_rate": 1000, "chat_burst": 1000}
+    return Room(Updater(bot=bot, workers=4), GameManager(debug=True), None, outbox)
+
+
+def user(user_id: int) -> dict:
+    return {"id": user_id, "is_bot": False, "first_name": f"user{user_id}"}
+
+
+def command(update_id: int, chat_id: int, user_id: int, text: str) -> dict:
+    return {
+        "update_id": update_id,
+        "message": {
+            "message_id": update_id,
+            "date": 1615000000,
+            "chat": {"id": chat_id, "type": "group", "title": f"group{chat_id}"},
+            "from": user(user_id),
+            "text": text,
+            "entities": [{"type": "bot_command", "offset": 0, "length": len(text)}],
+        },
+    }
+
+
+def inline_query(update_id: int, user_id: int) -> dict:
+    return {
+        "update_id": update_id,
+        "inline_query": {
+            "id": str(update_id),
+            "from": user(user_id),
+            "query": "",
+            "offset": "",
+        },
+    }
+
+
+def wait_for(condition, timeout: float = 10):
+    deadline = time.monotonic() + timeout
+    while not condition():
+        if time.monotonic() > deadline:
+            raise AssertionError("Timed out")
+        time.sleep(0.01)
+
+
+class TestRouting(unittest.TestCase):
+    def test_raw_updates(self):
+        self.assertEqual(chat_of(command(1, -2, 1, "/new")), -2)
+        self.assertEqual(user_of(command(1, -2, 1, "/new")), 1)
+        self.assertIsNone(chat_of(inline_query(2, 1)))
+        self.assertEqual(user_of(inline_query(2, 1)), 1)
+        message = command(4, -7, 1, "/new")["message"]
+        callback = {
+            "update_id": 3,
+            "callback_query": {"id": "3", "from": user(5), "message": message},
+        }
+        self.assertEqual(chat_of(callback), -7)
+        self.assertEqual(user_of(callback), 5)
+
+    def test_table(self):
+        table = RoutingTable(2)
+        table.update(0, 1, -2, True)
+        table.update(1, 1, -3, True)
+        self.assertEqual(table.get(1), -3)
+
+        # switching games on another shard keeps the current game
+        table.update(0, 1, -4, False)
+        self.assertEqual(table.get(1), -3)
+
+        # leaving the current game falls back to a game on another shard
+        table.update(1, 1, None, False)
+        self.assertEqual(table.get(1), -4)
+        table.update(0, 1, None, False)
+        self.assertIsNone(table.get(1))
+        self.assertDictEqual(table.shard_chats, {})
+
+
+class TestRouter(unittest.TestCase):
+    def setUp(self):
+        self.api = FakeBotAPI()
+        self.api.start()
+        self.router = ShardRouter(2, partial(fake_room, self.api.base_url))
+        self.router.start()
+
+    def tearDown(self):
+        self.api.stop()
+
+    def sent_to(self, chat_id: int) -> int:
+        return sum(
+            1
+            for method, params in self.api.calls
+            if method == "sendMessage" and int(params["chat_id"]) == chat_id
+        )
+
+    def test_router(self):
+        router = self.router
+        router.put(command(1, -2, 1, "/new"))
+        router.put(command(2, -2, 2, "/join"))
+        wait_for(lambda: router.table.get(1) == -2)
+
+        router.put(command(3, -3, 3, "/new"))
+        router.put(command(4, -3, 4, "/join"))
+        router.put(command(5, -3, 1, "/join"))
+        wait_for(lambda: router.table.get(1) == -3)
+        self.assertEqual(router.route(inline_query(6, 1)), 1)
+        router.put(inline_query(6, 1))
+
+        # after leaving, the user's game on the other shard is the current one
+        router.put(command(7, -3, 1, "/leave"))
+        wait_for(lambda: router.table.get(1) == -2)
+        self.assertEqual(router.route(inline_query(8, 1)), 0)
+        # without a game, the shard of the user's private chat answers
+        self.assertEqual(router.route(inline_query(9, 5)), 1)
+        router.put(inline_query(9, 5))
+
+        router.stop()
+        self.assertListEqual(router.routed, [2, 6])
+        self.assertDictEqual(router.handled, {0: 2, 1: 6})
+        self.assertEqual(self.sent_to(-2), 3)
+        self.assertEqual(self.sent_to(-3), 5)
+        self.assertEqual(self.api.count("answerInlineQuery"), 2)
@@ -0,0 +1,19 @@
+import unittest
+
+from test.simulation import Simulation
+
+
+class Test(unittest.TestCase):
+    def test_games(self):
+        simulation = Simulation(chats=3, players=4, games=6, debug=True).run()
+
+        self.assertEqual(simulation.finished, 6)
+        self.assertEqual(simulation.stuck, 0)
+        self.assertListEqual(simulation.errors, [])
+        self.assertDictEqual(simulation.room.gm.chatid_games, {})
+        self.assertDictEqual(simulation.room.gm.userid_current, {})
+        # every inline query got an answer
+        self.assertEqual(
+            simulation.request.counts["answerInlineQuery"],
+            len(simulation.latencies["inline_query"]),
+        )
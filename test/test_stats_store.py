@@ -0,0 +1,78 @@
+import os
+import sqlite3
+import tempfile
+import unittest
+
+from telegram import User
+
+from game import Game
+from stats_store import PlayerStats, StatsStore
+
+
+def finished_game(seed: int) -> Game:
+    """A game of 3 players that user 1 lost"""
+    game = Game(None, seed=seed)
+    for i in range(3):
+        game.join(User(i, f"user{i}", False))
+    game.start()
+    game.players[0].score = -1
+    game.players[1].score = -6
+    return game
+
+
+class Test(unittest.TestCase):
+    def setUp(self):
+        self.dir = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.dir.name, "stats.db")
+        self.store = StatsStore(self.path, interval=60, batch=2, refresh=0)
+
+    def tearDown(self):
+        self.store.stop()
+        self.dir.cleanup()
+
+    def test_record(self):
+        game = finished_game(1)
+        self.store.record_game(game)
+        self.store.record_picked(game.players[0].hand.cards[:2])
+        # waiting, not written yet
+        self.assertEqual(self.store.player(2), PlayerStats(2, "user2", None, 1, 1, 0, 0))
+        self.store.flush()
+        self.store.record_game(finished_game(2))
+
+        self.assertEqual(self.store.player(1), PlayerStats(1, "user1", None, 2, 0, 2, 12))
+        self.assertIsNone(self.store.player(9))
+        self.store.stop()
+        with sqlite3.connect(self.path) as connection:
+            (picked,) = connection.execute("SELECT sum(picked) FROM cards").fetchone()
+        self.assertEqual(picked, 2)
+        self.assertEqual(self.store.committed, 2)
+
+    def test_unfinished(self):
+        game = finished_game(1)
+        game.players[1].score = 0
+        self.store.record_game(game)
+        self.assertIsNone(self.store.player(0))
+
+    def test_top(self):
+        self.store.start()
+        for seed in range(4):
+            self.store.record_game(finished_game(seed))
+        self.store.stop()
+        self.assertEqual(self.store.top[0].user_id, 2)
+        self.assertEqual(self.store.top[0].wins, 4)
+        self.assertEqual(len(self.store.top), 3)
+
+        # the leaderboard is read again on start
+        store = StatsStore(self.path)
+        self.assertTupleEqual(store.top, self.store.top)
+
+    def test_top_of_other_process(self):
+        """The leaderboard shows the games another shard wrote"""
+        other = StatsStore(self.path, refresh=0)
+        self.store.refresh = 0
+        self.assertTupleEqual(self.store.top, ())
+        other.record_game(finished_game(1))
+        other.stop()
+        # nothing waiting here, the commit of the other store is noticed
+        self.store.flush()
+        self.assertEqual(len(self.store.top), 3)
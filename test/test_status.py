@@ -0,0 +1,90 @@
+import time
+import unittest
+
+from telegram import Chat, User
+
+from game_manager import GameManager
+from outbox import Outbox
+from status import StatusBoard
+from test.fake_api import FakeBotAPI
+from utils import make_status
+
+
+class Test(unittest.TestCase):
+    def setUp(self):
+        self.api = FakeBotAPI()
+        self.api.start()
+        self.outbox = Outbox(self.api.bot(), chat_rate=100, chat_burst=100)
+        self.outbox.start()
+        self.status = StatusBoard(
+            self.outbox, lambda game: (make_status(game), None), delay=0.2
+        )
+
+        self.gm = GameManager(debug=True)
+        chat = Chat(-1, "group")
+        self.game = self.gm.new_game(chat)
+        for user_id in (1, 2, 3):
+            self.gm.join_game(User(user_id, f"user{user_id}", False), chat)
+        self.game.start()
+
+    def tearDown(self):
+        self.outbox.stop()
+        self.api.stop()
+
+    def calls(self):
+        return [(method, params["text"]) for method, params in self.api.calls]
+
+    def wait(self, seconds: float):
+        """Until the outbox sent what is due in `seconds`"""
+        time.sleep(seconds)
+        while self.outbox.queued or self.outbox.in_flight:
+            time.sleep(0.01)
+
+    def test_edits(self):
+        game = self.game
+        self.status.update(game)
+        self.wait(0)
+        self.assertEqual(self.api.count("sendMessage"), 1)
+        self.assertIn("請打一張", self.calls()[0][1])
+
+        # the purple card and a burst of yellow cards make a single edit
+        game.current_player.play(game.view.purple_choices[0])
+        self.status.update(game)
+        for player in game.players[1:]:
+            player.play(player.hand.cards[0])
+            self.status.update(game)
+        self.status.update(game)
+        self.wait(0.3)
+
+        self.assertEqual(self.api.count("sendMessage"), 1)
+        self.assertEqual(self.api.count("editMessageText"), 1)
+        method, text = self.calls()[-1]
+        self.assertEqual(method, "editMessageText")
+        self.assertEqual(text, make_status(game))
+
+    def test_pending_creation(self):
+        game = self.game
+        self.status.update(game)
+        # changed before the message was sent, edited once it is
+        game.current_player.play(game.view.purple_choices[0])
+        self.status.update(game)
+        self.wait(0.3)
+        self.assertListEqual(
+            [method for method, _ in self.calls()], ["sendMessage", "editMessageText"]
+        )
+        self.assertEqual(self.calls()[-1][1], make_status(game))
+
+    def test_next_game(self):
+        self.status.update(self.game)
+        self.wait(0)
+        self.gm.end_game(self.game.chat, self.game.players[0].user)
+        self.status.end(self.game)
+        self.assertDictEqual(self.status.chats, {})
+
+        game = self.gm.new_game(Chat(-1, "group"))
+        for user_id in (1, 2, 3):
+            self.gm.join_game(User(user_id, f"user{user_id}", False), game.chat)
+        game.start()
+        self.status.update(game)
+        self.wait(0)
+        self.assertEqual(self.api.count("sendMessage"), 2)
@@ -0,0 +1,96 @@
+import json
+import unittest
+from queue import Queue
+from urllib.error import HTTPError
+from urllib.request import Request, urlopen
+
+from telegram import Update
+from telegram.ext import Dispatcher, TypeHandler
+
+from test.fake_api import FakeBotAPI
+from webhook import SECRET_TOKEN_HEADER, WebhookServer
+
+USER = {"id": 1, "is_bot": False, "first_name": "user1"}
+CHAT = {"id": -100, "type": "group", "title": "group"}
+
+UPDATES = [
+    {
+        "update_id": 1,
+        "message": {
+            "message_id": 10,
+            "date": 1615000000,
+            "chat": CHAT,
+            "from": USER,
+            "text": "/join",
+            "entities": [{"type": "bot_command", "offset": 0, "length": 5}],
+        },
+    },
+    {
+        "update_id": 2,
+        "inline_query": {"id": "20", "from": USER, "query": "", "offset": ""},
+    },
+    {
+        "update_id": 3,
+        "chosen_inline_result": {"result_id": "nogame", "from": USER, "query": ""},
+    },
+]
+
+
+class Test(unittest.TestCase):
+    def setUp(self):
+        self.updates = []
+
+        self.api = FakeBotAPI()
+        self.api.start()
+
+        self.dispatcher = Dispatcher(self.api.bot(), Queue(), workers=1)
+        self.dispatcher.add_handler(
+            TypeHandler(Update, lambda update, context: self.updates.append(update))
+        )
+
+        self.server = WebhookServer(
+            self.dispatcher, port=0, path="/hook", secret_token="secret"
+        )
+        self.server.start()
+
+    def tearDown(self):
+        if not self.server.stopping:
+            self.server.stop()
+        self.api.stop()
+
+    def post(self, data, path="/hook", secret_token="secret") -> int:
+        request = Request(
+            f"http://127.0.0.1:{self.server.port}{path}",
+            data=data if isinstance(data, bytes) else json.dumps(data).encode(),
+            headers={SECRET_TOKEN_HEADER: secret_token},
+        )
+        try:
+            with urlopen(request) as response:
+                return response.status
+        except HTTPError as e:
+            return e.code
+
+    def test_updates(self):
+        self.assertEqual(self.post(UPDATES[0]), 200)
+        self.assertEqual(self.post(UPDATES[1:]), 200)
+
+        self.server.stop()
+        self.assertListEqual([u.update_id for u in self.updates], [1, 2, 3])
+        self.assertEqual(self.updates[0].message.text, "/join")
+        self.assertEqual(self.updates[1].inline_query.from_user.id, 1)
+
+    def test_rejected(self):
+        self.assertEqual(self.post(UPDATES, secret_token="wrong"), 403)
+        self.assertEqual(self.post(UPDATES, path="/"), 404)
+        self.assertEqual(self.post(b"{"), 400)
+        self.assertEqual(self.post([1, 2]), 400)
+
+        self.server.stop()
+        self.assertListEqual(self.updates, [])
+
+    def test_drain(self):
+        for update_id in range(100):
+            self.post({**UPDATES[1], "update_id": update_id})
+
+        self.server.stop()
+        self.assertEqual(len(self.updates), 100)
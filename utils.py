@@ -5,22 +5,44 @@ HEADER = "－－－《{text}》－－－\n"
 
 
 def display_name(user):
-    """ Get the current players name including their username, if possible """
+    """ Get the name of a user or UserRecord including the username, if possible """
     user_name = user.first_name
     if user.username:
         user_name += "（@" + user.username + "）"
     return user_name
 
 
-def make_other_players_notif(game) -> str:
-    """Make the notification message without current player"""
-    players = game.players
-    players.remove(game.current_player)
-    text = HEADER.format(text="黃牌")
-    for p in players:
-        text += display_name(p.user) + "\n"
-    text += f"請依序打出 {game.board.purple.space} 張 {YELLOW_CARD}！"
-    return text
+def make_play_progress(game) -> str:
+    """Who still has to play yellow cards in this turn"""
+    board = game.board
+    # in seat order, the reveal order is secret
+    names = "、".join(display_name(p.user) for p in game.players if p in board.pending)
+    return f"還差 {board.missing} 張 {YELLOW_CARD}，等待 {names}"
+
+
+def make_status(game) -> str:
+    """The live status of a running game: whose turn, who owes cards, the scores"""
+    board = game.board
+    current = display_name(game.current_player.user)
+    if game.state == game.State.YELLOW:
+        text = HEADER.format(text="黃牌")
+        text += f"{current}出題，請打出 {board.purple.space} 張 {YELLOW_CARD}！\n"
+        text += make_play_progress(game) + "\n"
+    elif game.state == game.State.LOSE:
+        text = HEADER.format(text="裁決")
+        text += f"{current}請挑最爛ㄉ\n"
+    elif game.state == game.State.DISCARD:
+        loser = board.loser
+        text = HEADER.format(text="換牌")
+        text += display_name(loser.user) + "你剛剛輸了\n"
+        if loser.discard_amount:
+            text += f"請選擇 {loser.discard_amount} 張 {YELLOW_CARD} 棄牌\n"
+        else:
+            text += "你可以選擇換 1 至 2 張牌，或不換牌\n"
+    else:
+        text = HEADER.format(text="紫牌")
+        text += f"{current}請打一張 {PURPLE_CARD}\n"
+    return text + make_current_settlement(game)
 
 
 def make_current_settlement(game) -> str:
@@ -32,23 +54,18 @@ def make_current_settlement(game) -> str:
 
 def make_settlement(game) -> str:
     text = HEADER.format(text="結束")
-    players = game.players
-    highest, lowest = float("-inf"), 0
-    for p in players:
-        if p.score > highest:
-            highest = p.score
-        if p.score < lowest:
-            lowest = p.score
-
-    for p in players:
+    scoreboard = game.scoreboard
+    highest, lowest = scoreboard.highest, min(scoreboard.lowest, 0)
+    for p in game.players:
+        score = p.score
         # prepend emoji to player
-        if p.score == highest:
+        if score == highest:
             text += "🏆 "
-        elif p.score == lowest:
+        elif score == lowest:
             text += "👎 "
         else:
             text += "👍 "
-        text += f"{display_name(p.user)}（{-p.score} 張 {YELLOW_CARD}）\n"
+        text += f"{display_name(p.user)}（{-score} 張 {YELLOW_CARD}）\n"
     return text.rstrip()
 
 
@@ -60,19 +77,6 @@ def make_card_players(game, num: int) -> str:
     return text.rstrip()
 
 
-def make_game_start(game) -> str:
-    text = HEADER.format(text="開始")
-    text += display_name(game.current_player.user) + f"請打一張 {PURPLE_CARD}"
-    return text
-
-
-def make_loser_discard(game) -> str:
-    text = HEADER.format(text="換牌")
-    text += display_name(game.board.loser.user) + "你剛剛輸了\n"
-    text += "你可以選擇換 1 至 2 張牌，或不換牌\n"
-    return text
-
-
 def make_room_info(game) -> str:
     text = HEADER.format(text="房間")
     others = [p.user for p in game.players]
@@ -81,3 +85,24 @@ def make_room_info(game) -> str:
     for u in others:
         text += display_name(u) + "\n"
     return text.rstrip()
+
+
+def make_player_stats(user, stats) -> str:
+    text = HEADER.format(text="戰績")
+    text += display_name(user) + "\n"
+    if stats is None:
+        return text + "還沒玩完過任何一場ㄡ"
+    text += f"場數：{stats.games}\n"
+    text += f"勝場：{stats.wins}\n"
+    text += f"敗場：{stats.losses}\n"
+    text += f"累積 {YELLOW_CARD}：{stats.yellow} 張"
+    return text
+
+
+def make_top(top) -> str:
+    text = HEADER.format(text="排行")
+    if not top:
+        return text + "還沒有人玩完過ㄡ"
+    for place, stats in enumerate(top, 1):
+        text += f"{place}. {display_name(stats)}：{stats.wins} 勝 / {stats.games} 場\n"
+    return text.rstrip()
@@ -0,0 +1,149 @@
+"""
+Webhook ingestion mode.
+
+A small threaded HTTP server receiving the updates Telegram pushes to us.
+Every update is put on the dispatcher's update queue, so the handlers
+registered in Room work exactly as they do with long polling.
+"""
+from __future__ import annotations
+
+import json
+from hmac import compare_digest
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from logging import getLogger
+from signal import SIGINT, SIGTERM, signal
+from threading import Event, Thread
+from typing import TYPE_CHECKING, Optional
+
+from telegram import Update
+
+if TYPE_CHECKING:
+    from telegram.ext import Dispatcher
+
+SECRET_TOKEN_HEADER = "X-Telegram-Bot-Api-Secret-Token"
+
+logger = getLogger(__name__)
+
+
+class WebhookHandler(BaseHTTPRequestHandler):
+    server: WebhookHTTPServer
+
+    def do_POST(self):
+        webhook = self.server.webhook
+
+        if self.path != webhook.path:
+            self.send_empty(404)
+            return
+        if webhook.stopping:
+            # Telegram retries the delivery later
+            self.send_empty(503)
+            return
+        if webhook.secret_token is not None:
+            token = self.headers.get(SECRET_TOKEN_HEADER, "")
+            if not compare_digest(token, webhook.secret_token):
+                self.send_empty(403)
+                return
+
+        try:
+            length = int(self.headers.get("Content-Length", 0))
+            data = json.loads(self.rfile.read(length))
+        except ValueError:
+            self.send_empty(400)
+            return
+
+        # Accept a single update as well as a batch of updates
+        if not isinstance(data, list):
+            data = [data]
+        if not all(isinstance(item, dict) for item in data):
+            self.send_empty(400)
+            return
+
+        webhook.put(data)
+        self.send_empty(200)
+
+    def send_empty(self, code: int):
+        self.send_response(code)
+        self.send_header("Content-Length", "0")
+        self.end_headers()
+
+    def log_message(self, format, *args):
+        logger.debug("%s - " + format, self.address_string(), *args)
+
+
+class WebhookHTTPServer(ThreadingHTTPServer):
+    # Join the request threads on shutdown so no update in flight is lost
+    daemon_threads = False
+    block_on_close = True
+
+    webhook: WebhookServer
+
+
+class WebhookServer:
+    """Receives updates over HTTP and feeds them to the dispatcher"""
+
+    def __init__(
+        self,
+        dispatcher: Dispatcher,
+        listen: str = "127.0.0.1",
+        port: int = 8443,
+        path: str = "/",
+        secret_token: Optional[str] = None,
+    ):
+        self.dispatcher = dispatcher
+        self.path = path
+        self.secret_token = secret_token
+        self.stopping = False
+
+        self.httpd = WebhookHTTPServer((listen, port), WebhookHandler)
+        self.httpd.webhook = self
+
+        self.threads = []
+
+    @property
+    def port(self) -> int:
+        return self.httpd.server_address[1]
+
+    def put(self, data: list):
+        """Parses the updates and puts them on the update queue"""
+        bot = self.dispatcher.bot
+        for item in data:
+            update = Update.de_json(item, bot)
+            if update is not None:
+                self.dispatcher.update_queue.put(update)
+
+    def start(self):
+        """Starts the dispatcher and the HTTP server in background threads"""
+        if not self.dispatcher.running:
+            ready = Event()
+            self._start_thread(self.dispatcher.start, "dispatcher", ready=ready)
+            ready.wait()
+        self._start_thread(self.httpd.serve_forever, "webhook")
+        logger.info("Webhook listening on port %s", self.port)
+
+    def stop(self):
+        """
+        Stops receiving updates, then lets the dispatcher drain the update
+        queue and finish the handlers already running before returning
+        """
+        self.stopping = True
+        self.httpd.shutdown()
+        self.httpd.server_close()
+
+        # The dispatcher only stops once the update queue is empty
+        self.dispatcher.stop()
+        for thread in self.threads:
+            thread.join()
+        logger.info("Webhook stopped")
+
+    def idle(self):
+        """Blocks until SIGINT or SIGTERM, then stops gracefully"""
+        stop_event = Event()
+        for signum in (SIGINT, SIGTERM):
+            signal(signum, lambda *args: stop_event.set())
+        stop_event.wait()
+        self.stop()
+
+    def _start_thread(self, target, name: str, **kwargs):
+        thread = Thread(target=target, name=name, kwargs=kwargs)
+        thread.start()
+        self.threads.append(thread)